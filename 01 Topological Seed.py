@@ -1,13 +1,27 @@
 from pathlib import Path
 import pandas as pd
-import win32com.client
 import Scripts.wpp_lib as wpp_lib
-SimAuto = win32com.client.Dispatch("pwrworld.SimulatorAuto")
+from Scripts import simauto_trace
 
 cur_dir = Path(__file__).parent
 
+# Reuse tables already extracted from unchanged PWBs/EPCs. 
+wpp_lib.case_cache_dir = cur_dir / 'Cache'
+
+# Record every SimAuto call, to find where the time goes. Writes TopoSeed_Trace.json/.xlsx. 
+trace_simauto = False
+
 case_format = 'PWB23'
 
+# Fault duty (for the giant swing bus) from the offline short-circuit calculation, instead of a Fault object per bus. 
+# To check it against PowerWorld, set 'validate': both run, PowerWorld's result is used, and they are compared on the 
+# fault_duty_check sheet of TopoSeed_Log.xlsx. 'simauto' uses PowerWorld only. 
+wpp_lib.fault_duty_mode = 'offline'
+
+# SimAuto workers which share the search for branch status changes that diverge (1 = search on the open case only). 
+# Each is an extra SimAuto instance (license) with the case open, on top of this script's own. E.g. set to 4 if licenses allow. 
+branch_status_workers = wpp_lib.simauto_worker_count(1)
+
 # ------------------ Inputs ------------------
 # Get first Gridview EPC
 gv_dir = cur_dir / 'HourEPCs'
@@ -33,50 +47,65 @@ pvqv_fp = cur_dir / 'TopoSeed' / 'pvqv.csv'
 dummy_bus_fp = cur_dir / 'TopoSeed' / 'DummyBus.aux'
 errors_fp = cur_dir / 'TopoSeed' / 'TopoSeed_Log.xlsx'
 created_elements_fp = cur_dir / 'TopoSeed' / 'TopoSeed_CreatedElements.xlsx'
+trace_fp = cur_dir / 'TopoSeed' / 'TopoSeed_Trace.json'
+trace_report_fp = cur_dir / 'TopoSeed' / 'TopoSeed_Trace.xlsx'
 
 if(__name__=='__main__'):
+    # Started here, not at import: the branch status workers import this script, and would each start an extra SimAuto. 
+    # Set WPP_SIMAUTO_RECORD / WPP_SIMAUTO_REPLAY to record this run, or replay it without PowerWorld (see wpp_lib.py). 
+    SimAuto = wpp_lib.dispatch_simauto('01_topological_seed')
+    if trace_simauto:
+        SimAuto = simauto_trace.TracedSimAuto(SimAuto)
+
     print('Initializing log.')
     writer = pd.ExcelWriter(errors_fp, engine='openpyxl')
 
     print('00_create_dummy_bus_aux')
+    simauto_trace.set_stage('00_create_dummy_bus_aux')
     if not wpp_lib.open_case(SimAuto, pw_fp):
         quit()
     wpp_lib.create_dummy_bus_aux(SimAuto, dummy_bus_fp)
 
     print('01_create_missing_elements')
-    if not wpp_lib.open_case(SimAuto, gv_fp):
-        quit()
-    # Renumber dummy buses before getting case data
-    retVal = SimAuto.RunScriptCommand('EnterMode(EDIT);')
-    retVal = SimAuto.RunScriptCommand('LoadAux("'+str(dummy_bus_fp)+'",YES);')
-    print(retVal)
-    gv_case_dict = wpp_lib.get_case_data(SimAuto)
+    simauto_trace.set_stage('01_create_missing_elements')
+    def open_gv_case():
+        if not wpp_lib.open_case(SimAuto, gv_fp):
+            quit()
+        # Renumber dummy buses before getting case data
+        retVal = SimAuto.RunScriptCommand('EnterMode(EDIT);')
+        retVal = SimAuto.RunScriptCommand('LoadAux("'+str(dummy_bus_fp)+'",YES);')
+        print(retVal)
+    gv_case_dict = wpp_lib.get_case_data(SimAuto, [gv_fp, dummy_bus_fp], open_gv_case)
 
     if not wpp_lib.open_case(SimAuto, pw_fp):
         quit()
-    pw_case_dict = wpp_lib.get_case_data(SimAuto)
+    pw_case_dict = wpp_lib.get_case_data(SimAuto, [pw_fp])
     missing_dict = wpp_lib.create_missing_elements(SimAuto, gv_case_dict, pw_case_dict)
     wpp_lib.df_dict_to_excel_workbook(created_elements_fp, missing_dict)
     wpp_lib.save_case(SimAuto, cur_dir / 'TopoSeed' / '01_create_missing_elements.pwb', case_format)
 
     print('02_fix_transformer_taps')
+    simauto_trace.set_stage('02_fix_transformer_taps')
     pw_case_dict = wpp_lib.get_case_data(SimAuto)
     bad_transformer_df = wpp_lib.fix_transformer_taps(SimAuto)
     bad_transformer_df.to_excel(writer, sheet_name='bad_transformer_tap', index=False)
     wpp_lib.save_case(SimAuto, cur_dir / 'TopoSeed' / '02_fix_transformer_taps.pwb', case_format)
 
     print('03_set_branch_statuses')
+    simauto_trace.set_stage('03_set_branch_statuses')
     pw_case_dict = wpp_lib.get_case_data(SimAuto)
-    [status_targets_df, fail_df] = wpp_lib.set_branch_statuses(SimAuto, gv_case_dict, pw_case_dict)
+    [status_targets_df, fail_df] = wpp_lib.set_branch_statuses(SimAuto, gv_case_dict, pw_case_dict, cur_dir / 'TopoSeed' / '02_fix_transformer_taps.pwb', branch_status_workers)
     fail_df.to_excel(writer, sheet_name='branch_st_change_failed', index=False)
     status_targets_df.to_excel(writer, sheet_name='branch_st_targets', index=False)
     wpp_lib.save_case(SimAuto, cur_dir / 'TopoSeed' / '03_set_branch_statuses.pwb', case_format)
 
     print('04_adjust_shunts')
+    simauto_trace.set_stage('04_adjust_shunts')
     wpp_lib.adjust_shunts(SimAuto)
     wpp_lib.save_case(SimAuto, cur_dir / 'TopoSeed' / '04_adjust_shunts.pwb', case_format)
 
     print('05_GenTerminalVoltageControl')
+    simauto_trace.set_stage('05_GenTerminalVoltageControl')
     SimAuto.SaveState()
     retVal = SimAuto.RunScriptCommand('SetCurrentDirectory("'+str(cur_dir)+'");')
     retVal = SimAuto.RunScriptCommand('LoadAux("Scripts/GenTerminalVoltageControl.aux",YES);')
@@ -86,15 +115,30 @@ if(__name__=='__main__'):
         SimAuto.LoadState()
     wpp_lib.save_case(SimAuto, cur_dir / 'TopoSeed' / '05_GenTerminalVoltageControl.pwb', case_format)
 
+    # Fault duty & PVQV are reused from the cache while the solved case is unchanged. 
+    print('case_fingerprint')
+    simauto_trace.set_stage('case_fingerprint')
+    fingerprint = wpp_lib.case_fingerprint(SimAuto)
+
     print('get_fault_duty')
-    fault_df = wpp_lib.get_fault_duty(SimAuto)
+    simauto_trace.set_stage('get_fault_duty')
+    if wpp_lib.fault_duty_mode == 'validate':
+        # The comparison (fault_duty_check_df) is made while calculating, so a cached result would skip it. 
+        fault_df = wpp_lib.get_fault_duty(SimAuto)
+    else:
+        fault_df = wpp_lib.get_result_cached(fingerprint, f'fault_duty {wpp_lib.fault_duty_mode}', lambda: wpp_lib.get_fault_duty(SimAuto))
     fault_df.to_csv(fault_fp, index=False)
+    if wpp_lib.fault_duty_check_df is not None:
+        wpp_lib.fault_duty_check_df.to_excel(writer, sheet_name='fault_duty_check', index=False)
 
     print('get_pvqv')
-    pvqv_df = wpp_lib.get_pvqv(SimAuto)
+    simauto_trace.set_stage('get_pvqv')
+    pvqv_df = wpp_lib.get_result_cached(fingerprint, f'pvqv {wpp_lib.pvqv_mode}', lambda: wpp_lib.get_pvqv(SimAuto))
     pvqv_df.to_csv(pvqv_fp, index=False)
+    pd.DataFrame(wpp_lib.result_cache_log).to_excel(writer, sheet_name='result_cache', index=False)
     
     print('06_create_giant_swing')
+    simauto_trace.set_stage('06_create_giant_swing')
     SimAuto.SaveState()
     swing_df = wpp_lib.create_giant_swing(SimAuto, fault_df)
     swing_df.to_excel(writer, sheet_name='swing', index=False)
@@ -105,6 +149,7 @@ if(__name__=='__main__'):
     wpp_lib.save_case(SimAuto, case_fp, case_format)
 
     print('07_create_distgen_XN_loads')
+    simauto_trace.set_stage('07_create_distgen_XN_loads')
     SimAuto.SaveState()
     distgen_loads_df = wpp_lib.create_distgen_XN_loads(SimAuto, gv_fps, case_fp)
     distgen_loads_df.to_excel(writer, sheet_name='distgen_loads', index=False)
@@ -115,6 +160,13 @@ if(__name__=='__main__'):
 
     wpp_lib.save_case(SimAuto, cur_dir / 'TopoSeed' / 'TopoSeed.pwb', case_format)
 
+    if trace_simauto:
+        SimAuto.export_timeline(trace_fp)
+        wpp_lib.df_dict_to_excel_workbook(trace_report_fp, {
+            'aggregate': SimAuto.aggregate_df()
+            ,'calls': SimAuto.calls_df()
+        })
+
     print('Cleaning up before exit.')
     try:
         writer.close()
@@ -1,11 +1,68 @@
 from pathlib import Path
+import functools
+import multiprocessing as mp
+import time
 import pandas as pd
-import win32com.client
 import Scripts.wpp_lib as wpp_lib
-SimAuto = win32com.client.Dispatch("pwrworld.SimulatorAuto")
+from Scripts import simauto_trace
+from Scripts import simauto_pool
+from Scripts import hour_scheduler
+from Scripts import warm_start
+from Scripts import hour_clusters
+# Created by script_simauto() in the process which scales the hours, not at import: the pool & hour processes 
+# import this script too, and each would otherwise start an extra PowerWorld instance. 
+SimAuto = None
 
 cur_dir = Path(__file__).parent
 
+# Reuse tables already extracted from unchanged PWBs/EPCs. 
+wpp_lib.case_cache_dir = cur_dir / 'Cache'
+# Only read buses near/over the mismatch threshold after each solve. 
+wpp_lib.convergence_check = 'filtered'
+# Test generator targets one at a time. 'grouped' tests groups of nearby units, bisecting only the groups which 
+# diverge, with far fewer solves, but a unit which only solves alongside its group (e.g. offsetting MW) passes. 
+wpp_lib.gen_test_mode = 'individual'
+# Scale with a variable step: larger while steps solve easily, smaller (retrying) when one doesn't. 
+wpp_lib.scaling_mode = 'adaptive'
+# Remember gen/load changes which diverged, so later hours exclude them without a solve. The file is per TopoSeed.pwb 
+# (known_bad_<hash>.csv), so a new seed case starts over. Delete the files to start over on the same one. 
+wpp_lib.known_bad_fp = cur_dir / 'Cache' / 'known_bad.csv'
+wpp_lib.known_bad_seed_fp = cur_dir / 'TopoSeed' / 'TopoSeed.pwb'
+
+# Switch shunts in planned sets, from each bus's dV/dQ sensitivity (pvqv.csv), instead of one per solve. 
+wpp_lib.shunt_dispatch_mode = 'sensitivity'
+
+# Recalculate the PVQV self-sensitivities for each hour, in-process, from the case it starts scaling from, instead of 
+# using TopoSeed's pvqv.csv for every hour. 
+pvqv_per_hour = True
+
+# Checkpoint the scaling of each hour every 10 minutes. An hour left unfinished (e.g. by a crash) resumes from its 
+# last checkpoint on the next run, and finished hours are skipped. Delete the hour's _checkpoint folder in Output, 
+# or its .pwb, to start it over. 
+wpp_lib.checkpoint_interval_seconds = 600
+resume_unfinished = True
+
+# Hours to run at once, each in its own process with its own SimAuto and worker pool. 1 runs them one at a time. 
+hour_workers = 1
+# SimAuto instances (licenses) available. Shared between the hour processes and their pool workers. 
+simauto_instance_limit = mp.cpu_count()
+
+# Start each hour from the finished hour (in Output) closest to its targets, if closer than TopoSeed, and scale 
+# only the difference. Compares against the most recently finished hours, up to this many. 
+warm_start_enabled = True
+warm_start_max_candidates = 720
+
+# Scale one hour per cluster of near-duplicate hours (same statuses, every gen/load within these tolerances). 
+# The other hours in the cluster start from its case, with its exclusions, and only scale the difference. 
+cluster_hours_enabled = True
+cluster_tolerance_mw = 5.0
+cluster_tolerance_mvar = 5.0
+# Processes which read the EPCs for clustering (1 = in this process). They don't start SimAuto. 
+cluster_workers = mp.cpu_count()
+
+# Record every SimAuto call, to find where the time goes. Writes a timeline & aggregate table per hour. 
+trace_simauto = False
+
 case_format = 'PWB23'
 
 # ------------------ Inputs ------------------
@@ -16,33 +73,121 @@ pw_fp = cur_dir / 'TopoSeed' / 'TopoSeed.pwb'
 fault_fp = cur_dir / 'TopoSeed' / 'fault_duty.csv'
 pvqv_fp = cur_dir / 'TopoSeed' / 'pvqv.csv'
 toposeed_log_fp = cur_dir / 'TopoSeed' / 'TopoSeed_Log.xlsx'
+# Seconds taken by each hour, to run the longest first. 
+hour_seconds_fp = cur_dir / 'Output' / 'hour_seconds.csv'
+# Clusters of near-duplicate hours, and which hours reused which result. 
+hour_clusters_fp = cur_dir / 'Output' / 'hour_clusters.xlsx'
 
-def create_case(SimAuto, gv_fp, pw_fp):
+def script_simauto():
+    # Set WPP_SIMAUTO_RECORD / WPP_SIMAUTO_REPLAY to record this run, or replay it without PowerWorld (see wpp_lib.py). 
+    SimAuto = wpp_lib.dispatch_simauto('02_load_and_gen_scaling')
+    if trace_simauto:
+        SimAuto = simauto_trace.TracedSimAuto(SimAuto)
+    return SimAuto
+
+def set_stage(gv_fp, stage: str):
+    # For the trace, and the status display when hours run in parallel. 
+    simauto_trace.set_stage(f'{gv_fp.stem} / {stage}')
+    hour_scheduler.report_stage(stage)
+    return
+
+def state_fp(hour: str) -> Path:
+    # MW of each gen & load in an hour's finished case, for warm starts. Written after the case. 
+    return cur_dir / 'Output' / (hour + '_05_State.pkl')
+
+def exclusions_fp(hour: str) -> Path:
+    # Gens & loads an hour excluded, for the other hours in its cluster. Written after the case. 
+    return cur_dir / 'Output' / (hour + '_06_Exclusions.pkl')
+
+def hour_finished(gv_fp) -> bool:
+    # The hour's case & exclusions were saved (the state vector isn't, for hours which dropped branches), after its EPC changed. 
+    case_fp = cur_dir / 'Output' / (gv_fp.stem + '.pwb')
+    return case_fp.exists() and exclusions_fp(gv_fp.stem).exists() and case_fp.stat().st_mtime >= Path(gv_fp).stat().st_mtime
+
+def swing_unit():
+    # BusNum & ID of the giant swing created by 01. 
+    swing_df = pd.read_excel(toposeed_log_fp, sheet_name='swing')
+    return [swing_df.loc[swing_df.index[0], 'BusNum'], swing_df.loc[swing_df.index[0], 'ID']]
+
+def warm_start_candidates(gv_fp) -> dict[str,Path]:
+    # Finished hours other than this one, most recent first. 
+    fps = [fp for fp in (cur_dir / 'Output').glob('*_05_State.pkl') if fp.name != state_fp(gv_fp.stem).name]
+    fps = sorted(fps, key=lambda fp: fp.stat().st_mtime, reverse=True)[:warm_start_max_candidates]
+    return {fp.name[:-len('_05_State.pkl')]: fp for fp in fps}
+
+def prepare_targets(SimAuto, gv_fp, pw_fp, pool = None, representative: str = None):
+    # Gen & load targets for the hour, with the gen targets tested, and the PVQV results to exclude by. 
+    # Also returns the case to start scaling from (pw_fp, or a warm start), and the step_scale for it. 
+    # representative: The finished hour this one is a near-duplicate of, to start from without testing. 
     target_fp = cur_dir / 'Output' / (gv_fp.stem + '_01_Target.xlsx')
     target_test_fp = cur_dir / 'Output' / (gv_fp.stem + '_02_TargetTest.xlsx')
-    scale_log_fp = cur_dir / 'Output' / (gv_fp.stem + '_03_ScaleLog.xlsx')
 
     print('compute_pw_targets')
+    set_stage(gv_fp, 'compute_pw_targets')
     [gen_target_df, load_target_df] = wpp_lib.compute_pw_targets(SimAuto, gv_fp, pw_fp)
+    target_dict = {}
+    start_fp = pw_fp
+    step_scale = 1.0
+    warm_name = None
+    if representative is not None and exclusions_fp(representative).exists() and state_fp(representative).exists():
+        candidates = {representative: state_fp(representative)}
+    elif warm_start_enabled:
+        candidates = warm_start_candidates(gv_fp)
+    else:
+        candidates = None
+    if candidates is not None:
+        [warm_name, target_dict['warm_start']] = warm_start.select(gen_target_df, load_target_df, candidates)
+        print(target_dict['warm_start'].head(3))
+        if warm_name is not None:
+            # Scale the smaller change in larger steps (as a fraction of it), so each step moves as many MW as usual. 
+            distance = target_dict['warm_start'].set_index('Case')['DistanceMW']
+            step_scale = distance['(seed)'] / max(distance[warm_name], 1e-6)
+            print(f'Warm start from {warm_name}: {distance[warm_name]:.0f} MW to change, instead of {distance["(seed)"]:.0f} MW.')
+            start_fp = cur_dir / 'Output' / (warm_name + '.pwb')
+            [gen_target_df, load_target_df] = wpp_lib.compute_pw_targets(SimAuto, gv_fp, start_fp)
+            # STATCOMs added while scaling the earlier hour aren't in the EPC. Leave them as they are. 
+            # They share the ID "xx" with the giant swing, which is handled below. 
+            [swing_bus, swing_id] = swing_unit()
+            statcoms = (gen_target_df['ID'] == 'xx') & ~((gen_target_df['BusNum'] == swing_bus) & (gen_target_df['ID'] == swing_id))
+            gen_target_df.loc[statcoms, 'Status_Target'] = gen_target_df.loc[statcoms, 'Status']
+            gen_target_df.loc[statcoms, ['MWSetPoint_Target', 'Include', 'ExclusionReason']] = [0, False, 'STATCOM']
+    reused = warm_name is not None and warm_name == representative
+    if reused:
+        print(f'Reusing the result of {representative}, a near-duplicate hour.')
+        hour_clusters.apply_exclusions(exclusions_fp(representative), gen_target_df, load_target_df, representative)
     wpp_lib.df_dict_to_excel_workbook(target_fp, {
         'gen':gen_target_df
         ,'load':load_target_df
-    })
+    } | target_dict)
 
     print('test_gen_targets_parallel')
-    gen_target_df = wpp_lib.test_gen_targets_parallel(pw_fp, gen_target_df)
-    wpp_lib.df_dict_to_excel_workbook(target_test_fp, {
+    set_stage(gv_fp, 'test_gen_targets_parallel')
+    if reused:
+        # The representative's tests cover changes this small. Its failures are excluded above. 
+        gen_target_df['Success'] = True
+        wpp_lib.gen_test_summary.clear()
+        wpp_lib.gen_test_summary.update({'Mode': f'reused {representative}', 'Generators': len(gen_target_df), 'Failed': 0, 'Solves': 0, 'BaselineSolves': len(gen_target_df)})
+    elif start_fp == pw_fp:
+        gen_target_df = wpp_lib.test_gen_targets_parallel(pw_fp, gen_target_df, pool)
+    else:
+        # The pool has TopoSeed open. Only the generators which change are tested, and a warm start is close to its 
+        # targets, so test those few on the warm case here. 
+        gen_target_df = wpp_lib.test_gen_targets_parallel(start_fp, gen_target_df, SimAuto=SimAuto)
+        SimAuto.CloseCase()
+    target_test_dict = {
         'gen':gen_target_df
-    })
+        ,'summary':pd.DataFrame([wpp_lib.gen_test_summary])
+    }
+    if pool is not None and start_fp == pw_fp:
+        target_test_dict['workers'] = pool.utilization_df()
+    wpp_lib.df_dict_to_excel_workbook(target_test_fp, target_test_dict)
     
     # Exclude generation changes which do not solve successfully on their own. 
     gen_target_df.loc[gen_target_df['Success'] == False, ['Include', 'ExclusionReason']] = [False, 'Individual Gen Test Diverged']
 
     # Don't adjust the swing unit. 
     print('get_swing')
-    swing_df = pd.read_excel(toposeed_log_fp, sheet_name='swing')
-    swing_bus = swing_df.loc[swing_df.index[0], 'BusNum']
-    swing_id = swing_df.loc[swing_df.index[0], 'ID']
+    [swing_bus, swing_id] = swing_unit()
     gen_target_df.loc[
         (gen_target_df['BusNum'] == swing_bus) & (gen_target_df['ID'] == swing_id), 
         ['Status_Target', 'Include', 'ExclusionReason']
@@ -50,25 +195,124 @@ def create_case(SimAuto, gv_fp, pw_fp):
     
     print('get_pvqv_csv')
     pvqv_df = pd.read_csv(pvqv_fp)
+    return [gen_target_df, load_target_df, pvqv_df, start_fp, step_scale]
+
+def create_case(SimAuto, gv_fp, pw_fp, pool = None, representative: str = None):
+    scale_log_fp = cur_dir / 'Output' / (gv_fp.stem + '_03_ScaleLog.xlsx')
+    trace_fp = cur_dir / 'Output' / (gv_fp.stem + '_04_Trace.json')
+    trace_report_fp = cur_dir / 'Output' / (gv_fp.stem + '_04_Trace.xlsx')
+    checkpoint_dir = cur_dir / 'Output' / (gv_fp.stem + '_checkpoint')
+
+    wpp_lib.solve_log.clear()
+    wpp_lib.shunt_dispatch_log.clear()
+    wpp_lib.get_param_search().reset_counters()
+    if trace_simauto:
+        SimAuto.reset()
+
+    resume_state = wpp_lib.load_checkpoint(checkpoint_dir) if resume_unfinished else None
+    if resume_state is not None:
+        # The targets & tests were finished before the checkpoint. Continue scaling from it. 
+        print(f'Resuming unfinished hour {gv_fp.stem} from its checkpoint.')
+        scale_fp = resume_state['case_fp']
+        gen_target_df = resume_state['gen']
+        load_target_df = resume_state['load']
+        pvqv_df = pd.read_csv(pvqv_fp)
+        step_scale = 1.0 # The checkpoint has its own. 
+    else:
+        [gen_target_df, load_target_df, pvqv_df, scale_fp, step_scale] = prepare_targets(SimAuto, gv_fp, pw_fp, pool, representative)
 
     print('iterate_to_gen_load_targets')
+    set_stage(gv_fp, 'iterate_to_gen_load_targets')
     wpp_lib.report_gen_load_balance(gen_target_df, load_target_df)
-    if not wpp_lib.open_case(SimAuto, pw_fp):
+    if not wpp_lib.open_case(SimAuto, scale_fp):
         raise
-    scalelog_dict = wpp_lib.iterate_to_gen_load_targets(SimAuto, gen_target_df, load_target_df, pvqv_df)
+    if pvqv_per_hour:
+        print('get_pvqv')
+        set_stage(gv_fp, 'get_pvqv')
+        pvqv_df = wpp_lib.get_pvqv(SimAuto, 'local')
+    scalelog_dict = wpp_lib.iterate_to_gen_load_targets(SimAuto, gen_target_df, load_target_df, pvqv_df, 
+                                                        checkpoint_dir=checkpoint_dir, resume_state=resume_state, case_format=case_format, 
+                                                        step_scale=step_scale)
+    scalelog_dict['solve_log'] = wpp_lib.solve_log_df()
+    scalelog_dict['param_search'] = wpp_lib.get_param_search().counters_df()
+    scalelog_dict['shunts'] = pd.DataFrame(wpp_lib.shunt_dispatch_log, columns=['Mode', 'Solves', 'Switched', 'Rejected', 'OutOfBandBuses'])
     wpp_lib.df_dict_to_excel_workbook(scale_log_fp, scalelog_dict)
-    wpp_lib.save_case(SimAuto, cur_dir / 'Output' / (gv_fp.stem + '.pwb'),case_format)
+    if wpp_lib.save_case(SimAuto, cur_dir / 'Output' / (gv_fp.stem + '.pwb'),case_format):
+        wpp_lib.clear_checkpoint(checkpoint_dir)
+        hour_clusters.save_exclusions(exclusions_fp(gv_fp.stem), gen_target_df, load_target_df)
+        # A case with dropped branches has collapsed sections (and their gen & load) out of service. Later hours 
+        # would inherit them, so it isn't offered as a warm start. 
+        dropped = set(scalelog_dict['dropped_branch_df']['ObjectID']) - {0}
+        if len(dropped) == 0:
+            warm_start.save_vector(state_fp(gv_fp.stem), warm_start.mw_vector(gen_target_df, load_target_df))
+        else:
+            print(f'{len(dropped)} branches were dropped. Not offering this hour as a warm start.')
+            state_fp(gv_fp.stem).unlink(missing_ok=True)
+
+    if trace_simauto:
+        SimAuto.export_timeline(trace_fp)
+        wpp_lib.df_dict_to_excel_workbook(trace_report_fp, {
+            'aggregate': SimAuto.aggregate_df()
+        })
 
     # Exit. 
     SimAuto.CloseCase()
     return
 
+def run_hour(pool, gv_fp, representatives: dict[str,str] = None):
+    # One hour in an hour process, with its own SimAuto (started by its first hour) & pool. Recordings are per hour. 
+    global SimAuto
+    if SimAuto is None:
+        SimAuto = script_simauto()
+    wpp_lib.set_simauto_session(SimAuto, f'02_load_and_gen_scaling_{gv_fp.stem}')
+    create_case(SimAuto, gv_fp, pw_fp, pool, (representatives or {}).get(gv_fp.stem))
+    return
+
 if(__name__=='__main__'):
-    for gv_fp in gv_dir.glob('*.epc'):
-        gv_fp = Path(gv_fp)
-        create_case(SimAuto, gv_fp, pw_fp)
+    # Chronological order, so each cluster's representative is its first hour. 
+    gv_fps = sorted(Path(gv_fp) for gv_fp in gv_dir.glob('*.epc'))
+    representatives: dict[str,str] = {}
+    if cluster_hours_enabled:
+        print('cluster_hours')
+        cluster_df = hour_clusters.cluster_hours(gv_fps, cluster_tolerance_mw, cluster_tolerance_mvar, cluster_workers)
+        representatives = {hour: rep for hour, rep in zip(cluster_df['Hour'], cluster_df['Representative']) if hour != rep}
+        print(f'{len(gv_fps)} hours in {cluster_df["Cluster"].nunique()} clusters.')
+    # Representatives (and unclustered hours) first, then the hours which reuse their results. 
+    phases = [[fp for fp in gv_fps if fp.stem not in representatives], [fp for fp in gv_fps if fp.stem in representatives]]
+    if resume_unfinished:
+        # Finished hours still count as representatives, since their results are reused from Output. 
+        finished = [fp.stem for fp in gv_fps if hour_finished(fp)]
+        if len(finished) > 0:
+            print(f'Skipping {len(finished)} hours already finished in Output.')
+        phases = [[fp for fp in phase if fp.stem not in finished] for phase in phases]
+
+    if hour_workers > 1:
+        [num_hour_workers, num_pool_workers] = hour_scheduler.split_instances(simauto_instance_limit, hour_workers)
+        print(f'{num_hour_workers} hours at once, with {num_pool_workers} pool workers each.')
+        for phase in phases:
+            if len(phase) == 0:
+                continue
+            hour_df = hour_scheduler.run_hours(functools.partial(run_hour, representatives=representatives), phase, num_hour_workers, 
+                                               context_factory=functools.partial(simauto_pool.SimAutoPool, pw_fp, num_pool_workers), 
+                                               durations_fp=hour_seconds_fp, log_dir=cur_dir / 'Output')
+            print(hour_df[['Hour', 'Worker', 'Seconds', 'Ok']])
+    else:
+        # One set of SimAuto workers for every hour, each keeping TopoSeed.pwb open. 
+        SimAuto = script_simauto()
+        with simauto_pool.SimAutoPool(pw_fp) as pool:
+            for gv_fp in phases[0] + phases[1]:
+                start = time.time()
+                create_case(SimAuto, gv_fp, pw_fp, pool, representatives.get(gv_fp.stem))
+                hour_scheduler.save_duration(hour_seconds_fp, gv_fp.stem, time.time() - start)
+
+    if cluster_hours_enabled:
+        # A member reused its representative's result if the representative finished first. 
+        cluster_df['Reused'] = cluster_df['Hour'].isin(representatives.keys()) & cluster_df['Representative'].map(lambda rep: exclusions_fp(rep).exists())
+        wpp_lib.df_dict_to_excel_workbook(hour_clusters_fp, {
+            'hours': cluster_df
+            ,'clusters': hour_clusters.cluster_summary_df(cluster_df)
+        })
 
     SimAuto = None
     print('done')
 
-
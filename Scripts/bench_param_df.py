@@ -0,0 +1,65 @@
+"""
+Benchmark for the SimAuto -> DataFrame conversion in get_param_df().
+Compares convert_param_rows() against the original cell-by-cell conversion, on a synthetic
+table shaped like the bus_params/gen_params reads in get_case_data() (20k rows, 60 columns).
+Run from the repository root:
+    python -m Scripts.bench_param_df
+"""
+import time
+import numpy as np
+import pandas as pd
+import Scripts.wpp_lib as wpp_lib
+
+def legacy_convert_param_rows(rows, parameter_type: dict[str,type]) -> pd.DataFrame:
+    # The original get_param_df() conversion path.
+    parameter_list: list[str] = list(parameter_type.keys())
+    df = pd.DataFrame(data=rows, columns=parameter_list)
+    cell_map = df.map if hasattr(df, 'map') else df.applymap
+    df = cell_map(lambda x: x.strip() if isinstance(x, str) else x)
+    for parameter in parameter_list:
+        if(parameter_type[parameter] in [int, float]):
+            df[parameter] = pd.to_numeric(df[parameter], errors='coerce')
+        else:
+            df[parameter] = df[parameter].astype(parameter_type[parameter])
+    return df
+
+def synthetic_rows(num_rows: int = 20000, num_cols: int = 60, seed: int = 0):
+    # Mix of types, padded like SimAuto output, with some blank numeric cells.
+    rng = np.random.default_rng(seed)
+    parameter_type: dict[str,type] = {}
+    columns = []
+    for i in range(num_cols):
+        kind = [str, int, float][i % 3]
+        parameter_type[f'Field{i}'] = kind
+        if kind == str:
+            values = np.char.add(np.char.add('  NAME', rng.integers(0, 10000, num_rows).astype(str)), '   ')
+        elif kind == int:
+            values = np.char.add(' ', rng.integers(1, 100000, num_rows).astype(str))
+        else:
+            values = np.char.add(' ', np.round(rng.normal(0, 100, num_rows), 4).astype(str))
+            values[rng.random(num_rows) < 0.01] = ''
+        columns.append(values.tolist())
+    rows = tuple(zip(*columns))
+    return rows, parameter_type
+
+def time_call(fn, *args, repeat: int = 3) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+if(__name__=='__main__'):
+    rows, parameter_type = synthetic_rows()
+    print(f'Rows: {len(rows)}, Columns: {len(parameter_type)}')
+
+    legacy_df = legacy_convert_param_rows(rows, parameter_type)
+    new_df = wpp_lib.convert_param_rows(rows, parameter_type)
+    pd.testing.assert_frame_equal(legacy_df, new_df, check_dtype=False)
+
+    legacy_s = time_call(legacy_convert_param_rows, rows, parameter_type)
+    new_s = time_call(wpp_lib.convert_param_rows, rows, parameter_type)
+    print(f'legacy (applymap + to_numeric): {legacy_s:.3f} s')
+    print(f'convert_param_rows:             {new_s:.3f} s')
+    print(f'speedup: {legacy_s / new_s:.1f}x')
@@ -0,0 +1,209 @@
+from pathlib import Path
+import hashlib
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+
+# On-disk cache of extracted case tables.
+# Each entry is keyed by the content hash of the source files (PWB, EPC, AUX) plus the requested
+# table, parameter schema and filter. An entry is a directory holding one .npy file per column,
+# which are loaded back with memory mapping, and a manifest.json with the column order and types.
+# The least recently used entries are evicted once the cache grows past max_bytes.
+# Results calculated from a case (e.g. fault duty) are cached the same way, keyed by a fingerprint of the case's
+# tables instead of its files (see fingerprint_tables() & cached_result()).
+
+manifest_name = 'manifest.json'
+
+# Content hashes, memoized per (path, size, modified time) so a file is only hashed once per process.
+_hash_memo: dict[tuple,str] = {}
+
+def hash_file(fp: Path, chunk_size: int = 1 << 20) -> str:
+    fp = Path(fp).resolve()
+    stat = fp.stat()
+    memo_key = (str(fp), stat.st_size, stat.st_mtime_ns)
+    if memo_key in _hash_memo:
+        return _hash_memo[memo_key]
+
+    h = hashlib.sha256()
+    with open(fp, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    _hash_memo[memo_key] = h.hexdigest()
+    return _hash_memo[memo_key]
+
+def make_key(source_fps: list[Path], table: str, parameter_type: dict[str,type] = None, filter_group: str = '', tag: str = '') -> str:
+    """
+    Cache key for one table extracted from a set of source files.
+    Any change to the file contents, the table, the parameter names/types, the filter, or the tag gives a new key.
+    """
+    schema = None
+    if parameter_type is not None:
+        schema = [[name, ptype.__name__] for name, ptype in parameter_type.items()]
+    key_data = {
+        'sources': [hash_file(fp) for fp in source_fps]
+        ,'table': table
+        ,'schema': schema
+        ,'filter': filter_group
+        ,'tag': tag
+    }
+    return hashlib.sha256(json.dumps(key_data, sort_keys=True).encode('utf-8')).hexdigest()
+
+def load(cache_dir: Path, key: str) -> pd.DataFrame:
+    """
+    Returns the cached DataFrame, or None on a miss.
+    Numeric columns are memory mapped from disk.
+    """
+    entry_dir = Path(cache_dir) / key
+    manifest_fp = entry_dir / manifest_name
+    if not manifest_fp.exists():
+        return None
+
+    try:
+        manifest = json.loads(manifest_fp.read_text(encoding='utf-8'))
+        data = {}
+        for i, column in enumerate(manifest['columns']):
+            arr = np.load(entry_dir / f'{i}.npy', mmap_mode='r')
+            if manifest['kinds'][i] == 'str':
+                data[column] = pd.Series(arr.astype(object), dtype=object).astype(str)
+            else:
+                data[column] = arr
+        df = pd.DataFrame(data, columns=manifest['columns'])
+    except (OSError, ValueError, KeyError):
+        # Partially written or corrupt entry. Treat as a miss.
+        return None
+
+    # Mark as recently used, for LRU eviction.
+    os.utime(manifest_fp)
+    return df
+
+def store(cache_dir: Path, key: str, df: pd.DataFrame, max_bytes: int = None):
+    """
+    Writes a DataFrame into the cache, then evicts least recently used entries beyond max_bytes.
+    The index is not stored; cached tables are returned with a default RangeIndex.
+    """
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    entry_dir = cache_dir / key
+    tmp_dir = cache_dir / f'{key}.tmp{os.getpid()}'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir()
+
+    kinds: list[str] = []
+    for i, column in enumerate(df.columns):
+        series = df[column]
+        if pd.api.types.is_bool_dtype(series) or pd.api.types.is_numeric_dtype(series):
+            arr = series.to_numpy()
+            kinds.append(arr.dtype.str)
+        else:
+            # Fixed width unicode, so strings can be memory mapped too.
+            arr = series.astype(str).to_numpy().astype(np.str_)
+            kinds.append('str')
+        np.save(tmp_dir / f'{i}.npy', arr, allow_pickle=False)
+
+    manifest = {'columns': [str(c) for c in df.columns], 'kinds': kinds}
+    (tmp_dir / manifest_name).write_text(json.dumps(manifest), encoding='utf-8')
+
+    # Publish the entry in one step, so readers never see a partial entry.
+    if entry_dir.exists():
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    else:
+        try:
+            os.replace(tmp_dir, entry_dir)
+        except OSError:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    if max_bytes is not None:
+        evict(cache_dir, max_bytes)
+    return
+
+def entry_size(entry_dir: Path) -> int:
+    return sum(f.stat().st_size for f in entry_dir.iterdir() if f.is_file())
+
+def evict(cache_dir: Path, max_bytes: int) -> list[str]:
+    """
+    Deletes least recently used entries until the cache is no larger than max_bytes.
+    Returns the keys which were evicted.
+    """
+    entries = []
+    for entry_dir in Path(cache_dir).iterdir():
+        manifest_fp = entry_dir / manifest_name
+        if entry_dir.is_dir() and manifest_fp.exists():
+            entries.append((manifest_fp.stat().st_mtime, entry_size(entry_dir), entry_dir))
+
+    total = sum(size for _, size, _ in entries)
+    evicted: list[str] = []
+    for _, size, entry_dir in sorted(entries, key=lambda e: e[0]):
+        if total <= max_bytes:
+            break
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        total -= size
+        evicted.append(entry_dir.name)
+    return evicted
+
+def cached_tables(cache_dir: Path, source_fps: list[Path], requests: dict[str,tuple], extract, max_bytes: int = None, tag: str = '') -> dict[str,pd.DataFrame]:
+    """
+    Returns a DataFrame for each request, from the cache where possible.
+    requests: {name: (table, parameter_type, filter_group)}
+    extract: Called once with the list of names which missed the cache, returning {name: DataFrame}.
+    With no cache_dir, every request is extracted.
+    """
+    if cache_dir is None or source_fps is None:
+        return extract(list(requests.keys()))
+
+    keys = {name: make_key(source_fps, *request, tag=tag) for name, request in requests.items()}
+    results: dict[str,pd.DataFrame] = {}
+    missing: list[str] = []
+    for name, key in keys.items():
+        df = load(cache_dir, key)
+        if df is None:
+            missing.append(name)
+        else:
+            results[name] = df
+
+    hit_names = [name for name in requests if name not in missing]
+    print(f'Table cache: {len(hit_names)} hit(s) {hit_names}, {len(missing)} miss(es) {missing}')
+
+    if len(missing) > 0:
+        extracted = extract(missing)
+        for name in missing:
+            df = extracted[name].reset_index(drop=True)
+            store(cache_dir, keys[name], df, max_bytes)
+            results[name] = df
+
+    return {name: results[name] for name in requests}
+
+def fingerprint_tables(tables: dict[str,pd.DataFrame], decimals: int = 6) -> str:
+    """
+    Content hash of a set of tables ({name: DataFrame}), e.g. the topology, impedances, dispatch & solution of a case.
+    Floats are rounded to decimals, so the same case solved the same way again has the same fingerprint. Any other
+    change to a value, row, column, or table gives a new one.
+    """
+    h = hashlib.sha256()
+    for name in sorted(tables.keys()):
+        df = tables[name].reset_index(drop=True)
+        df = df[sorted(df.columns, key=str)]
+        for column in df.columns:
+            if pd.api.types.is_float_dtype(df[column]):
+                df[column] = df[column].round(decimals)
+            elif not (pd.api.types.is_bool_dtype(df[column]) or pd.api.types.is_integer_dtype(df[column])):
+                df[column] = df[column].astype(str)
+        h.update(json.dumps([name, [str(c) for c in df.columns], len(df)]).encode('utf-8'))
+        h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+def cached_result(cache_dir: Path, fingerprint: str, name: str, compute, max_bytes: int = None) -> tuple[pd.DataFrame,bool]:
+    """
+    Returns (the result called name for the case with this fingerprint, True if it came from the cache).
+    compute: Called on a miss, returning the DataFrame to store. With no cache_dir, it is always called.
+    """
+    if cache_dir is None:
+        return compute(), False
+    key = hashlib.sha256(json.dumps({'fingerprint': fingerprint, 'result': name}, sort_keys=True).encode('utf-8')).hexdigest()
+    df = load(cache_dir, key)
+    if df is not None:
+        return df, True
+    df = compute().reset_index(drop=True)
+    store(cache_dir, key, df, max_bytes)
+    return df, False
@@ -0,0 +1,164 @@
+from pathlib import Path
+import math
+import os
+import pandas as pd
+
+# Delta debugging (ddmin) search for changes which cause divergence.
+# A batch of changes (e.g. generator statuses) is applied at once. If the case doesn't solve, ddmin splits the
+# batch k ways, testing each part and then each complement, to find a minimal failing subset. One change from
+# it is rejected, along with any change seen to diverge on its own, and the rest of the batch is tried again, until
+# the remainder solves. Test results are kept until the case changes, so a later search starts from the smallest
+# failing set already found, and sets within a solved set (or containing a failing set) aren't solved again.
+# Known-bad changes (keyed by table, ObjectID, and target value) are rejected without a solve, and can be kept
+# in a CSV file across hours & runs. Known-good changes are tried first, as their own batch.
+
+class FailureSearch:
+    """
+    Finds the changes in a batch which can't be applied without divergence, and remembers them.
+    granularity: Number of parts the failing set is first split into (k).
+    known_bad_fp: Optional CSV file to load the known-bad changes from, and save them to.
+    """
+    counter_names = ['Calls', 'Changes', 'Solves', 'CachedTests', 'KnownBadSkipped', 'Rejected', 'SolvesSaved']
+
+    def __init__(self, granularity: int = 4, known_bad_fp: Path = None):
+        self.granularity = max(2, granularity)
+        self.known_bad_fp = None if known_bad_fp is None else Path(known_bad_fp)
+        self.known_bad: set[tuple[str,str,str]] = set()
+        self.known_good: set[tuple[str,str,str]] = set()
+        self.counters: dict[str,int] = {}
+        self.reset_counters()
+        if self.known_bad_fp is not None and self.known_bad_fp.exists():
+            known_df = pd.read_csv(self.known_bad_fp, dtype=str, keep_default_na=False)
+            self.known_bad = set(known_df[['Table', 'ObjectID', 'Value']].itertuples(index=False, name=None))
+
+    def reset_counters(self):
+        """Zeroes the counters, e.g. at the start of each hour."""
+        self.counters = {name: 0 for name in self.counter_names}
+
+    def counters_df(self) -> pd.DataFrame:
+        return pd.DataFrame([self.counters], columns=self.counter_names)
+
+    def save_known_bad(self):
+        if self.known_bad_fp is None:
+            return
+        self.known_bad_fp.parent.mkdir(parents=True, exist_ok=True)
+        # Other processes (e.g. hours run in parallel) may have added to the file. Keep theirs too, and replace
+        # the file in one step, so it's never read half-written.
+        if self.known_bad_fp.exists():
+            known_df = pd.read_csv(self.known_bad_fp, dtype=str, keep_default_na=False)
+            self.known_bad.update(known_df[['Table', 'ObjectID', 'Value']].itertuples(index=False, name=None))
+        known_df = pd.DataFrame(sorted(self.known_bad), columns=['Table', 'ObjectID', 'Value'])
+        temp_fp = self.known_bad_fp.with_name(f'{self.known_bad_fp.name}.{os.getpid()}.tmp')
+        known_df.to_csv(temp_fp, index=False)
+        os.replace(temp_fp, self.known_bad_fp)
+
+    def run(self, keys: list[tuple[str,str,str]], test) -> tuple[list,list]:
+        """
+        keys: (table, ObjectID, target value) of each change, unique.
+        test(keys, keep) -> bool: Applies these changes to the current case and solves. If it solves and keep is True,
+            the changes are kept (the new current case). Otherwise the case is returned to how it was.
+        Returns (rejected, rejected without a solve because they were known bad). Every other change has been kept.
+        """
+        self.counters['Calls'] += 1
+        self.counters['Changes'] += len(keys)
+        skipped = [key for key in keys if key in self.known_bad]
+        self.counters['KnownBadSkipped'] += len(skipped)
+        # Isolating one failure by halving costs about one solve for the batch, and two per halving.
+        self.counters['SolvesSaved'] += len(skipped) * (1 + 2 * math.ceil(math.log2(max(len(keys), 2))))
+
+        remaining = [key for key in keys if key not in self.known_bad]
+        rejected: list = []
+        for batch in [[key for key in remaining if key in self.known_good], [key for key in remaining if key not in self.known_good]]:
+            rejected += self.apply_batch(batch, test)
+
+        if len(rejected) > 0:
+            self.save_known_bad()
+        return rejected, skipped
+
+    def apply_batch(self, batch: list, test) -> list:
+        # Keeps as much of the batch as solves. Returns the rejected keys.
+        # The case only changes when the remaining batch solves (and the loop ends), so the test results are kept
+        # across the rejections: each isolation starts from the smallest failing set already seen.
+        rejected: list = []
+        results: dict[frozenset,bool] = {}
+        while len(batch) > 0:
+            failing = self.known_failing(batch, results)
+            if failing is None:
+                self.counters['Solves'] += 1
+                if test(batch, True):
+                    self.known_good.update(batch)
+                    break
+                results[frozenset(batch)] = False
+                failing = batch
+            bad = [self.isolate(failing, test, results)]
+            # Changes which diverged on their own are rejected too, without isolating each again.
+            bad += [key for key in batch if key != bad[0] and results.get(frozenset([key])) is False]
+            for key in bad:
+                rejected.append(key)
+                self.known_bad.add(key)
+                self.known_good.discard(key)
+            self.counters['Rejected'] += len(bad)
+            bad = set(bad)
+            batch = [key for key in batch if key not in bad]
+        return rejected
+
+    def known_failing(self, batch: list, results: dict[frozenset,bool]) -> list:
+        # The smallest set already seen to diverge which is within the batch (in batch order), or None.
+        batch_set = frozenset(batch)
+        subsets = [subset for subset, ok in results.items() if not ok and subset <= batch_set]
+        if len(subsets) == 0:
+            return None
+        smallest = min(subsets, key=len)
+        self.counters['CachedTests'] += 1
+        self.counters['SolvesSaved'] += 1
+        return [key for key in batch if key in smallest]
+
+    def isolate(self, failing: list, test, results: dict[frozenset,bool] = None):
+        """
+        ddmin: reduces a failing batch to a 1-minimal failing subset, and returns the change to reject from it
+        (the last, so earlier changes are kept, as when halving). Tests are never kept.
+        results: Test results from the same case, {frozenset(keys): solved}, which are reused and added to.
+        """
+        if results is None:
+            results = {}
+        results[frozenset(failing)] = False
+
+        def solves(keys: list) -> bool:
+            subset = frozenset(keys)
+            if subset not in results:
+                # As ddmin assumes: a set within one which solved solves, and one containing a failing set fails.
+                for seen, ok in results.items():
+                    if (ok and subset <= seen) or (not ok and seen <= subset):
+                        results[subset] = ok
+                        break
+            if subset in results:
+                self.counters['CachedTests'] += 1
+                self.counters['SolvesSaved'] += 1
+                return results[subset]
+            self.counters['Solves'] += 1
+            results[subset] = test(keys, False)
+            return results[subset]
+
+        n = min(self.granularity, len(failing))
+        while len(failing) > 1:
+            size = math.ceil(len(failing) / n)
+            parts = [failing[i:i + size] for i in range(0, len(failing), size)]
+            reduced = False
+            # A part which fails on its own.
+            for part in parts:
+                if not solves(part):
+                    failing, n, reduced = part, min(self.granularity, len(part)), True
+                    break
+            # A complement which fails: one part isn't needed for the failure.
+            if not reduced and len(parts) > 2:
+                for part in parts:
+                    part_keys = set(part)
+                    complement = [key for key in failing if key not in part_keys]
+                    if not solves(complement):
+                        failing, n, reduced = complement, max(len(parts) - 1, 2), True
+                        break
+            if not reduced:
+                if len(parts) >= len(failing):
+                    break
+                n = min(len(failing), 2 * len(parts))
+        return failing[-1]
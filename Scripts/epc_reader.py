@@ -0,0 +1,407 @@
+from pathlib import Path
+import re
+import numpy as np
+import pandas as pd
+
+# Native reader for GE PSLF EPC files, such as the hour snapshots exported from GridView.
+# Reads the bus, generator, load, branch, and transformer sections straight from disk, and
+# returns DataFrames with PowerWorld field names so they can stand in for get_param_df().
+# This module does not depend on SimAuto, so it can be used (and tested) on any platform.
+
+# Bump when the parsed output changes, so cached tables from older versions are not reused.
+reader_version = 1
+
+# Section header, e.g. 'generator data  [   1234]     id   long_id_    st ---no--- reg_name ...'
+header_re = re.compile(r'^([A-Za-z][A-Za-z0-9_ \-]*?)\s+data\s*\[\s*(\d+)\s*\](.*)$')
+# Tokens: quoted strings, the key/data separator, or anything else separated by whitespace.
+token_re = re.compile(r'"[^"]*"|:|[^\s:"]+')
+
+# Free-text blocks which run until a line starting with '!'.
+text_blocks = ['title', 'comments', 'solution parameters']
+
+# Layout of each supported section.
+#   key_tokens: number of tokens before the ':' separator.
+#   key_names: names of the non-bus tokens in the key, which also lead the section header.
+#   header: default column names for the data after ':', used when the file header is blank.
+#   ignore: header words which are group labels, and have no token of their own.
+# A header word of dashes (e.g. '---no---') means the next name is a bus reference,
+# which takes 3 tokens in the record: number, "name", kV.
+epc_layouts: dict[str,dict[str,object]] = {
+    'bus': {
+        'key_tokens': 3
+        ,'key_names': []
+        ,'header': 'ty vsched volt angle ar zone vmax vmin date_in date_out pid L own st latitude longitude island sdmon vmax1 vmin1 dvmax'
+        ,'ignore': []
+    }
+    ,'generator': {
+        'key_tokens': 5
+        ,'key_names': ['id', 'long_id_']
+        ,'header': 'st ---no--- reg_name prf qrf ar zone pgen pmax pmin qgen qmax qmin mbase cmp_r cmp_x gen_r gen_x hbus tbus date_in date_out pid N rtran xtran gtap'
+        ,'ignore': []
+    }
+    ,'load': {
+        'key_tokens': 5
+        ,'key_names': ['id', 'long_id_']
+        ,'header': 'st mw mvar mw_i mvar_i mw_z mvar_z ar zone date_in date_out pid N own sdmon nonc thr_bus flg type dtype dyn_flag dgenp dgenq dgenm'
+        ,'ignore': []
+    }
+    ,'branch': {
+        'key_tokens': 9
+        ,'key_names': ['ck', 'se', 'long_id_']
+        ,'header': 'st resist react charge rate1 rate2 rate3 rate4 aloss lngth'
+        ,'ignore': []
+    }
+    ,'transformer': {
+        'key_tokens': 8
+        ,'key_names': ['ck', 'long_id_']
+        ,'header': 'st ty ---no--- reg_name zt ---no--- int_name ---no--- ter_name ar zone tbase ps_r ps_x pt_r pt_x ts_r ts_x vnomp vnoms vnomt anstar'
+        ,'ignore': ['int', 'tert']
+    }
+}
+
+# EPC section name -> PowerWorld table name used by get_case_data().
+epc_tables: dict[str,str] = {
+    'bus': 'Bus'
+    ,'generator': 'Gen'
+    ,'load': 'Load'
+    ,'branch': 'Branch'
+    ,'transformer': 'Transformer'
+}
+
+def object_id(object_type: str, *keys) -> str:
+    """
+    Builds a PowerWorld style ObjectID string, e.g. "GEN 10001 '1'".
+    Numeric keys are written as-is. String keys (IDs and circuits) are quoted.
+    """
+    parts = [object_type]
+    for key in keys:
+        if isinstance(key, str):
+            parts.append("'" + key + "'")
+        else:
+            parts.append(str(key))
+    return ' '.join(parts)
+
+def parse_header(section: str, header_text: str) -> list[tuple[str,int]]:
+    """
+    Returns a list of (name, token_count) for the data fields after the ':' separator.
+    """
+    layout = epc_layouts[section]
+    words = header_text.split()
+    # The section header also names the key fields, which come before the ':' separator.
+    if words[:len(layout['key_names'])] == layout['key_names']:
+        words = words[len(layout['key_names']):]
+    if len(words) == 0:
+        words = layout['header'].split()
+
+    fields: list[tuple[str,int]] = []
+    bus_ref = False
+    for word in words:
+        if word in layout['ignore']:
+            continue
+        if word.strip('-') == 'no' or set(word) == {'-'}:
+            bus_ref = True
+            continue
+        fields.append((word, 3 if bus_ref else 1))
+        bus_ref = False
+    return fields
+
+def iter_records(lines):
+    """
+    Yields (section, header_text, tokens) for each record in the EPC.
+    Records continued onto the next line with a trailing '/' are joined.
+    Sections which are not in epc_layouts are skipped without tokenizing.
+    """
+    section = None
+    header_text = ''
+    in_text_block = False
+    pending = ''
+
+    for line in lines:
+        line = line.rstrip('\r\n')
+
+        # Skip free-text blocks (title, comments, solution parameters) until the '!' terminator.
+        if in_text_block:
+            if line.startswith('!'):
+                in_text_block = False
+            continue
+        if line.strip().lower() in text_blocks:
+            in_text_block = True
+            section = None
+            continue
+
+        # Section headers start in the first column.
+        if line[:1].isalpha():
+            match = header_re.match(line)
+            if match:
+                name = match.group(1).strip().lower()
+                section = name if name in epc_layouts else None
+                header_text = match.group(3)
+                pending = ''
+            elif line.strip().lower() == 'end':
+                return
+            continue
+
+        if section is None or line.lstrip().startswith('#'):
+            continue
+
+        # Join continuation lines.
+        stripped = line.rstrip()
+        if stripped.endswith('/'):
+            pending += stripped[:-1] + ' '
+            continue
+        record = pending + stripped
+        pending = ''
+        if record.strip() == '':
+            continue
+        yield section, header_text, token_re.findall(record)
+
+def read_epc_sections(source, sections: list[str] = None) -> dict[str,pd.DataFrame]:
+    """
+    Reads raw EPC sections into DataFrames using the EPC field names.
+    source: A path to an EPC file, or any iterable of text lines (e.g. an open file or io.StringIO).
+    sections: Which EPC sections to read. Defaults to all sections in epc_layouts.
+    Key fields are named 'bus', 'bus_name', 'bus_kv' (and 'to_bus', ... for two-terminal elements).
+    Bus reference fields keep only the bus number.
+    """
+    if sections is None:
+        sections = list(epc_layouts.keys())
+
+    if isinstance(source, (str, Path)):
+        with open(source, 'r', encoding='latin-1') as f:
+            return read_epc_sections(f, sections)
+
+    bus_keys = ['bus', 'bus_name', 'bus_kv']
+    to_keys = ['to_bus', 'to_bus_name', 'to_bus_kv']
+
+    rows: dict[str,list[list[str]]] = {section: [] for section in sections}
+    columns: dict[str,list[str]] = {}
+    fields_cache: dict[tuple[str,str],list[tuple[str,int]]] = {}
+
+    for section, header_text, tokens in iter_records(source):
+        if section not in rows:
+            continue
+        layout = epc_layouts[section]
+        fields = fields_cache.get((section, header_text))
+        if fields is None:
+            fields = parse_header(section, header_text)
+            fields_cache[(section, header_text)] = fields
+
+        if ':' in tokens:
+            split = tokens.index(':')
+            key, data = tokens[:split], tokens[split + 1:]
+        else:
+            key, data = tokens[:layout['key_tokens']], tokens[layout['key_tokens']:]
+
+        # Pad short records so every row lines up with the header.
+        row = key[:layout['key_tokens']] + [''] * (layout['key_tokens'] - len(key))
+        position = 0
+        for name, count in fields:
+            row.append(data[position] if position < len(data) else '')
+            position += count
+        rows[section].append(row)
+
+        if section not in columns:
+            key_columns = bus_keys + (to_keys if layout['key_tokens'] >= 8 else []) + layout['key_names']
+            columns[section] = key_columns + [name for name, count in fields]
+
+    frames: dict[str,pd.DataFrame] = {}
+    for section in sections:
+        if section in columns:
+            df = pd.DataFrame(rows[section], columns=columns[section])
+        else:
+            layout = epc_layouts[section]
+            key_columns = bus_keys + (to_keys if layout['key_tokens'] >= 8 else []) + layout['key_names']
+            df = pd.DataFrame(columns=key_columns + [name for name, count in parse_header(section, '')])
+        # Remove quotes and padding from all strings.
+        for column in df.columns:
+            df[column] = df[column].str.strip('"').str.strip()
+        frames[section] = df
+    return frames
+
+def _num(df: pd.DataFrame, column: str, default = np.nan) -> pd.Series:
+    if column not in df.columns:
+        return pd.Series(default, index=df.index, dtype=float)
+    return pd.to_numeric(df[column], errors='coerce')
+
+def _status(df: pd.DataFrame, column: str, default = 'Open') -> pd.Series:
+    if column not in df.columns:
+        return pd.Series(default, index=df.index, dtype=object)
+    return np.where(_num(df, column) > 0, 'Closed', 'Open')
+
+def to_powerworld_tables(epc_dict: dict[str,pd.DataFrame]) -> dict[str,pd.DataFrame]:
+    """
+    Maps raw EPC sections (from read_epc_sections()) to PowerWorld field names,
+    keyed by the table names used in get_case_data().
+    """
+    tables: dict[str,pd.DataFrame] = {}
+
+    if 'bus' in epc_dict:
+        epc = epc_dict['bus']
+        df = pd.DataFrame(index=epc.index)
+        df['Number'] = _num(epc, 'bus')
+        df['ObjectID'] = [object_id('BUS', int(n)) for n in df['Number']]
+        df['Name'] = epc['bus_name']
+        df['NomkV'] = _num(epc, 'bus_kv')
+        df['Slack'] = np.where(_num(epc, 'ty') == 0, 'YES', 'NO')
+        df['Vpu'] = _num(epc, 'volt')
+        df['Vangle'] = _num(epc, 'angle')
+        df['AreaNumber'] = _num(epc, 'ar')
+        df['ZoneNumber'] = _num(epc, 'zone')
+        df['OwnerNumber'] = _num(epc, 'own')
+        df['Latitude'] = _num(epc, 'latitude')
+        df['Longitude'] = _num(epc, 'longitude')
+        tables['Bus'] = df
+
+    if 'generator' in epc_dict:
+        epc = epc_dict['generator']
+        df = pd.DataFrame(index=epc.index)
+        df['BusNum'] = _num(epc, 'bus')
+        df['ID'] = epc['id']
+        df['ObjectID'] = [object_id('GEN', int(n), i) for n, i in zip(df['BusNum'], df['ID'])]
+        df['BusName'] = epc['bus_name']
+        df['NomkV'] = _num(epc, 'bus_kv')
+        df['Status'] = _status(epc, 'st')
+        df['RegBusNum'] = _num(epc, 'reg_name')
+        df['MWSetPoint'] = _num(epc, 'pgen')
+        df['MWMax'] = _num(epc, 'pmax')
+        df['MWMin'] = _num(epc, 'pmin')
+        df['MvarSetPoint'] = _num(epc, 'qgen')
+        df['MvarMax'] = _num(epc, 'qmax')
+        df['MvarMin'] = _num(epc, 'qmin')
+        df['MVABase'] = _num(epc, 'mbase')
+        df['Rcomp'] = _num(epc, 'cmp_r')
+        df['Xcomp'] = _num(epc, 'cmp_x')
+        df['GenR'] = _num(epc, 'gen_r')
+        df['GenX'] = _num(epc, 'gen_x')
+        df['StepR'] = _num(epc, 'rtran')
+        df['StepX'] = _num(epc, 'xtran')
+        df['StepTap'] = _num(epc, 'gtap')
+        df['AreaNumber'] = _num(epc, 'ar')
+        df['ZoneNumber'] = _num(epc, 'zone')
+        # Scheduled voltage lives on the regulated bus in PSLF.
+        if 'bus' in epc_dict:
+            vsched = pd.Series(_num(epc_dict['bus'], 'vsched').values, index=_num(epc_dict['bus'], 'bus').values)
+            vsched = vsched[~vsched.index.duplicated()]
+            df['VoltSet'] = df['RegBusNum'].map(vsched)
+        tables['Gen'] = df
+
+    if 'load' in epc_dict:
+        epc = epc_dict['load']
+        df = pd.DataFrame(index=epc.index)
+        df['BusNum'] = _num(epc, 'bus')
+        df['ID'] = epc['id']
+        df['ObjectID'] = [object_id('LOAD', int(n), i) for n, i in zip(df['BusNum'], df['ID'])]
+        df['BusName'] = epc['bus_name']
+        df['NomkV'] = _num(epc, 'bus_kv')
+        df['Status'] = _status(epc, 'st')
+        df['SMW'] = _num(epc, 'mw')
+        df['SMvar'] = _num(epc, 'mvar')
+        df['IMW'] = _num(epc, 'mw_i')
+        df['IMvar'] = _num(epc, 'mvar_i')
+        df['ZMW'] = _num(epc, 'mw_z')
+        df['ZMvar'] = _num(epc, 'mvar_z')
+        # Distributed generation is only present in newer EPC versions. Default to none.
+        df['DistStatus'] = _status(epc, 'dgenm')
+        df['DistMWInput'] = _num(epc, 'dgenp', 0.0).fillna(0.0)
+        df['DistMvarInput'] = _num(epc, 'dgenq', 0.0).fillna(0.0)
+        df['AreaNumber'] = _num(epc, 'ar')
+        df['ZoneNumber'] = _num(epc, 'zone')
+        df['OwnerNumber'] = _num(epc, 'own')
+        tables['Load'] = df
+
+    for section, device_type in [('branch', 'Line'), ('transformer', 'Transformer')]:
+        if section not in epc_dict:
+            continue
+        epc = epc_dict[section]
+        df = pd.DataFrame(index=epc.index)
+        df['BusNumFrom'] = _num(epc, 'bus')
+        df['BusNumTo'] = _num(epc, 'to_bus')
+        df['Circuit'] = epc['ck']
+        df['ObjectID'] = [object_id('BRANCH', int(f), int(t), c) for f, t, c in zip(df['BusNumFrom'], df['BusNumTo'], df['Circuit'])]
+        df['BusNameFrom'] = epc['bus_name']
+        df['BusNameTo'] = epc['to_bus_name']
+        df['NomkVFrom'] = _num(epc, 'bus_kv')
+        df['NomkVTo'] = _num(epc, 'to_bus_kv')
+        df['BranchDeviceType'] = device_type
+        df['Status'] = _status(epc, 'st')
+        df['AreaNumber'] = _num(epc, 'ar')
+        df['ZoneNumber'] = _num(epc, 'zone')
+        if section == 'branch':
+            # Multi-section lines: PowerWorld creates dummy buses between sections, which the EPC does not number.
+            df['Section'] = _num(epc, 'se')
+            df['R'] = _num(epc, 'resist')
+            df['X'] = _num(epc, 'react')
+            df['B'] = _num(epc, 'charge')
+            df['LimitMVAA'] = _num(epc, 'rate1')
+            df['LimitMVAB'] = _num(epc, 'rate2')
+            df['LimitMVAC'] = _num(epc, 'rate3')
+            df['LimitMVAD'] = _num(epc, 'rate4')
+            df['LineLength'] = _num(epc, 'lngth')
+        else:
+            df['RegBusNum'] = _num(epc, 'reg_name')
+            df['XFMVABase'] = _num(epc, 'tbase')
+            df['Rxfbase'] = _num(epc, 'ps_r')
+            df['Xxfbase'] = _num(epc, 'ps_x')
+            df['XFNomkVbaseFrom'] = _num(epc, 'vnomp')
+            df['XFNomkVbaseTo'] = _num(epc, 'vnoms')
+            df['Phase'] = _num(epc, 'anstar')
+        tables[epc_tables[section]] = df
+
+    return tables
+
+def cast_param_df(df: pd.DataFrame, parameter_type: dict[str,type]) -> pd.DataFrame:
+    """
+    Selects and types the columns in parameter_type, in order, the same way get_param_df() does.
+    Columns which are not available from the EPC are left empty (NaN for numbers, '' for strings).
+    """
+    out = pd.DataFrame(index=df.index)
+    for parameter, ptype in parameter_type.items():
+        if parameter in df.columns:
+            column = df[parameter]
+        else:
+            column = pd.Series(np.nan if ptype in [int, float] else '', index=df.index)
+        if ptype in [int, float]:
+            out[parameter] = pd.to_numeric(column, errors='coerce')
+        else:
+            out[parameter] = column.astype(ptype)
+    return out.reset_index(drop=True)
+
+def read_epc(source, tables: list[str] = None) -> dict[str,pd.DataFrame]:
+    """
+    Reads an EPC into PowerWorld-named DataFrames, keyed by get_case_data() table name
+    ('Bus', 'Gen', 'Load', 'Branch', 'Transformer').
+    Only the EPC sections needed for the requested tables are tokenized.
+    """
+    if tables is None:
+        tables = list(epc_tables.values())
+    sections = [section for section, table in epc_tables.items() if table in tables]
+    # Gen voltage setpoints come from the bus section.
+    if 'Gen' in tables and 'bus' not in sections:
+        sections.append('bus')
+    pw_tables = to_powerworld_tables(read_epc_sections(source, sections))
+    return {table: pw_tables[table] for table in tables}
+
+def get_epc_param_df(source, table: str, parameter_type: dict[str,type]) -> pd.DataFrame:
+    """
+    Drop-in replacement for get_param_df(SimAuto, table, parameter_type), reading from an EPC on disk.
+    source may also be the dict returned by read_epc(), to avoid re-reading the file.
+    """
+    if isinstance(source, dict):
+        tables = source
+    else:
+        tables = read_epc(source, [table])
+    return cast_param_df(tables[table], parameter_type)
+
+def align_object_ids(df: pd.DataFrame, reference_df: pd.DataFrame, key_columns: list[str]) -> pd.DataFrame:
+    """
+    Replaces df['ObjectID'] with the ObjectID of the reference_df row which has the same key columns.
+    Use this when merging EPC data against data read through SimAuto, so the ObjectID strings match exactly.
+    Rows without a match keep their EPC ObjectID.
+    """
+    keys = reference_df[key_columns].astype(str).agg(' '.join, axis=1)
+    lookup = pd.Series(reference_df['ObjectID'].values, index=keys.values)
+    lookup = lookup[~lookup.index.duplicated()]
+    df = df.copy()
+    df_keys = df[key_columns].astype(str).agg(' '.join, axis=1)
+    df['ObjectID'] = df_keys.map(lookup).fillna(df['ObjectID'])
+    return df
@@ -0,0 +1,142 @@
+from pathlib import Path
+import hashlib
+import multiprocessing as mp
+import os
+import numpy as np
+import pandas as pd
+import Scripts.wpp_lib as wpp_lib
+
+# Near-duplicate hours.
+# Chronological exports have many hours with almost the same gen & load (overnight valleys, repeated weekend
+# shapes). Each hour's EPC is fingerprinted: a hash of its topology (every gen, load, dist gen & branch status),
+# plus its MW and Mvar targets. Hours with the same topology whose targets are all within a tolerance of a
+# cluster's representative join that cluster. The representative is scaled in full, and each other member starts
+# from its case, with its exclusions, and only scales the small residual.
+
+gen_params: dict[str,type] = {
+    'ObjectID': str
+    ,'Status': str
+    ,'MWSetPoint': float
+}
+load_params: dict[str,type] = {
+    'ObjectID': str
+    ,'Status': str
+    ,'SMW': float
+    ,'SMvar': float
+    ,'DistStatus': str
+    ,'DistMWInput': float
+    ,'DistMvarInput': float
+}
+branch_params: dict[str,type] = {
+    'ObjectID': str
+    ,'Status': str
+}
+
+def fingerprint(epc_fp: Path) -> dict[str,object]:
+    """
+    {'Topology': hash of the statuses, 'MW': Series, 'Mvar': Series} for an EPC. The series are sorted by key, so
+    hours with the same topology have the same keys in the same order. Open elements are 0 MW / 0 Mvar.
+    """
+    df_dict = wpp_lib.get_epc_param_dfs(epc_fp, {
+        'Gen': ('Gen', gen_params, '')
+        ,'Load': ('Load', load_params, '')
+        ,'Branch': ('Branch', branch_params, '')
+        ,'Transformer': ('Transformer', branch_params, '')
+    })
+    gen_df = df_dict['Gen'].set_index('ObjectID')
+    load_df = df_dict['Load'].set_index('ObjectID')
+    gen_on = gen_df['Status'] == 'Closed'
+    load_on = load_df['Status'] == 'Closed'
+    dist_on = load_df['DistStatus'] == 'Closed'
+
+    statuses = pd.concat([
+        gen_df['Status'].rename(lambda object_id: 'Gen ' + object_id)
+        ,load_df['Status'].rename(lambda object_id: 'Load ' + object_id)
+        ,load_df['DistStatus'].rename(lambda object_id: 'Dist ' + object_id)
+        ,df_dict['Branch'].set_index('ObjectID')['Status'].rename(lambda object_id: 'Branch ' + object_id)
+        ,df_dict['Transformer'].set_index('ObjectID')['Status'].rename(lambda object_id: 'Branch ' + object_id)
+    ]).sort_index()
+    topology = hashlib.sha1('\n'.join(statuses.index + ' ' + statuses.astype(str)).encode('utf-8')).hexdigest()
+
+    mw = pd.concat([
+        gen_df['MWSetPoint'].where(gen_on, 0.0).rename(lambda object_id: 'Gen ' + object_id)
+        ,load_df['SMW'].where(load_on, 0.0).rename(lambda object_id: 'Load ' + object_id)
+        ,load_df['DistMWInput'].where(load_on & dist_on, 0.0).rename(lambda object_id: 'Dist ' + object_id)
+    ]).fillna(0.0).sort_index()
+    mvar = pd.concat([
+        load_df['SMvar'].where(load_on, 0.0).rename(lambda object_id: 'Load ' + object_id)
+        ,load_df['DistMvarInput'].where(load_on & dist_on, 0.0).rename(lambda object_id: 'Dist ' + object_id)
+    ]).fillna(0.0).sort_index()
+    return {'Topology': topology, 'MW': mw, 'Mvar': mvar}
+
+def cluster_hours(epc_fps: list[Path], tolerance_mw: float, tolerance_mvar: float, num_workers: int = None) -> pd.DataFrame:
+    """
+    Clusters the hours, in the order given (chronological, so a cluster's representative is its first hour).
+    An hour joins the closest representative with the same topology whose MW & Mvar targets are each within
+    tolerance_mw / tolerance_mvar of its own, or becomes a new representative.
+    The EPCs are fingerprinted in num_workers processes (default: one per CPU), or in this process if 1.
+    The worker processes import the calling script, so it must not start SimAuto at import.
+    Returns one row per hour: Hour, Cluster, Representative, MaxDiffMW, MaxDiffMvar, Topology.
+    """
+    epc_fps = [Path(fp) for fp in epc_fps]
+    if num_workers is None:
+        num_workers = mp.cpu_count()
+    num_workers = max(1, min(num_workers, len(epc_fps)))
+    if num_workers == 1:
+        fingerprints = [fingerprint(fp) for fp in epc_fps]
+    else:
+        with mp.Pool(processes=num_workers) as pool:
+            fingerprints = pool.map(fingerprint, epc_fps)
+
+    # Per topology: representative hours, and their MW & Mvar targets as rows of a matrix.
+    leaders: dict[str,dict[str,list]] = {}
+    rows = []
+    for fp, print_dict in zip(epc_fps, fingerprints):
+        mw = print_dict['MW'].to_numpy()
+        mvar = print_dict['Mvar'].to_numpy()
+        group = leaders.setdefault(print_dict['Topology'], {'Hours': [], 'MW': [], 'Mvar': []})
+        best = None
+        if len(group['Hours']) > 0:
+            diff_mw = np.abs(np.vstack(group['MW']) - mw).max(axis=1, initial=0.0)
+            diff_mvar = np.abs(np.vstack(group['Mvar']) - mvar).max(axis=1, initial=0.0)
+            within = np.flatnonzero((diff_mw <= tolerance_mw) & (diff_mvar <= tolerance_mvar))
+            if len(within) > 0:
+                best = within[np.argmin(diff_mw[within])]
+        if best is None:
+            group['Hours'].append(fp.stem)
+            group['MW'].append(mw)
+            group['Mvar'].append(mvar)
+            rows.append({'Hour': fp.stem, 'Representative': fp.stem, 'MaxDiffMW': 0.0, 'MaxDiffMvar': 0.0, 'Topology': print_dict['Topology']})
+        else:
+            rows.append({'Hour': fp.stem, 'Representative': group['Hours'][best], 'MaxDiffMW': diff_mw[best], 'MaxDiffMvar': diff_mvar[best], 'Topology': print_dict['Topology']})
+
+    df = pd.DataFrame(rows, columns=['Hour', 'Representative', 'MaxDiffMW', 'MaxDiffMvar', 'Topology'])
+    df.insert(1, 'Cluster', pd.factorize(df['Representative'])[0])
+    return df
+
+def cluster_summary_df(cluster_df: pd.DataFrame) -> pd.DataFrame:
+    """One row per cluster: its representative, the number of hours, and the largest differences of its members."""
+    return cluster_df.groupby(['Cluster', 'Representative'], as_index=False).agg(
+        Hours=('Hour', 'size')
+        ,Members=('Hour', lambda hours: ', '.join(hour for hour in hours if hour not in cluster_df['Representative'].values))
+        ,MaxDiffMW=('MaxDiffMW', 'max')
+        ,MaxDiffMvar=('MaxDiffMvar', 'max')
+    )
+
+def save_exclusions(fp: Path, gen_df: pd.DataFrame, load_df: pd.DataFrame):
+    # ExclusionReason of each excluded gen & load, for the members of the hour's cluster.
+    temp_fp = Path(fp).with_name(Path(fp).name + '.tmp')
+    pd.to_pickle({
+        'gen': gen_df.loc[gen_df['Include'] == False, 'ExclusionReason']
+        ,'load': load_df.loc[load_df['Include'] == False, 'ExclusionReason']
+    }, temp_fp)
+    os.replace(temp_fp, fp)
+
+def apply_exclusions(fp: Path, gen_df: pd.DataFrame, load_df: pd.DataFrame, representative: str):
+    """Excludes the gens & loads the representative excluded, noting where the exclusion came from."""
+    exclusions = pd.read_pickle(fp)
+    for df, reasons in [(gen_df, exclusions['gen']), (load_df, exclusions['load'])]:
+        reasons = reasons[reasons.index.isin(df.index) & (reasons != 'STATCOM')]
+        df.loc[reasons.index, 'Include'] = False
+        df.loc[reasons.index, 'ExclusionReason'] = reasons + f' ({representative})'
+    return
@@ -0,0 +1,171 @@
+from pathlib import Path
+import contextlib
+import multiprocessing as mp
+import os
+import queue
+import time
+import traceback
+import pandas as pd
+
+# Runs independent hours (e.g. create_case() for each EPC) at the same time, in separate processes.
+# Each hour process keeps its own SimAuto (and optionally a worker pool, from context_factory) for the whole run,
+# and takes the next hour from a shared queue when it finishes one. Hours are queued longest expected first,
+# using the durations of earlier runs, so the long hours don't start last and hold up the end of the run.
+# Each hour's console output goes to its own log file. The main process prints one status line per event.
+#
+# SimAuto instances are limited by licenses: split_instances() divides a limit between the hour processes and
+# their pool workers.
+
+# Set in each hour process, so report_stage() can send progress to the main process.
+progress_queue = None
+worker_index = None
+current_hour = None
+
+def report_stage(stage: str):
+    """Sends the current stage of the hour to the scheduler's status display. Has no effect outside an hour process."""
+    if progress_queue is not None:
+        progress_queue.put(('stage', worker_index, current_hour, stage, time.time()))
+    return
+
+def split_instances(instance_limit: int, hour_workers: int, pool_workers: int = None) -> tuple[int,int]:
+    """
+    Hour processes & pool workers per hour process, so the SimAuto instances (one per hour process, plus its pool
+    workers) stay within instance_limit. pool_workers defaults to an equal share of what's left.
+    """
+    hour_workers = max(1, min(hour_workers, instance_limit // 2))
+    share = max(1, instance_limit // hour_workers - 1)
+    if pool_workers is None:
+        pool_workers = share
+    return hour_workers, max(1, min(pool_workers, share))
+
+def load_durations(fp: Path) -> dict[str,float]:
+    """Seconds taken by each hour (by file stem) in earlier runs."""
+    if fp is None or not Path(fp).exists():
+        return {}
+    df = pd.read_csv(fp)
+    return dict(zip(df['Hour'].astype(str), df['Seconds']))
+
+def save_duration(fp: Path, hour: str, seconds: float):
+    if fp is None:
+        return
+    durations = load_durations(fp)
+    durations[hour] = seconds
+    Path(fp).parent.mkdir(parents=True, exist_ok=True)
+    temp_fp = Path(fp).with_name(Path(fp).name + '.tmp')
+    pd.DataFrame({'Hour': list(durations.keys()), 'Seconds': list(durations.values())}).to_csv(temp_fp, index=False)
+    os.replace(temp_fp, fp)
+
+def longest_first(fps: list[Path], durations: dict[str,float]) -> list[Path]:
+    """
+    Orders hours by their duration in earlier runs, longest first. Hours without one go first (they may be long),
+    largest file first.
+    """
+    unknown = sorted([fp for fp in fps if fp.stem not in durations], key=lambda fp: -fp.stat().st_size if fp.exists() else 0)
+    known = sorted([fp for fp in fps if fp.stem in durations], key=lambda fp: -durations[fp.stem])
+    return unknown + known
+
+def worker_main(index: int, func, context_factory, hour_queue, result_queue, log_dir: Path):
+    # Runs func(context, fp) for each hour from hour_queue, with context from context_factory() (or None) kept open throughout.
+    global progress_queue, worker_index, current_hour
+    progress_queue = result_queue
+    worker_index = index
+    try:
+        with (context_factory() if context_factory is not None else contextlib.nullcontext()) as context:
+            while True:
+                fp = hour_queue.get()
+                if fp is None:
+                    break
+                fp = Path(fp)
+                current_hour = fp.stem
+                start = time.time()
+                result_queue.put(('start', index, fp.stem, None, start))
+                log_fp = Path(log_dir) / (fp.stem + '_00_Console.log')
+                ok = True
+                error = ''
+                with open(log_fp, 'w', encoding='utf-8') as log, contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+                    try:
+                        func(context, fp)
+                    except Exception:
+                        ok = False
+                        error = traceback.format_exc()
+                        print(error)
+                result_queue.put(('done' if ok else 'failed', index, fp.stem, error, time.time()))
+                current_hour = None
+    except Exception:
+        result_queue.put(('exit', index, current_hour, traceback.format_exc(), time.time()))
+    return
+
+def run_hours(func, fps: list[Path], hour_workers: int, context_factory = None, durations_fp: Path = None, log_dir: Path = None, poll_seconds: float = 5.0) -> pd.DataFrame:
+    """
+    Runs func(context, fp) for every fp in fps, in hour_workers processes, longest expected first.
+    func & context_factory must be picklable (module-level). context_factory() is entered once per process
+    (e.g. a SimAutoPool), and passed to func for each hour.
+    durations_fp: CSV of the seconds each hour took, used to order the hours, and updated as hours finish.
+    log_dir: Folder for each hour's console log (<stem>_00_Console.log). Defaults to the folder of the first fp.
+    Returns one row per hour: Hour, Worker, Start, End, Seconds, Ok, Error. An hour which fails doesn't stop the others.
+    """
+    fps = longest_first([Path(fp) for fp in fps], load_durations(durations_fp))
+    if len(fps) == 0:
+        return pd.DataFrame(columns=['Hour', 'Worker', 'Start', 'End', 'Seconds', 'Ok', 'Error'])
+    if log_dir is None:
+        log_dir = fps[0].parent
+    Path(log_dir).mkdir(parents=True, exist_ok=True)
+    hour_workers = max(1, min(hour_workers, len(fps)))
+
+    hour_queue = mp.Queue()
+    result_queue = mp.Queue()
+    for fp in fps:
+        hour_queue.put(str(fp))
+    for _ in range(hour_workers):
+        hour_queue.put(None)
+    # Hour processes start pool workers of their own, so they can't be daemons.
+    workers = [
+        mp.Process(target=worker_main, args=(index, func, context_factory, hour_queue, result_queue, log_dir))
+        for index in range(hour_workers)
+    ]
+    for worker in workers:
+        worker.start()
+    print(f'Running {len(fps)} hours in {hour_workers} processes. Console logs: {str(log_dir)}')
+
+    run_start = time.time()
+    status: dict[int,str] = {}
+    rows: dict[str,dict[str,object]] = {}
+    finished = 0
+    while finished < len(fps):
+        try:
+            event, index, hour, value, at = result_queue.get(timeout=poll_seconds)
+        except queue.Empty:
+            stopped = [i for i, worker in enumerate(workers) if not worker.is_alive()]
+            if len(stopped) == len(workers):
+                print(f'All hour processes exited with {len(fps) - finished} hours unfinished.')
+                break
+            continue
+
+        if event == 'start':
+            rows[hour] = {'Hour': hour, 'Worker': index, 'Start': at, 'End': None, 'Seconds': None, 'Ok': None, 'Error': ''}
+            status[index] = f'{hour} starting'
+        elif event == 'stage':
+            status[index] = f'{hour} {value}'
+        elif event in ['done', 'failed']:
+            row = rows[hour]
+            row.update({'End': at, 'Seconds': at - row['Start'], 'Ok': event == 'done', 'Error': value})
+            finished += 1
+            status.pop(index, None)
+            if event == 'done':
+                save_duration(durations_fp, hour, row['Seconds'])
+            else:
+                print(f'Hour {hour} failed (see its console log):\n{value}')
+        elif event == 'exit':
+            print(f'Hour process {index} exited:\n{value}')
+            status.pop(index, None)
+            if hour in rows:
+                rows[hour].update({'End': at, 'Seconds': at - rows[hour]['Start'], 'Ok': False, 'Error': value})
+                finished += 1
+
+        running = ' | '.join(f'[{i}] {text}' for i, text in sorted(status.items()))
+        failed = sum(1 for row in rows.values() if row['Ok'] == False)
+        print(f'{time.time() - run_start:7.0f}s {finished}/{len(fps)} hours finished ({failed} failed) | {running}')
+
+    for worker in workers:
+        worker.join()
+    return pd.DataFrame(list(rows.values()), columns=['Hour', 'Worker', 'Start', 'End', 'Seconds', 'Ok', 'Error'])
@@ -0,0 +1,80 @@
+import pandas as pd
+
+# Shared snapshot of the network state between solves.
+# After each scaling step, several routines read overlapping Bus, Shunt and Branch fields (voltages, islands,
+# shunt statuses, branch end voltages), with no change to the case in between. NetworkSnapshot wraps a SimAuto
+# object, and serves unfiltered reads of the fields in snapshot_fields from one read per table, made on first use.
+# Every call which could change the case (writes, solves, LoadState, script commands other than the ones in
+# passive_commands) drops the snapshot, so a read never returns values from before a change.
+
+# Calls which don't change the case.
+read_methods = {'GetParametersMultipleElementRect', 'GetParametersMultipleElement', 'GetParametersSingleElement',
+                'GetParameters', 'GetFieldList', 'ListOfDevices', 'SaveState'}
+# Script commands which don't change the case.
+passive_commands = ('EnterMode(', 'SaveData(')
+
+class NetworkSnapshot:
+    """
+    Wraps a SimAuto object, forwarding every call and attribute.
+    snapshot_fields: {table: [fields]}. An unfiltered read of any subset of these fields is served from one read of
+        all of them, until the case changes. Other reads are passed through.
+    counters: Reads (served), Fetches (SimAuto reads made for the snapshot), Invalidations (snapshots dropped).
+    """
+    counter_names = ['Reads', 'Fetches', 'Invalidations']
+
+    def __init__(self, SimAuto, snapshot_fields: dict[str,list[str]]):
+        object.__setattr__(self, '_SimAuto', SimAuto)
+        object.__setattr__(self, 'snapshot_fields', snapshot_fields)
+        # {table: {field: column of values}}, for the tables read since the last change.
+        object.__setattr__(self, '_tables', {})
+        # Tables whose snapshot read failed (e.g. an unsupported field). Their reads are passed through.
+        object.__setattr__(self, '_unsupported', set())
+        object.__setattr__(self, 'counters', {name: 0 for name in self.counter_names})
+
+    def invalidate(self):
+        if len(self._tables) > 0:
+            self.counters['Invalidations'] += 1
+            self._tables.clear()
+
+    def counters_df(self) -> pd.DataFrame:
+        return pd.DataFrame([self.counters], columns=self.counter_names)
+
+    def GetParametersMultipleElementRect(self, table, parameters, filter_group = ''):
+        fields = self.snapshot_fields.get(table)
+        if fields is None or len(parameters) == 0 or filter_group != '' or table in self._unsupported or not set(parameters) <= set(fields):
+            return self._SimAuto.GetParametersMultipleElementRect(table, parameters, filter_group)
+
+        if table not in self._tables:
+            output = self._SimAuto.GetParametersMultipleElementRect(table, fields, '')
+            self.counters['Fetches'] += 1
+            if output[0] != '':
+                self._unsupported.add(table)
+                return self._SimAuto.GetParametersMultipleElementRect(table, parameters, filter_group)
+            rows = output[1] if len(output) > 1 else None
+            # Column-major, so any subset of the fields can be returned.
+            columns = list(zip(*rows)) if rows is not None and len(rows) > 0 else [() for _ in fields]
+            self._tables[table] = dict(zip(fields, columns))
+
+        self.counters['Reads'] += 1
+        columns = self._tables[table]
+        if len(columns[parameters[0]]) == 0:
+            return ('', None)
+        return ('', tuple(zip(*[columns[p] for p in parameters])))
+
+    def RunScriptCommand(self, command):
+        if not str(command).strip().startswith(passive_commands):
+            self.invalidate()
+        return self._SimAuto.RunScriptCommand(command)
+
+    def __getattr__(self, name):
+        attribute = getattr(self._SimAuto, name)
+        if not callable(attribute) or name in read_methods:
+            return attribute
+
+        def changing(*args):
+            self.invalidate()
+            return attribute(*args)
+        return changing
+
+    def __setattr__(self, name, value):
+        setattr(self._SimAuto, name, value)
@@ -0,0 +1,740 @@
+from pathlib import Path
+import copy
+import re
+import shlex
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+import scipy.sparse.linalg as spla
+from scipy.sparse.csgraph import connected_components
+from Scripts import epc_reader
+
+# In-process AC power flow backend, standing in for SimAuto.
+# NewtonRaphsonSimAuto holds the Bus, Gen, Load, Branch, Transformer, LineShunt, and (switched) Shunt tables in
+# the shapes get_case_data() returns, and serves the subset of SimAuto which wpp_lib uses: reading and writing
+# parameters, SolvePowerFlow (sparse Newton-Raphson in polar form, with generator Mvar limits), bus mismatch,
+# Vpu & IslandNumber, ClearSmallIslands, SaveState/LoadState, and contingencies (LoadAux, CTGSolveAll, and the
+# Contingency table). Pass it to wpp_lib functions in place of SimAuto.
+# It is a simplified model, meant for fast experiments with the scaling heuristics on any platform:
+#   - Generators regulate their own terminal bus (RegBusNum is ignored).
+#   - Switched shunts, transformer taps, and phase shifters are fixed (no automatic control).
+#   - Transformer off-nominal ratios come from the tap and the winding vs. bus nominal kV.
+# Results should be confirmed in PowerWorld.
+
+mva_base = 100.0
+
+# Fields to read from PowerWorld's switched shunt table, which get_case_data() does not include.
+shunt_params: dict[str,type] = {
+    'ObjectID': str
+    ,'BusNum': int
+    ,'ID': str
+    ,'Status': str
+    ,'MWNom': float
+    ,'MvarNom': float
+}
+
+# Fields which identify an object when a write does not include its ObjectID.
+table_keys: dict[str,list[str]] = {
+    'Bus': ['Number']
+    ,'Gen': ['BusNum', 'ID']
+    ,'Load': ['BusNum', 'ID']
+    ,'Shunt': ['BusNum', 'ID']
+    ,'Branch': ['BusNumFrom', 'BusNumTo', 'Circuit']
+    ,'LineShunt': ['BusNumFrom', 'BusNumTo', 'Circuit', 'ID']
+}
+
+# ObjectID prefix for objects created with CreateIfNotFound.
+object_types: dict[str,str] = {'Gen': 'GEN', 'Load': 'LOAD', 'Shunt': 'SHUNT', 'Branch': 'BRANCH', 'LineShunt': 'LINESHUNT'}
+
+# Fields used by the power flow, and their value when missing from the input tables.
+model_defaults: dict[str,dict[str,object]] = {
+    'Bus': {'Slack': 'NO', 'NomkV': np.nan, 'NomB': 0.0, 'NomG': 0.0, 'Vpu': 1.0, 'Vangle': 0.0}
+    ,'Gen': {'Status': 'Closed', 'MWSetPoint': 0.0, 'MWMax': np.nan, 'MWMin': np.nan, 'VoltSet': np.nan, 'AVR': 'YES', 'MvarSetPoint': 0.0, 'MvarMax': 9999.0, 'MvarMin': -9999.0}
+    ,'Load': {'Status': 'Closed', 'SMW': 0.0, 'SMvar': 0.0, 'IMW': 0.0, 'IMvar': 0.0, 'ZMW': 0.0, 'ZMvar': 0.0, 'DistStatus': 'Open', 'DistMWInput': 0.0, 'DistMvarInput': 0.0}
+    ,'Branch': {'Status': 'Closed', 'BranchDeviceType': 'Line', 'R': 0.0, 'X': np.nan, 'B': 0.0, 'G': 0.0
+                ,'XFMVABase': np.nan, 'XFNomkVbaseFrom': np.nan, 'XFNomkVbaseTo': np.nan, 'Rxfbase': np.nan, 'Xxfbase': np.nan
+                ,'Gxfbase': 0.0, 'Bxfbase': 0.0, 'Gmagxfbase': 0.0, 'Bmagxfbase': 0.0, 'TapFixedFrom': 1.0, 'TapFixedTo': 1.0, 'Tapxfbase': 1.0, 'Phase': 0.0}
+    ,'Shunt': {'Status': 'Closed', 'MWNom': 0.0, 'MvarNom': 0.0}
+    ,'LineShunt': {'Status': 'Closed', 'BusNumLoc': np.nan, 'MWNom': 0.0, 'MvarNom': 0.0}
+}
+
+# Alternative field names (lower case) accepted on read & write, e.g. the legacy Gen* names used for statcoms.
+field_aliases: dict[str,dict[str,str]] = {
+    'Bus': {'busnum': 'Number', 'busnomvolt': 'NomkV'}
+    ,'Gen': {'genid': 'ID', 'genstatus': 'Status', 'genavrable': 'AVR', 'genmvrmax': 'MvarMax', 'genmvrmin': 'MvarMin'
+             ,'genmvrsetpoint': 'MvarSetPoint', 'genagcable': 'AGC', 'genmwmax': 'MWMax', 'genmwmin': 'MWMin'
+             ,'genmwsetpoint': 'MWSetPoint', 'genvoltset': 'VoltSet'}
+    ,'Load': {'loadid': 'ID', 'loadstatus': 'Status'}
+    ,'Shunt': {'shuntid': 'ID'}
+}
+
+# Read-only fields calculated from the solution, per table.
+computed_fields: dict[str,list[str]] = {
+    'Bus': ['Vpu', 'Vangle', 'MismatchP', 'MismatchQ', 'IslandNumber', 'BusIsStarBus:1']
+    ,'Gen': ['MW', 'Mvar', 'Vpu', 'IslandNumber']
+    ,'Load': ['Vpu', 'IslandNumber']
+    ,'Shunt': ['Vpu', 'IslandNumber']
+    ,'Branch': ['BranchVpuHigh', 'BranchVpuLow', 'IslandNumber']
+    ,'LineShunt': ['Vpu', 'IslandNumber']
+}
+
+# Simple filters, e.g. "MismatchP > 0.7" or "BranchDeviceType notcontains 'Transformer'".
+filter_re = re.compile(r"^\s*([\w:]+)\s+(notcontains|contains|<>|>=|<=|=|>|<)\s+(.*?)\s*$", re.IGNORECASE)
+
+# Sections of an AUX file: 'ObjectType (Field1,Field2,...)' followed by rows of values in braces.
+aux_section_re = re.compile(r'^\s*(?:DATA\s*\(\s*)?(\w+)\s*[,(]\s*\[?([\w:,\s]*)\]?\s*\)\s*\{(.*?)^\s*\}', re.MULTILINE | re.DOTALL)
+# Contingency actions which change a value, e.g. 'SETTO 120 MW' or 'CHANGEBY -20 MW'.
+ctg_value_re = re.compile(r'^\s*(SETTO|CHANGEBY)\s+(\S+)\s+MW\s*$', re.IGNORECASE)
+
+def to_text(values) -> np.ndarray:
+    # Formats a column the way SimAuto returns it: strings, with blanks for missing values.
+    values = np.asarray(values)
+    if values.dtype.kind == 'f':
+        return np.where(np.isnan(values), '', np.char.mod('%.10g', values))
+    if values.dtype.kind in 'iub':
+        return values.astype(str)
+    return pd.Series(values, dtype=object).fillna('').astype(str).to_numpy()
+
+def read_aux_data(fp) -> dict[str,pd.DataFrame]:
+    """Reads the data sections of an AUX file into {object type: DataFrame of strings}. Script sections are skipped."""
+    text = Path(fp).read_text(encoding='utf-8', errors='replace')
+    sections: dict[str,pd.DataFrame] = {}
+    for object_type, fields, body in aux_section_re.findall(text):
+        fields = [f.strip() for f in fields.split(',') if f.strip() != '']
+        rows = [shlex.split(line) for line in body.splitlines() if line.strip() != '' and not line.strip().startswith('//')]
+        df = pd.DataFrame([row[:len(fields)] for row in rows], columns=fields, dtype=object)
+        sections[object_type] = pd.concat([sections[object_type], df], ignore_index=True) if object_type in sections else df
+    return sections
+
+def dsbus_dv(Ybus, V: np.ndarray, Ibus: np.ndarray):
+    # Partial derivatives of the bus power injections with respect to voltage magnitude and angle.
+    diagV = sp.diags(V)
+    diagI = sp.diags(Ibus)
+    diagVnorm = sp.diags(V / np.abs(V))
+    dS_dVm = diagV @ (Ybus @ diagVnorm).conj() + diagI.conj() @ diagVnorm
+    dS_dVa = 1j * diagV @ (diagI - Ybus @ diagV).conj()
+    return dS_dVm.tocsr(), dS_dVa.tocsr()
+
+class NewtonRaphsonSimAuto:
+    """
+    SimAuto stand-in backed by an in-process Newton-Raphson power flow.
+    case_dict: Tables in the shape returned by wpp_lib.get_case_data() ({name: {'table_name', 'df'}}), or {name: df}.
+        Transformers may be given separately ('Transformer') or in 'Branch'.
+    shunt_df: Optional switched shunts, e.g. wpp_lib.get_param_df(SimAuto, 'Shunt', nr_backend.shunt_params).
+    tolerance_mva: Largest bus mismatch (MVA) of a converged solution.
+    """
+    offline = True
+    CreateIfNotFound = False
+
+    def __init__(self, case_dict: dict, shunt_df: pd.DataFrame = None, tolerance_mva: float = 0.1, max_iterations: int = 20, max_q_switches: int = 10):
+        def table_df(name):
+            item = case_dict.get(name)
+            if isinstance(item, dict):
+                item = item['df']
+            return None if item is None else item.copy()
+
+        tables: dict[str,pd.DataFrame] = {
+            'Bus': table_df('Bus')
+            ,'Gen': table_df('Gen')
+            ,'Load': table_df('Load')
+            ,'Branch': pd.concat([df for df in [table_df('Branch'), table_df('Transformer')] if df is not None], ignore_index=True)
+            ,'Shunt': shunt_df.copy() if shunt_df is not None else pd.DataFrame(columns=list(shunt_params.keys()))
+            ,'LineShunt': table_df('LineShunt') if table_df('LineShunt') is not None else pd.DataFrame(columns=['ObjectID'] + table_keys['LineShunt'])
+        }
+        for table, df in tables.items():
+            df = df.reset_index(drop=True)
+            for field, default in model_defaults[table].items():
+                if field not in df.columns:
+                    df[field] = default
+            if 'ObjectID' not in df.columns:
+                df['ObjectID'] = self._new_object_ids(table, df)
+            tables[table] = df
+
+        self.tolerance_mva = tolerance_mva
+        self.max_iterations = max_iterations
+        self.max_q_switches = max_q_switches
+        self.bus_index = pd.Index(tables['Bus']['Number'].astype(np.int64))
+        # The case as loaded, and any saved with SaveCase(), for OpenCase().
+        self._files: dict[str,dict] = {}
+        self._load_snapshot(self._make_snapshot(tables))
+        self._base = self._make_snapshot(self.tables)
+        self._saved = None
+        # Contingencies loaded with LoadAux: {name: [(object, action), ...]}, and their CTGSolveAll results.
+        self.contingencies: dict[str,list[tuple[str,str]]] = {}
+        self.ctg_solved: dict[str,str] = {}
+
+    # ------------------ State ------------------
+    def _make_snapshot(self, tables: dict[str,pd.DataFrame] = None) -> dict:
+        if tables is not None:
+            bus_df = tables['Bus']
+            Vm = pd.to_numeric(bus_df['Vpu'], errors='coerce').to_numpy(dtype=float)
+            Va = np.deg2rad(pd.to_numeric(bus_df['Vangle'], errors='coerce').to_numpy(dtype=float))
+            return {'tables': {name: df.copy() for name, df in tables.items()}, 'Vm': Vm, 'Va': Va
+                    ,'bus_Pg': np.zeros(len(bus_df)), 'bus_Qg': np.zeros(len(bus_df)), 'network': None}
+        return {'tables': {name: df.copy() for name, df in self.tables.items()}, 'Vm': self.Vm.copy(), 'Va': self.Va.copy()
+                ,'bus_Pg': self.bus_Pg.copy(), 'bus_Qg': self.bus_Qg.copy(), 'network': self._network}
+
+    def _load_snapshot(self, snapshot: dict):
+        self.tables = {name: df.copy() for name, df in snapshot['tables'].items()}
+        self.Vm = snapshot['Vm'].copy()
+        self.Va = snapshot['Va'].copy()
+        self.bus_Pg = snapshot['bus_Pg'].copy()
+        self.bus_Qg = snapshot['bus_Qg'].copy()
+        self._network = snapshot['network']
+
+    def copy(self):
+        """An independent copy in the current state, e.g. for a worker process."""
+        return copy.deepcopy(self)
+
+    def SaveState(self):
+        self._saved = self._make_snapshot()
+        return ('',)
+
+    def LoadState(self):
+        if self._saved is None:
+            return ('LoadState: No state has been saved',)
+        self._load_snapshot(self._saved)
+        return ('',)
+
+    def OpenCase(self, fp):
+        # Only the case this object was built with (or one saved with SaveCase()) can be opened.
+        self._load_snapshot(self._files.get(str(fp), self._base))
+        self._saved = None
+        return ('',)
+
+    def SaveCase(self, fp, case_format = None, overwrite = True):
+        self._files[str(fp)] = self._make_snapshot()
+        return ('',)
+
+    def CloseCase(self):
+        return ('',)
+
+    # ------------------ Tables ------------------
+    def _new_object_ids(self, table: str, df: pd.DataFrame) -> list[str]:
+        if table == 'Bus':
+            return [epc_reader.object_id('BUS', int(n)) for n in pd.to_numeric(df['Number'])]
+        keys = []
+        for key in table_keys[table]:
+            column = df[key] if key in df.columns else pd.Series('', index=df.index)
+            if key in ['ID', 'Circuit']:
+                keys.append(column.astype(str).str.strip().tolist())
+            else:
+                keys.append(pd.to_numeric(column, errors='coerce').fillna(0).astype(np.int64).tolist())
+        return [epc_reader.object_id(object_types[table], *values) for values in zip(*keys)]
+
+    def _field_name(self, table: str, field: str) -> str:
+        # Column name in self.tables[table] (or a computed field) for a SimAuto field name. None if unknown.
+        columns = self.tables[table].columns
+        if field in columns or field in computed_fields[table]:
+            return field
+        lower = field.lower()
+        for name in list(columns) + computed_fields[table]:
+            if name.lower() == lower:
+                return name
+        alias = field_aliases.get(table, {}).get(lower)
+        if alias is not None and alias in columns:
+            return alias
+        return None
+
+    def _num(self, table: str, field: str, default: float = 0.0) -> np.ndarray:
+        values = pd.to_numeric(self.tables[table][field], errors='coerce').to_numpy(dtype=float)
+        return np.where(np.isnan(values), default, values)
+
+    def _closed(self, table: str, field: str = 'Status') -> np.ndarray:
+        return self.tables[table][field].astype(str).str.strip().to_numpy() == 'Closed'
+
+    def _bus_positions(self, numbers) -> np.ndarray:
+        # Position of each bus number in the bus table, or -1 if it doesn't exist.
+        numbers = pd.to_numeric(pd.Series(numbers), errors='coerce').to_numpy(dtype=float)
+        positions = np.full(len(numbers), -1, dtype=np.int64)
+        valid = ~np.isnan(numbers)
+        positions[valid] = self.bus_index.get_indexer(numbers[valid].astype(np.int64))
+        return positions
+
+    def _row_keys(self, table: str, df: pd.DataFrame) -> pd.Series:
+        # Composite key of each row, e.g. '10|1' for a generator.
+        parts = []
+        for key in table_keys[table]:
+            column = df[key] if key in df.columns else pd.Series('', index=df.index)
+            numeric = pd.to_numeric(column, errors='coerce')
+            if numeric.notna().all() and len(column) > 0 and key != 'ID' and key != 'Circuit':
+                parts.append(numeric.astype(np.int64).astype(str))
+            else:
+                parts.append(column.astype(str).str.strip())
+        return pd.Series(['|'.join(values) for values in zip(*parts)], index=df.index, dtype=object)
+
+    def _locate(self, table: str, incoming: pd.DataFrame) -> np.ndarray:
+        df = self.tables[table]
+        if 'ObjectID' in incoming.columns:
+            positions = pd.Index(df['ObjectID'].astype(str)).get_indexer(incoming['ObjectID'].astype(str).str.strip())
+            if (positions >= 0).all() or not all(key in incoming.columns for key in table_keys[table]):
+                return positions
+        return pd.Index(self._row_keys(table, df)).get_indexer(self._row_keys(table, incoming))
+
+    # ------------------ Network ------------------
+    def _network_model(self):
+        # Ybus and bus connectivity, rebuilt only after a change to the bus shunts, branches, or shunts.
+        if self._network is not None:
+            return self._network
+
+        n = len(self.bus_index)
+        br = self.tables['Branch']
+        f = self._bus_positions(br['BusNumFrom'])
+        t = self._bus_positions(br['BusNumTo'])
+        on = self._closed('Branch') & (f >= 0) & (t >= 0)
+        is_xf = (br['BranchDeviceType'].astype(str).str.strip() == 'Transformer').to_numpy() & ~np.isnan(pd.to_numeric(br['Xxfbase'], errors='coerce').to_numpy(dtype=float))
+
+        # Transformer impedances are on the transformer MVA base. Convert to the system base.
+        xf_scale = mva_base / self._num('Branch', 'XFMVABase', mva_base)
+        r = np.where(is_xf, self._num('Branch', 'Rxfbase') * xf_scale, self._num('Branch', 'R'))
+        x = np.where(is_xf, self._num('Branch', 'Xxfbase') * xf_scale, self._num('Branch', 'X'))
+        g_c = np.where(is_xf, self._num('Branch', 'Gxfbase') / xf_scale, self._num('Branch', 'G'))
+        b_c = np.where(is_xf, self._num('Branch', 'Bxfbase') / xf_scale, self._num('Branch', 'B'))
+        g_m = np.where(is_xf, self._num('Branch', 'Gmagxfbase') / xf_scale, 0.0)
+        b_m = np.where(is_xf, self._num('Branch', 'Bmagxfbase') / xf_scale, 0.0)
+        # Zero impedance branches (jumpers) get a small reactance.
+        x = np.where((r == 0.0) & (x == 0.0), 1e-4, x)
+
+        # Off-nominal ratio: tap, fixed taps, and winding kV vs. bus nominal kV.
+        kv = pd.to_numeric(self.tables['Bus']['NomkV'], errors='coerce').to_numpy(dtype=float)
+        kv_from = np.where(f >= 0, kv[f], np.nan)
+        kv_to = np.where(t >= 0, kv[t], np.nan)
+        ratio_from = self._num('Branch', 'XFNomkVbaseFrom', np.nan) / kv_from
+        ratio_to = self._num('Branch', 'XFNomkVbaseTo', np.nan) / kv_to
+        tap = (self._num('Branch', 'Tapxfbase', 1.0) * self._num('Branch', 'TapFixedFrom', 1.0) / self._num('Branch', 'TapFixedTo', 1.0)
+               * np.where(np.isfinite(ratio_from), ratio_from, 1.0) / np.where(np.isfinite(ratio_to), ratio_to, 1.0))
+        tap = np.where(is_xf & (tap > 0), tap, 1.0)
+        shift = np.where(is_xf, np.deg2rad(self._num('Branch', 'Phase')), 0.0)
+        tt = tap * np.exp(1j * shift)
+
+        ys = 1.0 / (r + 1j * x)
+        y_c = (g_c + 1j * b_c) / 2.0
+        Ytt = ys + y_c
+        Yff = Ytt / (tap * tap) + (g_m + 1j * b_m)
+        Yft = -ys / np.conj(tt)
+        Ytf = -ys / tt
+        f, t = f[on], t[on]
+        rows = np.concatenate([f, f, t, t])
+        cols = np.concatenate([f, t, f, t])
+        data = np.concatenate([Yff[on], Yft[on], Ytf[on], Ytt[on]])
+
+        # Shunts, in MW/Mvar at 1.0 pu. Positive Mvar is capacitive.
+        y_sh = (self._num('Bus', 'NomG') + 1j * self._num('Bus', 'NomB')) / mva_base
+        for table, bus_field in [('Shunt', 'BusNum'), ('LineShunt', 'BusNumLoc')]:
+            pos = self._bus_positions(self.tables[table][bus_field])
+            sh_on = self._closed(table) & (pos >= 0)
+            y = (self._num(table, 'MWNom') + 1j * self._num(table, 'MvarNom')) / mva_base
+            y_sh = y_sh + np.bincount(pos[sh_on], weights=y[sh_on].real, minlength=n) + 1j * np.bincount(pos[sh_on], weights=y[sh_on].imag, minlength=n)
+
+        Ybus = sp.csr_matrix((data, (rows, cols)), shape=(n, n)) + sp.diags(y_sh)
+        graph = sp.csr_matrix((np.ones(len(f)), (f, t)), shape=(n, n))
+        _, labels = connected_components(graph, directed=False)
+        self._network = (Ybus.tocsr(), labels)
+        return self._network
+
+    def admittance_matrix(self):
+        """Ybus (system base, in bus table order) and the connected group of each bus, for the current statuses."""
+        return self._network_model()
+
+    def bus_model(self) -> dict:
+        """Bus types (ref, pv, pq, live), Ybus, and injections (pu) for the current tables. See _bus_model()."""
+        return self._bus_model()
+
+    def _bus_model(self) -> dict:
+        """
+        Bus types and injections from the current tables.
+        Islands are numbered by size (1 = largest). Islands without a generator or slack bus are dead (island 0).
+        """
+        n = len(self.bus_index)
+        Ybus, labels = self._network_model()
+        bus_df = self.tables['Bus']
+        slack = (bus_df['Slack'].astype(str).str.strip().str.upper() == 'YES').to_numpy()
+
+        gen = self.tables['Gen']
+        g_pos = self._bus_positions(gen['BusNum'])
+        g_on = self._closed('Gen') & (g_pos >= 0)
+        g_avr = g_on & (gen['AVR'].astype(str).str.strip().str.upper() != 'NO').to_numpy()
+
+        # Number the energized islands, largest first.
+        energized = np.zeros(labels.max() + 1 if n > 0 else 0, dtype=bool)
+        energized[labels[slack]] = True
+        energized[labels[g_pos[g_on]]] = True
+        sizes = np.bincount(labels, minlength=len(energized))
+        order = [label for label in np.argsort(-sizes, kind='stable') if energized[label]]
+        island_of_label = np.zeros(len(energized), dtype=np.int64)
+        island_of_label[order] = np.arange(1, len(order) + 1)
+        island = island_of_label[labels]
+        live = island > 0
+
+        # One reference bus per island: the slack bus, or else the bus of the largest generator.
+        ref = np.zeros(n, dtype=bool)
+        ref[slack & live] = True
+        mw_max = np.where(g_on, self._num('Gen', 'MWMax', 0.0), -np.inf)
+        for label in order:
+            if not ref[labels == label].any():
+                candidates = np.flatnonzero(g_on & (labels[np.maximum(g_pos, 0)] == label))
+                ref[g_pos[candidates[np.argmax(mw_max[candidates])]]] = True
+        pv = np.zeros(n, dtype=bool)
+        pv[g_pos[g_avr]] = True
+        pv &= live & ~ref
+        pq = live & ~ref & ~pv
+
+        # Voltage setpoint: the first regulating generator at each bus.
+        vset = np.full(n, np.nan)
+        volt_set = self._num('Gen', 'VoltSet', np.nan)
+        first = pd.Series(volt_set[g_avr], index=g_pos[g_avr]).groupby(level=0).first()
+        vset[first.index.to_numpy(dtype=np.int64)] = first.to_numpy()
+
+        # Generation. Generators without AVR hold their Mvar setpoint.
+        Pg = np.bincount(g_pos[g_on], weights=self._num('Gen', 'MWSetPoint')[g_on], minlength=n)
+        g_fixed = g_on & ~g_avr
+        Qfixed = np.bincount(g_pos[g_fixed], weights=self._num('Gen', 'MvarSetPoint')[g_fixed], minlength=n)
+        qmax = np.bincount(g_pos[g_avr], weights=self._num('Gen', 'MvarMax', 9999.0)[g_avr], minlength=n)
+        qmin = np.bincount(g_pos[g_avr], weights=self._num('Gen', 'MvarMin', -9999.0)[g_avr], minlength=n)
+
+        # Loads: constant power, current, and impedance parts. Distributed generation is negative constant power.
+        l_pos = self._bus_positions(self.tables['Load']['BusNum'])
+        l_on = self._closed('Load') & (l_pos >= 0)
+        d_on = l_on & self._closed('Load', 'DistStatus')
+        def load_sum(p_field, q_field, mask):
+            return (np.bincount(l_pos[mask], weights=self._num('Load', p_field)[mask], minlength=n)
+                    + 1j * np.bincount(l_pos[mask], weights=self._num('Load', q_field)[mask], minlength=n))
+        Sp = load_sum('SMW', 'SMvar', l_on) - load_sum('DistMWInput', 'DistMvarInput', d_on)
+        Si = load_sum('IMW', 'IMvar', l_on)
+        Sz = load_sum('ZMW', 'ZMvar', l_on)
+
+        return {
+            'Ybus': Ybus, 'island': island, 'live': live, 'ref': ref, 'pv': pv, 'pq': pq, 'vset': vset
+            ,'Sg': (Pg + 1j * Qfixed) / mva_base, 'Qfixed': Qfixed / mva_base, 'qmax': qmax / mva_base, 'qmin': qmin / mva_base
+            ,'Sp': Sp / mva_base, 'Si': Si / mva_base, 'Sz': Sz / mva_base
+            ,'g_pos': g_pos, 'g_on': g_on, 'g_avr': g_avr
+        }
+
+    def _newton(self, Ybus, V: np.ndarray, Sg: np.ndarray, Sp, Si, Sz, pv: np.ndarray, pq: np.ndarray):
+        # Newton-Raphson iterations, from the starting point V. Returns (V, converged).
+        V = V.copy()
+        pvpq = np.concatenate([pv, pq])
+        npvpq = len(pvpq)
+        tolerance = self.tolerance_mva / mva_base
+        for iteration in range(self.max_iterations + 1):
+            Ibus = Ybus @ V
+            Vm = np.abs(V)
+            mismatch = V * np.conj(Ibus) - Sg + Sp + Si * Vm + Sz * Vm * Vm
+            F = np.concatenate([mismatch[pvpq].real, mismatch[pq].imag])
+            if not np.isfinite(F).all():
+                return V, False
+            if len(F) == 0 or np.abs(F).max() < tolerance:
+                return V, True
+            if iteration == self.max_iterations:
+                break
+
+            dS_dVm, dS_dVa = dsbus_dv(Ybus, V, Ibus)
+            # Voltage dependent loads.
+            dS_dVm = dS_dVm + sp.diags(Si + 2.0 * Sz * Vm)
+            dVa_rows = dS_dVa[pvpq]
+            dVm_rows = dS_dVm[pvpq]
+            J = sp.bmat([
+                [dVa_rows[:, pvpq].real, dVm_rows[:, pq].real]
+                ,[dS_dVa[pq][:, pvpq].imag, dS_dVm[pq][:, pq].imag]
+            ], format='csc')
+            try:
+                dx = spla.spsolve(J, -F)
+            except RuntimeError:
+                return V, False
+
+            Va = np.angle(V)
+            Va[pvpq] += dx[:npvpq]
+            Vm[pq] += dx[npvpq:]
+            if not np.isfinite(dx).all() or (len(pq) > 0 and (Vm[pq].min() < 0.1 or Vm[pq].max() > 3.0)):
+                return V, False
+            V = Vm * np.exp(1j * Va)
+        return V, False
+
+    def _solve(self) -> bool:
+        model = self._bus_model()
+        live, ref, vset = model['live'], model['ref'], model['vset']
+        pv = model['pv'].copy()
+
+        # Start from the present solution. Dead buses are carried at 1.0 pu, and reported at 0.
+        Vm = np.where(np.isfinite(self.Vm) & (self.Vm > 0.5), self.Vm, 1.0)
+        Va = np.where(np.isfinite(self.Va) & live, self.Va, 0.0)
+        regulated = (pv | ref) & np.isfinite(vset)
+        Vm[regulated] = vset[regulated]
+        V = Vm * np.exp(1j * Va)
+        Sg = model['Sg'].copy()
+
+        # Solve, then switch generator buses which exceed their Mvar limits to PQ at the limit, and solve again.
+        for _ in range(self.max_q_switches + 1):
+            pq = live & ~ref & ~pv
+            V, converged = self._newton(model['Ybus'], V, Sg, model['Sp'], model['Si'], model['Sz'], np.flatnonzero(pv), np.flatnonzero(pq))
+            if not converged:
+                return False
+            Vm = np.abs(V)
+            S = V * np.conj(model['Ybus'] @ V) + model['Sp'] + model['Si'] * Vm + model['Sz'] * Vm * Vm
+            Q_avr = S.imag - model['Qfixed']
+            over = pv & (Q_avr > model['qmax'] + 1e-6)
+            under = pv & (Q_avr < model['qmin'] - 1e-6)
+            if not (over.any() or under.any()):
+                break
+            pv &= ~(over | under)
+            Sg[over] = Sg[over].real + 1j * (model['Qfixed'][over] + model['qmax'][over])
+            Sg[under] = Sg[under].real + 1j * (model['Qfixed'][under] + model['qmin'][under])
+
+        self.Vm = np.where(live, np.abs(V), 0.0)
+        self.Va = np.where(live, np.angle(V), 0.0)
+        self.bus_Pg = np.where(live, S.real, 0.0) * mva_base
+        self.bus_Qg = np.where(live, S.imag, 0.0) * mva_base
+        return True
+
+    def _mismatch(self) -> np.ndarray:
+        # Bus mismatch (MVA, complex) at the present voltages. Slack P and generator Mvar are free to balance.
+        model = self._bus_model()
+        V = self.Vm * np.exp(1j * self.Va)
+        Vm = self.Vm
+        mismatch = V * np.conj(model['Ybus'] @ V) - model['Sg'] + model['Sp'] + model['Si'] * Vm + model['Sz'] * Vm * Vm
+        mismatch = np.where(model['live'], mismatch, 0.0)
+        mismatch = np.where(model['ref'], 0.0, mismatch.real) + 1j * np.where(model['ref'] | model['pv'], 0.0, mismatch.imag)
+        return mismatch * mva_base
+
+    def _computed(self, table: str, field: str) -> np.ndarray:
+        df = self.tables[table]
+        island = self._bus_model()['island'] if field == 'IslandNumber' else None
+        if table == 'Bus':
+            if field == 'Vpu':
+                return self.Vm.copy()
+            if field == 'Vangle':
+                return np.rad2deg(self.Va)
+            if field in ['MismatchP', 'MismatchQ']:
+                mismatch = self._mismatch()
+                return mismatch.real if field == 'MismatchP' else mismatch.imag
+            if field == 'IslandNumber':
+                return island
+            if field == 'BusIsStarBus:1':
+                return np.full(len(df), 'NO', dtype=object)
+        if table == 'Branch' and field in ['BranchVpuHigh', 'BranchVpuLow', 'IslandNumber']:
+            f = self._bus_positions(df['BusNumFrom'])
+            t = self._bus_positions(df['BusNumTo'])
+            if field == 'IslandNumber':
+                return np.where(f >= 0, island[f], 0)
+            v_from = np.where(f >= 0, self.Vm[f], np.nan)
+            v_to = np.where(t >= 0, self.Vm[t], np.nan)
+            return np.fmax(v_from, v_to) if field == 'BranchVpuHigh' else np.fmin(v_from, v_to)
+        if table == 'Gen' and field in ['MW', 'Mvar']:
+            model = self._bus_model()
+            g_pos, g_on, g_avr = model['g_pos'], model['g_on'], model['g_avr']
+            n = len(self.bus_index)
+            if field == 'MW':
+                # The slack bus generators share the balance equally.
+                values = np.where(g_on, self._num('Gen', 'MWSetPoint'), 0.0)
+                count = np.bincount(g_pos[g_on], minlength=n)
+                at_ref = g_on & model['ref'][np.maximum(g_pos, 0)]
+                values[at_ref] = self.bus_Pg[g_pos[at_ref]] / count[g_pos[at_ref]]
+                return values
+            values = np.where(g_on & ~g_avr, self._num('Gen', 'MvarSetPoint'), 0.0)
+            count = np.bincount(g_pos[g_avr], minlength=n)
+            q_avr = self.bus_Qg - model['Qfixed'] * mva_base
+            values[g_avr] = q_avr[g_pos[g_avr]] / count[g_pos[g_avr]]
+            return values
+        bus_field = 'BusNumLoc' if table == 'LineShunt' else 'BusNum'
+        pos = self._bus_positions(df[bus_field])
+        if field == 'Vpu':
+            return np.where(pos >= 0, self.Vm[np.maximum(pos, 0)], np.nan)
+        return np.where(pos >= 0, island[np.maximum(pos, 0)], 0)
+
+    def _column(self, table: str, field: str) -> np.ndarray:
+        name = self._field_name(table, field)
+        if name in computed_fields[table]:
+            return np.asarray(self._computed(table, name))
+        return self.tables[table][name].to_numpy()
+
+    def _filter_mask(self, table: str, filter_group: str) -> np.ndarray:
+        # Row mask for a simple filter. Raises ValueError for filters which aren't supported.
+        if filter_group is None or filter_group.strip() == '':
+            return np.ones(len(self.tables[table]), dtype=bool)
+        match = filter_re.match(filter_group)
+        if match is None or self._field_name(table, match.group(1)) is None:
+            raise ValueError(f'Unsupported filter: {filter_group}')
+        field, op, value = match.group(1), match.group(2).lower(), match.group(3).strip().strip('"\'')
+        column = self._column(table, field)
+        if op in ['contains', 'notcontains']:
+            found = pd.Series(column, dtype=object).astype(str).str.contains(value, case=False, regex=False).to_numpy()
+            return found if op == 'contains' else ~found
+        try:
+            column = pd.to_numeric(pd.Series(column), errors='raise').to_numpy(dtype=float)
+            value = float(value)
+        except (ValueError, TypeError):
+            column = pd.Series(column, dtype=object).astype(str).str.strip().to_numpy()
+        compare = {'=': np.equal, '<>': np.not_equal, '>': np.greater, '<': np.less, '>=': np.greater_equal, '<=': np.less_equal}[op]
+        return np.asarray(compare(column, value), dtype=bool)
+
+    # ------------------ SimAuto methods ------------------
+    def GetParametersMultipleElementRect(self, table, parameters, filter_group = ''):
+        if table == 'PWCaseInformation':
+            mismatch = self._mismatch()
+            values = {'maxmismatchmw': np.abs(mismatch.real).max(initial=0.0), 'maxmismatchmvar': np.abs(mismatch.imag).max(initial=0.0)}
+            if not all(p.lower() in values for p in parameters):
+                return (f'GetParametersMultipleElementRect: Unsupported field in {table}',)
+            return ('', ((tuple(to_text([values[p.lower()] for p in parameters])),)))
+        if table == 'Contingency':
+            values = {'name': list(self.contingencies.keys())
+                      ,'solved': [self.ctg_solved.get(name, 'NO') for name in self.contingencies.keys()]
+                      ,'processed': ['YES' if name in self.ctg_solved else 'NO' for name in self.contingencies.keys()]
+                      ,'skip': ['NO'] * len(self.contingencies)}
+            if not all(p.lower() in values for p in parameters):
+                return (f'GetParametersMultipleElementRect: Unsupported field in {table}',)
+            if len(self.contingencies) == 0:
+                return ('', None)
+            return ('', tuple(zip(*[values[p.lower()] for p in parameters])))
+        if table not in self.tables:
+            return (f'GetParametersMultipleElementRect: Table {table} is not supported',)
+        unknown = [p for p in parameters if self._field_name(table, p) is None]
+        if len(unknown) > 0:
+            return (f'GetParametersMultipleElementRect: Unknown field(s) {unknown} in {table}',)
+        try:
+            mask = self._filter_mask(table, filter_group)
+        except ValueError as e:
+            return (f'GetParametersMultipleElementRect: {e}',)
+        if not mask.any():
+            return ('', None)
+        columns = [to_text(self._column(table, p)[mask]) for p in parameters]
+        return ('', tuple(zip(*columns)))
+
+    def ChangeParametersMultipleElementRect(self, table, parameters, rows):
+        if table not in self.tables:
+            return (f'ChangeParametersMultipleElementRect: Table {table} is not supported',)
+        if len(rows) == 0:
+            return ('',)
+        # Fields this table doesn't have are ignored. Keys are kept to find the objects.
+        names = [self._field_name(table, p) or p for p in parameters]
+        incoming = pd.DataFrame([list(row) for row in rows], columns=names, dtype=object)
+        incoming = incoming.loc[:, ~incoming.columns.duplicated()]
+        for column in incoming.columns:
+            incoming[column] = incoming[column].astype(str).str.strip()
+
+        positions = self._locate(table, incoming)
+        missing = positions < 0
+        if missing.any():
+            if not self.CreateIfNotFound or table == 'Bus' or not all(key in incoming.columns for key in table_keys[table]):
+                return (f'ChangeParametersMultipleElementRect: {int(missing.sum())} {table} object(s) not found',)
+            new_df = incoming[missing].copy()
+            for field, default in model_defaults[table].items():
+                if field not in new_df.columns:
+                    new_df[field] = default
+            new_df['ObjectID'] = self._new_object_ids(table, new_df)
+            new_df = new_df[[c for c in new_df.columns if c in self.tables[table].columns]]
+            for column in new_df.columns:
+                if pd.api.types.is_numeric_dtype(self.tables[table][column]):
+                    new_df[column] = pd.to_numeric(new_df[column], errors='coerce')
+            self.tables[table] = pd.concat([self.tables[table], new_df], ignore_index=True)
+            positions = self._locate(table, incoming)
+
+        df = self.tables[table]
+        for column in incoming.columns:
+            if column not in df.columns or column == 'ObjectID' or column in computed_fields[table] and not (table == 'Bus' and column in ['Vpu', 'Vangle']):
+                continue
+            if table == 'Bus' and column in ['Vpu', 'Vangle']:
+                values = pd.to_numeric(incoming[column], errors='coerce').to_numpy(dtype=float)
+                state = self.Vm if column == 'Vpu' else self.Va
+                state[positions] = values if column == 'Vpu' else np.deg2rad(values)
+                continue
+            current = df[column]
+            if pd.api.types.is_numeric_dtype(current) and not pd.api.types.is_bool_dtype(current):
+                values = pd.to_numeric(incoming[column], errors='coerce').to_numpy(dtype=float)
+                data = current.to_numpy(copy=True)
+                if data.dtype.kind in 'iu' and not (np.isfinite(values).all() and (values == np.round(values)).all()):
+                    data = data.astype(float)
+                data[positions] = values
+            else:
+                data = current.to_numpy(dtype=object, copy=True)
+                data[positions] = incoming[column].to_numpy(dtype=object)
+            df[column] = data
+
+        if table in ['Bus', 'Branch', 'Shunt', 'LineShunt']:
+            self._network = None
+        return ('',)
+
+    def RunScriptCommand(self, command):
+        name = str(command).strip().rstrip(';').split('(')[0].strip()
+        if name == 'EnterMode':
+            return ('',)
+        if name == 'SolvePowerFlow':
+            if self._solve():
+                return ('',)
+            return ('SolvePowerFlow: Power flow did not converge',)
+        if name == 'ClearSmallIslands':
+            # De-energizes everything outside the largest island.
+            island = self._bus_model()['island']
+            for table, bus_field in [('Gen', 'BusNum'), ('Load', 'BusNum'), ('Shunt', 'BusNum'), ('Branch', 'BusNumFrom')]:
+                pos = self._bus_positions(self.tables[table][bus_field])
+                outside = (pos >= 0) & (island[np.maximum(pos, 0)] != 1)
+                if outside.any():
+                    status = self.tables[table]['Status'].to_numpy(dtype=object, copy=True)
+                    status[outside] = 'Open'
+                    self.tables[table]['Status'] = status
+            self._network = None
+            return ('',)
+        if name == 'LoadAux':
+            # Contingencies are kept for CTGSolveAll. Other data sections are written to their tables.
+            try:
+                sections = read_aux_data(str(command).split('"')[1])
+            except (IndexError, OSError, ValueError) as e:
+                return (f'LoadAux: {e}',)
+            for object_type, df in sections.items():
+                if object_type == 'Contingency':
+                    for ctg_name in df['Name']:
+                        self.contingencies.setdefault(ctg_name, [])
+                elif object_type == 'ContingencyElement':
+                    for ctg_name, object_id, action in df[['Contingency', 'Object', 'Action']].itertuples(index=False):
+                        self.contingencies.setdefault(ctg_name, []).append((object_id, action))
+                elif object_type in self.tables:
+                    result = self.ChangeParametersMultipleElementRect(object_type, df.columns.tolist(), df.values.tolist())
+                    if result[0] != '':
+                        return result
+            return ('',)
+        if name == 'Delete':
+            if 'contingency' not in str(command).lower():
+                return (f'RunScriptCommand: {command} is not supported by NewtonRaphsonSimAuto',)
+            self.contingencies = {}
+            self.ctg_solved = {}
+            return ('',)
+        if name == 'CTGSolveAll':
+            # Each contingency is applied to, and then restored from, the current (reference) state.
+            reference = self._make_snapshot()
+            self.ctg_solved = {}
+            for ctg_name, elements in self.contingencies.items():
+                try:
+                    for object_id, action in elements:
+                        self._apply_ctg_action(object_id, action)
+                    self.ctg_solved[ctg_name] = 'YES' if self._solve() else 'NO'
+                except ValueError as e:
+                    self._load_snapshot(reference)
+                    return (f'CTGSolveAll: {ctg_name}: {e}',)
+                self._load_snapshot(reference)
+            return ('',)
+        return (f'RunScriptCommand: {name} is not supported by NewtonRaphsonSimAuto',)
+
+    def _apply_ctg_action(self, object_id: str, action: str):
+        # OPEN / CLOSE, or SETTO / CHANGEBY <value> MW, for the object with this ObjectID.
+        tables = {prefix: table for table, prefix in object_types.items()}
+        table = tables.get(object_id.split(' ')[0].upper())
+        if table is None:
+            raise ValueError(f'Unsupported contingency object {object_id}')
+        position = np.flatnonzero(self.tables[table]['ObjectID'].to_numpy() == object_id)
+        if len(position) == 0:
+            raise ValueError(f'{object_id} not found')
+        df = self.tables[table]
+        match = ctg_value_re.match(action)
+        if action.strip().upper() in ['OPEN', 'CLOSE']:
+            status = df['Status'].to_numpy(dtype=object, copy=True)
+            status[position] = 'Open' if action.strip().upper() == 'OPEN' else 'Closed'
+            df['Status'] = status
+            if table in ['Branch', 'Shunt', 'LineShunt']:
+                self._network = None
+        elif match is not None and table in ['Gen', 'Load']:
+            field = 'MWSetPoint' if table == 'Gen' else 'SMW'
+            values = df[field].to_numpy(dtype=float, copy=True)
+            value = float(match.group(2))
+            values[position] = value if match.group(1).upper() == 'SETTO' else values[position] + value
+            df[field] = values
+        else:
+            raise ValueError(f'Unsupported contingency action {action} for {object_id}')
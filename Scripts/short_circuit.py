@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+import scipy.sparse.linalg as spla
+from Scripts import nr_backend
+
+# Offline 3-phase fault duty at every bus.
+# The positive-sequence bus admittance matrix (branches, transformers & shunts, from nr_backend) plus each in-service
+# generator's source admittance (GenR + jGenX, and its step-up StepR + jStepX, on its MVABase) is factored once with
+# sparse LU. The Thevenin impedance of each bus is the diagonal of the inverse, taken in blocks of unit right-hand
+# sides (chunk_size at a time), so every bus is solved from the one factorization instead of one Fault object each.
+# Fault current (pu) = prefault voltage / Thevenin impedance, and fault MVA = |current| * 100 MVA.
+# Buses in islands without a source have no fault current (0 MVA).
+
+# Source reactance (pu on the machine base) for in-service generators with no GenR/GenX.
+default_source_x = 0.25
+# Unit right-hand sides per LU solve. Each block holds (buses x chunk_size) complex values.
+chunk_size = 128
+
+def source_admittance(gen_df: pd.DataFrame, bus_index: pd.Index) -> np.ndarray:
+    """Total generator source admittance (pu, system base) at each bus in bus_index."""
+    y = np.zeros(len(bus_index), dtype=complex)
+    if gen_df is None or len(gen_df) == 0:
+        return y
+    def num(field, default):
+        if field not in gen_df.columns:
+            return np.full(len(gen_df), default, dtype=float)
+        values = pd.to_numeric(gen_df[field], errors='coerce').to_numpy(dtype=float)
+        return np.where(np.isnan(values), default, values)
+
+    positions = bus_index.get_indexer(pd.to_numeric(gen_df['BusNum'], errors='coerce').fillna(-1).astype(np.int64))
+    on = (gen_df['Status'].astype(str).str.strip() == 'Closed').to_numpy() & (positions >= 0)
+    mva_base = num('MVABase', nr_backend.mva_base)
+    mva_base = np.where(mva_base > 0, mva_base, nr_backend.mva_base)
+    z = num('GenR', 0.0) + 1j * num('GenX', 0.0)
+    z = np.where(np.abs(z) > 0, z, 1j * default_source_x)
+    z = (z + num('StepR', 0.0) + 1j * num('StepX', 0.0)) * nr_backend.mva_base / mva_base
+    np.add.at(y, positions[on], 1.0 / z[on])
+    return y
+
+def thevenin_impedance(Ybus, labels: np.ndarray, y_source: np.ndarray) -> np.ndarray:
+    """
+    Diagonal of (Ybus + diag(y_source))^-1, in pu. labels: The connected group of each bus.
+    NaN for buses in groups without a source.
+    """
+    n = Ybus.shape[0]
+    z = np.full(n, np.nan, dtype=complex)
+    live = np.isin(labels, np.unique(labels[np.abs(y_source) > 0]))
+    positions = np.flatnonzero(live)
+    if len(positions) == 0:
+        return z
+
+    Y = (Ybus + sp.diags(y_source)).tocsr()[positions][:, positions].tocsc()
+    lu = spla.splu(Y)
+    m = len(positions)
+    for start in range(0, m, chunk_size):
+        stop = min(start + chunk_size, m)
+        rhs = np.zeros((m, stop - start), dtype=complex)
+        rhs[np.arange(start, stop), np.arange(stop - start)] = 1.0
+        z[positions[start:stop]] = lu.solve(rhs)[np.arange(start, stop), np.arange(stop - start)]
+    return z
+
+def fault_duty(case_dict: dict, shunt_df: pd.DataFrame = None, prefault: str = 'case') -> pd.DataFrame:
+    """
+    3-phase bolted fault duty at every bus of the case in case_dict (the output of wpp_lib.get_case_data()).
+    shunt_df: Switched shunts, e.g. wpp_lib.get_param_df(SimAuto, 'Shunt', nr_backend.shunt_params).
+    prefault: 'case' for the bus voltages in the case (Vpu), 'flat' for 1.0 pu.
+    Returns the columns of wpp_lib.get_fault_duty(): FaultName, WhoAmI, BusNumber, FaultType, FaultImpedance,
+    FaultImpedance:1, BusNomVolt, ABCPhaseI (kA), MVA.
+    """
+    model = nr_backend.NewtonRaphsonSimAuto(case_dict, shunt_df)
+    bus_df = model.tables['Bus']
+    Ybus, labels = model.admittance_matrix()
+    z = thevenin_impedance(Ybus, labels, source_admittance(model.tables['Gen'], model.bus_index))
+
+    vf = pd.to_numeric(bus_df['Vpu'], errors='coerce').fillna(1.0).to_numpy(dtype=float) if prefault == 'case' else np.ones(len(bus_df))
+    vf = np.where(vf > 0, vf, 1.0)
+    current = np.where(np.isnan(z), 0.0, vf / np.abs(np.where(np.isnan(z), 1.0, z)))
+
+    result_df = pd.DataFrame()
+    result_df['FaultName'] = bus_df['Number'].astype(str) + ' : ' + bus_df['Name'].astype(str) + ' : ' + bus_df['NomkV'].astype(str)
+    result_df['WhoAmI'] = bus_df['ObjectID']
+    result_df['BusNumber'] = bus_df['Number'].astype(np.int64)
+    result_df['FaultType'] = '3PB'
+    result_df['FaultImpedance'] = 0.0
+    result_df['FaultImpedance:1'] = 0.0
+    result_df['BusNomVolt'] = pd.to_numeric(bus_df['NomkV'], errors='coerce')
+    result_df['MVA'] = current * nr_backend.mva_base
+    # MVA = sqrt(3) * kV * kA
+    result_df['ABCPhaseI'] = result_df['MVA'] / ((3 ** 0.5) * result_df['BusNomVolt'])
+    return result_df[['FaultName', 'WhoAmI', 'BusNumber', 'FaultType', 'FaultImpedance', 'FaultImpedance:1', 'BusNomVolt', 'ABCPhaseI', 'MVA']]
+
+def compare(offline_df: pd.DataFrame, simauto_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Per bus: the MVA from fault_duty() & PowerWorld (wpp_lib.get_fault_duty(mode='simauto')), and the difference.
+    Largest differences first.
+    """
+    df = simauto_df[['BusNumber', 'FaultName', 'BusNomVolt', 'MVA']].rename(columns={'MVA': 'MVA_PowerWorld'}).merge(
+        offline_df[['BusNumber', 'MVA']].rename(columns={'MVA': 'MVA_Offline'}), on='BusNumber', how='outer'
+    )
+    df['DiffMVA'] = df['MVA_Offline'] - df['MVA_PowerWorld']
+    df['DiffPct'] = 100.0 * df['DiffMVA'] / df['MVA_PowerWorld'].where(df['MVA_PowerWorld'] != 0)
+    return df.sort_values(by='DiffPct', key=abs, ascending=False, na_position='first', kind='stable').reset_index(drop=True)
@@ -0,0 +1,177 @@
+from pathlib import Path
+import multiprocessing as mp
+import queue
+import time
+import traceback
+import pandas as pd
+import Scripts.wpp_lib as wpp_lib
+
+# Long-lived SimAuto worker processes.
+# Each worker starts SimAuto and opens the case once, then runs tasks from a shared queue until the pool is
+# closed. Between tasks, the case is reset to its opened (and solved) state with LoadState, so the start-up
+# cost of each worker (several minutes for a large case) is paid once per run instead of once per hour.
+#
+# Tasks are taken by whichever worker is free next, so a slow task doesn't hold up the others. Submit many
+# small tasks, most expensive first, for the best balance.
+#
+# A task is a module-level function called as func(SimAuto, *args), which is picklable. A task may use
+# SimAuto.SaveState() only while the case is in its opened state (e.g. at its start), since the pool resets
+# each worker by loading that saved state.
+
+def worker_main(index: int, pw_fp: Path, task_queue, result_queue):
+    # Results are sent as (task_id, worker index, ok, value, start, end). task_id None is the start-up message.
+    start = time.time()
+    try:
+        SimAuto = wpp_lib.dispatch_simauto(f'simauto_pool_{index}')
+        if not wpp_lib.open_case(SimAuto, pw_fp):
+            raise RuntimeError(f'Could not open: {str(pw_fp)}')
+        wpp_lib.solve(SimAuto, check='skip')
+        SimAuto.SaveState()
+    except Exception:
+        result_queue.put((None, index, False, traceback.format_exc(), start, time.time()))
+        return
+    result_queue.put((None, index, True, None, start, time.time()))
+
+    while True:
+        task = task_queue.get()
+        if task is None:
+            break
+        task_id, session, func, args = task
+        start = time.time()
+        if session is not None:
+            wpp_lib.set_simauto_session(SimAuto, session)
+        try:
+            result = func(SimAuto, *args)
+            ok = True
+        except Exception:
+            result = traceback.format_exc()
+            ok = False
+        # Back to the opened case for the next task.
+        SimAuto.LoadState()
+        result_queue.put((task_id, index, ok, result, start, time.time()))
+
+    SimAuto.CloseCase()
+    SimAuto = None
+    return
+
+class SimAutoPool:
+    """
+    A pool of SimAuto worker processes, each with pw_fp open, for the life of the pool.
+    Use as a context manager, so the workers are always shut down:
+        with SimAutoPool(pw_fp) as pool:
+            results = pool.map(func, [(args...), ...])
+    num_workers: Defaults to one per CPU.
+    """
+    def __init__(self, pw_fp: Path, num_workers: int = None):
+        if num_workers is None:
+            num_workers = wpp_lib.simauto_worker_count(mp.cpu_count())
+        self.pw_fp = Path(pw_fp)
+        self.num_workers = num_workers
+        self.task_queue = mp.Queue()
+        self.result_queue = mp.Queue()
+        self.next_task_id = 0
+        # One entry per finished task: worker, task, and start/end times.
+        self.task_log: list[dict[str,object]] = []
+        self.workers = [
+            mp.Process(target=worker_main, args=(index, self.pw_fp, self.task_queue, self.result_queue), daemon=True)
+            for index in range(num_workers)
+        ]
+        for worker in self.workers:
+            worker.start()
+        print(f'Started {num_workers} SimAuto workers for {self.pw_fp.name}')
+
+    def imap_unordered(self, func, args_list: list[tuple], sessions: list[str] = None, poll_seconds: float = 5.0):
+        """
+        Runs func(SimAuto, *args) for each args in args_list, yielding (position in args_list, result) as each task finishes.
+        Tasks are started in the order given.
+        sessions: Optional record/replay session name per task (see wpp_lib.set_simauto_session()).
+        Raises RuntimeError if a task fails, or a worker exits. The batch's tasks which haven't started are then
+        cancelled, and results of its tasks which were already running are ignored by later calls.
+        """
+        positions: dict[int,int] = {}
+        for position, args in enumerate(args_list):
+            session = sessions[position] if sessions is not None else None
+            self.task_queue.put((self.next_task_id, session, func, tuple(args)))
+            positions[self.next_task_id] = position
+            self.next_task_id += 1
+
+        remaining = len(positions)
+        try:
+            while remaining > 0:
+                try:
+                    task_id, index, ok, value, start, end = self.result_queue.get(timeout=poll_seconds)
+                except queue.Empty:
+                    # Workers only exit when the pool is closed. One that has exited will never finish its task.
+                    stopped = [i for i, worker in enumerate(self.workers) if not worker.is_alive()]
+                    if len(stopped) > 0:
+                        raise RuntimeError(f'SimAuto workers {stopped} exited unexpectedly.')
+                    continue
+                if task_id is not None and task_id not in positions:
+                    # From an earlier batch which failed (or wasn't read to the end).
+                    continue
+                if not ok:
+                    raise RuntimeError(f'SimAuto worker {index} failed:\n{value}')
+                if task_id is None:
+                    continue
+                self.task_log.append({'Worker': index, 'TaskID': task_id, 'Start': start, 'End': end})
+                remaining -= 1
+                yield positions[task_id], value
+        finally:
+            if remaining > 0:
+                self.cancel_queued()
+
+    def cancel_queued(self):
+        # Removes the tasks which no worker has taken yet. Any missed here still run, but their results are ignored.
+        while True:
+            try:
+                self.task_queue.get_nowait()
+            except queue.Empty:
+                break
+        return
+
+    def map(self, func, args_list: list[tuple], sessions: list[str] = None, poll_seconds: float = 5.0) -> list:
+        """Same as imap_unordered(), but returns the results in the same order as args_list."""
+        results = [None] * len(args_list)
+        for position, value in self.imap_unordered(func, args_list, sessions, poll_seconds):
+            results[position] = value
+        return results
+
+    def utilization_df(self) -> pd.DataFrame:
+        """
+        Tasks, busy time, and utilization per worker, over the span of the tasks in task_log.
+        Clear task_log (e.g. at the start of each hour) to report on a single batch of tasks.
+        """
+        columns = ['Worker', 'Tasks', 'BusySeconds', 'IdleSeconds', 'Utilization']
+        if len(self.task_log) == 0:
+            return pd.DataFrame(columns=columns)
+        log_df = pd.DataFrame(self.task_log)
+        log_df['Seconds'] = log_df['End'] - log_df['Start']
+        span = max(log_df['End'].max() - log_df['Start'].min(), 1e-9)
+        df = pd.DataFrame({'Worker': range(self.num_workers)})
+        df['Tasks'] = df['Worker'].map(log_df.groupby('Worker').size()).fillna(0).astype(int)
+        df['BusySeconds'] = df['Worker'].map(log_df.groupby('Worker')['Seconds'].sum()).fillna(0.0)
+        df['IdleSeconds'] = span - df['BusySeconds']
+        df['Utilization'] = df['BusySeconds'] / span
+        return df[columns]
+
+    def close(self, timeout: float = 120.0):
+        """Asks each worker to close its case and exit, then stops any which don't within the timeout."""
+        for worker in self.workers:
+            if worker.is_alive():
+                self.task_queue.put(None)
+        for worker in self.workers:
+            worker.join(timeout)
+        for worker in self.workers:
+            if worker.is_alive():
+                print(f'Stopping unresponsive SimAuto worker: {worker.pid}')
+                worker.terminate()
+                worker.join()
+        self.workers = []
+        return
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
+        return False
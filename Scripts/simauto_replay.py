@@ -0,0 +1,233 @@
+from pathlib import Path
+import contextlib
+import gzip
+import json
+import re
+import tempfile
+import time
+
+# Record/replay stand-in for SimAuto.
+# RecordingSimAuto wraps a real SimAuto object and writes every call (method, arguments, response) to a
+# gzipped JSON-lines file. ReplaySimAuto serves those responses back in the same order, without PowerWorld,
+# so the Python data path can be run, timed, and regression tested on any platform.
+# Each entry is written as its own gzip member, so a recording stays readable even if the process is killed.
+# Paths under the folders in path_roots are recorded relative to them (e.g. <repo>/Output/TopoSeed.pwb), and live
+# calls are compared in the same form, so a recording made on one machine (e.g. C:\...) replays on another.
+
+file_version = 2
+
+# Folders which differ between machines, by the placeholder they're recorded as. More can be added (e.g. a scratch folder).
+path_roots: dict[str,Path] = {
+    '<repo>': Path(__file__).resolve().parents[1]
+    ,'<cwd>': Path.cwd()
+    ,'<temp>': Path(tempfile.gettempdir())
+}
+
+class ReplayMismatchError(Exception):
+    """Raised when a replayed run makes a different SimAuto call than the recorded run."""
+    pass
+
+def normalize(value):
+    # Convert arguments/responses to plain JSON types (tuples -> lists, Paths -> str).
+    return json.loads(json.dumps(value, default=str))
+
+@contextlib.contextmanager
+def mapped_path(placeholder: str, path: Path):
+    """Records & compares path as placeholder within the block, e.g. a temp folder with a random name."""
+    path_roots[placeholder] = Path(path)
+    try:
+        yield
+    finally:
+        path_roots.pop(placeholder, None)
+
+def root_forms(root: Path) -> list:
+    # A folder as it may appear in an argument: native, with forward slashes, and with backslashes.
+    return list(dict.fromkeys([str(root), root.as_posix(), str(root).replace('/', '\\')]))
+
+def portable(value):
+    """
+    value (after normalize()), with paths under path_roots replaced by their placeholder and forward slashes.
+    The longest folder is matched first, so a folder inside another (e.g. a temp folder inside the repo) keeps its own placeholder.
+    """
+    if isinstance(value, list):
+        return [portable(v) for v in value]
+    if isinstance(value, dict):
+        return {portable(k): portable(v) for k, v in value.items()}
+    if not isinstance(value, str):
+        return value
+    for placeholder, root in sorted(path_roots.items(), key=lambda item: -len(str(item[1]))):
+        for form in root_forms(root):
+            # Only whole folder names, i.e. followed by a separator, quote, or the end of the value.
+            value = re.sub(re.escape(form) + r'(?=[\\/"\']|$)', placeholder, value, flags=re.IGNORECASE)
+    # The rest of each path (up to a quote) with forward slashes.
+    return re.sub(r'<[a-z]+>[^"\']*', lambda match: match.group(0).replace('\\', '/'), value)
+
+def local_path(fp: str) -> Path:
+    # Path on this machine of a path recorded by portable().
+    for placeholder, root in path_roots.items():
+        if fp.startswith(placeholder):
+            return root / fp[len(placeholder):].lstrip('/')
+    return Path(fp)
+
+def to_tuples(value):
+    # COM returns tuples. Restore them from the JSON lists.
+    if isinstance(value, list):
+        return tuple(to_tuples(v) for v in value)
+    return value
+
+def savedata_path(command: str) -> Path:
+    # Output file of a 'SaveData("path", ...)' script command, which PowerWorld writes and Python may read back.
+    command = command.strip()
+    if not command.startswith('SaveData(') or '"' not in command:
+        return None
+    return Path(command.split('"')[1])
+
+class RecordingSimAuto:
+    """
+    Wraps a SimAuto object, forwarding every call and attribute, and writing each call to fp.
+    Files written by SaveData() script commands are stored too, so they can be recreated on replay.
+    The file is only created on the first call, so an unused object (e.g. one created at import by a
+    worker process) doesn't overwrite the recording.
+    """
+    def __init__(self, SimAuto, fp: Path):
+        object.__setattr__(self, '_SimAuto', SimAuto)
+        object.__setattr__(self, '_file', None)
+        object.__setattr__(self, 'fp', Path(fp))
+
+    def _write(self, entry: dict):
+        if self._file is None:
+            self.fp.parent.mkdir(parents=True, exist_ok=True)
+            object.__setattr__(self, '_file', open(self.fp, 'wb'))
+            self._write({'version': file_version})
+        self._file.write(gzip.compress((json.dumps(entry, default=str) + '\n').encode('utf-8'), compresslevel=6))
+        self._file.flush()
+
+    def __getattr__(self, name):
+        attribute = getattr(self._SimAuto, name)
+        if not callable(attribute):
+            return attribute
+
+        def recorded(*args):
+            start = time.perf_counter()
+            result = attribute(*args)
+            entry = {'m': name, 'a': portable(normalize(list(args))), 'r': normalize(result), 's': time.perf_counter() - start}
+            if name == 'RunScriptCommand':
+                fp = savedata_path(str(args[0]))
+                if fp is not None and fp.exists():
+                    entry['files'] = {portable(str(fp)): fp.read_text(encoding='utf-8', errors='replace')}
+            self._write(entry)
+            return result
+        return recorded
+
+    def __setattr__(self, name, value):
+        setattr(self._SimAuto, name, value)
+        self._write({'set': name, 'v': normalize(value)})
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            object.__setattr__(self, '_file', None)
+
+    def set_fp(self, fp: Path):
+        """Continues recording into a new file."""
+        self.close()
+        object.__setattr__(self, 'fp', Path(fp))
+
+class ReplaySimAuto:
+    """
+    Serves the calls recorded by RecordingSimAuto, in order.
+    Each call is checked against the recording, and a ReplayMismatchError is raised if the method or arguments differ.
+    delay_scale: Sleep for this fraction of the recorded call time (0.0 = as fast as possible, 1.0 = real time).
+    """
+    offline = True
+
+    def __init__(self, fp: Path, delay_scale: float = 0.0):
+        object.__setattr__(self, '_entries', None)
+        object.__setattr__(self, '_position', 0)
+        object.__setattr__(self, '_delay_scale', delay_scale)
+        object.__setattr__(self, '_attributes', {})
+        object.__setattr__(self, 'fp', Path(fp))
+
+    def _load(self):
+        # Read on first use, like RecordingSimAuto.
+        with gzip.open(self.fp, 'rt', encoding='utf-8') as f:
+            entries = [json.loads(line) for line in f]
+        if len(entries) == 0 or entries[0].get('version') != file_version:
+            raise ValueError(f'Unsupported recording version in {str(self.fp)}')
+        object.__setattr__(self, '_entries', entries[1:])
+
+    def _next(self) -> dict:
+        if self._entries is None:
+            self._load()
+        if self._position >= len(self._entries):
+            raise ReplayMismatchError(f'{self.fp.name}: ran past the end of the recording ({len(self._entries)} entries).')
+        entry = self._entries[self._position]
+        object.__setattr__(self, '_position', self._position + 1)
+        return entry
+
+    def _call(self, method: str, args: tuple):
+        entry = self._next()
+        # Attribute sets (e.g. CreateIfNotFound) are applied in order.
+        while 'set' in entry:
+            self._attributes[entry['set']] = entry['v']
+            entry = self._next()
+
+        args = portable(normalize(list(args)))
+        if entry['m'] != method or entry['a'] != args:
+            raise ReplayMismatchError(
+                f'{self.fp.name} call {self._position}: expected {entry["m"]}{tuple(entry["a"])!s:.200}, '
+                f'got {method}{args!s:.200}'
+            )
+
+        for fp, content in entry.get('files', {}).items():
+            local_path(fp).parent.mkdir(parents=True, exist_ok=True)
+            local_path(fp).write_text(content, encoding='utf-8')
+
+        if self._delay_scale > 0:
+            time.sleep(entry['s'] * self._delay_scale)
+        return to_tuples(entry['r'])
+
+    def __getattr__(self, name):
+        if name in self._attributes:
+            return self._attributes[name]
+        return lambda *args: self._call(name, args)
+
+    def __setattr__(self, name, value):
+        self._attributes[name] = value
+
+    def set_fp(self, fp: Path):
+        """Continues replaying from the start of another recording."""
+        object.__setattr__(self, 'fp', Path(fp))
+        object.__setattr__(self, '_entries', None)
+        object.__setattr__(self, '_position', 0)
+
+    def remaining(self) -> int:
+        """Number of recorded entries not yet replayed."""
+        if self._entries is None:
+            self._load()
+        return len(self._entries) - self._position
+
+    # The methods used by wpp_lib, listed explicitly. Any other method is served by __getattr__.
+    def OpenCase(self, fp):
+        return self._call('OpenCase', (fp,))
+
+    def CloseCase(self):
+        return self._call('CloseCase', ())
+
+    def SaveCase(self, fp, case_format, overwrite):
+        return self._call('SaveCase', (fp, case_format, overwrite))
+
+    def GetParametersMultipleElementRect(self, table, parameters, filter_group):
+        return self._call('GetParametersMultipleElementRect', (table, parameters, filter_group))
+
+    def ChangeParametersMultipleElementRect(self, table, parameters, rows):
+        return self._call('ChangeParametersMultipleElementRect', (table, parameters, rows))
+
+    def RunScriptCommand(self, command):
+        return self._call('RunScriptCommand', (command,))
+
+    def SaveState(self):
+        return self._call('SaveState', ())
+
+    def LoadState(self):
+        return self._call('LoadState', ())
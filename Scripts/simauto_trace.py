@@ -0,0 +1,152 @@
+from pathlib import Path
+from contextlib import contextmanager
+import json
+import sys
+import time
+import pandas as pd
+
+# Opt-in instrumentation for SimAuto.
+# Wrap the SimAuto object with TracedSimAuto to record every COM call: wall time, table, row & column
+# counts, the calling wpp_lib function, and the pipeline stage it ran in. Stages are set by the scripts
+# (set_stage) and by wpp_lib (stage), and cost nothing when tracing is off.
+
+# Current pipeline stage, e.g. ['03_set_branch_statuses'] or ['create_case', 'scaling iteration 12'].
+stage_stack: list[str] = []
+
+def set_stage(name: str):
+    """Sets the top-level pipeline stage, replacing any current stages."""
+    stage_stack.clear()
+    stage_stack.append(name)
+
+@contextmanager
+def stage(name: str):
+    """Runs a block as a sub-stage of the current stage."""
+    stage_stack.append(name)
+    try:
+        yield
+    finally:
+        stage_stack.pop()
+
+def current_stage() -> str:
+    return ' / '.join(stage_stack)
+
+def calling_function(lib_name: str = 'wpp_lib') -> str:
+    """Name of the innermost wpp_lib function on the call stack, or the outermost caller if none."""
+    frame = sys._getframe(2)
+    outer = ''
+    while frame is not None:
+        name = getattr(frame.f_code, 'co_qualname', frame.f_code.co_name)
+        if frame.f_globals.get('__name__', '').endswith(lib_name):
+            return name
+        outer = name
+        frame = frame.f_back
+    return outer
+
+def call_shape(method: str, args: tuple, result) -> tuple[str,int,int]:
+    """Returns (table, rows, columns) for a SimAuto call."""
+    table, rows, columns = '', 0, 0
+    try:
+        if method == 'GetParametersMultipleElementRect':
+            table, columns = args[0], len(args[1])
+            if result is not None and len(result) > 1 and result[1] is not None:
+                rows = len(result[1])
+        elif method == 'ChangeParametersMultipleElementRect':
+            table, columns, rows = args[0], len(args[1]), len(args[2])
+        elif method in ['GetParametersMultipleElement', 'ChangeParametersMultipleElement']:
+            table, columns = args[0], len(args[1])
+        elif method == 'RunScriptCommand':
+            # The script command name, e.g. 'SolvePowerFlow'.
+            table = str(args[0]).split('(')[0].strip().rstrip(';')
+        elif method in ['OpenCase', 'SaveCase'] and len(args) > 0:
+            table = Path(str(args[0])).name
+    except (TypeError, IndexError):
+        pass
+    return table, rows, columns
+
+class TracedSimAuto:
+    """
+    Wraps a SimAuto object, forwarding every call and attribute, and recording each method call in self.calls.
+    """
+    def __init__(self, SimAuto):
+        object.__setattr__(self, '_SimAuto', SimAuto)
+        object.__setattr__(self, 'calls', [])
+        object.__setattr__(self, 'start', time.perf_counter())
+
+    def __getattr__(self, name):
+        attribute = getattr(self._SimAuto, name)
+        if not callable(attribute):
+            return attribute
+
+        def traced(*args):
+            start = time.perf_counter()
+            result = attribute(*args)
+            end = time.perf_counter()
+            table, rows, columns = call_shape(name, args, result)
+            self.calls.append({
+                'Stage': current_stage()
+                ,'Function': calling_function()
+                ,'Method': name
+                ,'Table': table
+                ,'Rows': rows
+                ,'Columns': columns
+                ,'Start': start - self.start
+                ,'Seconds': end - start
+            })
+            return result
+        return traced
+
+    def __setattr__(self, name, value):
+        # Properties such as CreateIfNotFound are set on the real object.
+        setattr(self._SimAuto, name, value)
+
+    def reset(self):
+        """Clears the recorded calls, e.g. at the start of each hour."""
+        self.calls.clear()
+        object.__setattr__(self, 'start', time.perf_counter())
+
+    def calls_df(self) -> pd.DataFrame:
+        return pd.DataFrame(self.calls, columns=['Stage', 'Function', 'Method', 'Table', 'Rows', 'Columns', 'Start', 'Seconds'])
+
+    def aggregate_df(self) -> pd.DataFrame:
+        """Total time, call count, and cells moved per stage/function/method/table. Slowest first."""
+        df = self.calls_df()
+        df['Cells'] = df['Rows'] * df['Columns']
+        # Group scaling iterations together, e.g. 'create_case / scaling iteration 12' -> 'create_case / scaling iteration'.
+        df['Stage'] = df['Stage'].str.replace(r'(iteration|item) \d+', r'\1', regex=True)
+        agg_df = df.groupby(['Stage', 'Function', 'Method', 'Table'], as_index=False).agg(
+            Calls=('Seconds', 'size')
+            ,TotalSeconds=('Seconds', 'sum')
+            ,MeanSeconds=('Seconds', 'mean')
+            ,MaxSeconds=('Seconds', 'max')
+            ,Cells=('Cells', 'sum')
+        )
+        agg_df['PercentOfTotal'] = 100.0 * agg_df['TotalSeconds'] / max(df['Seconds'].sum(), 1e-12)
+        return agg_df.sort_values(by='TotalSeconds', ascending=False, ignore_index=True)
+
+    def export_timeline(self, fp: Path):
+        """
+        Writes the calls as a Chrome trace event file (open in chrome://tracing, Perfetto, or speedscope).
+        Each stage is a span on its own row, with the SimAuto calls nested under it as a flame chart.
+        """
+        events = []
+        stage_name, stage_start, stage_end = None, 0.0, 0.0
+        for call in self.calls:
+            if call['Stage'] != stage_name:
+                if stage_name is not None:
+                    events.append({'name': stage_name or '(none)', 'cat': 'stage', 'ph': 'X', 'pid': 1, 'tid': 1, 'ts': stage_start * 1e6, 'dur': (stage_end - stage_start) * 1e6})
+                stage_name, stage_start = call['Stage'], call['Start']
+            stage_end = call['Start'] + call['Seconds']
+            events.append({
+                'name': f"{call['Method']} {call['Table']}".strip()
+                ,'cat': call['Function']
+                ,'ph': 'X'
+                ,'pid': 1
+                ,'tid': 1
+                ,'ts': call['Start'] * 1e6
+                ,'dur': call['Seconds'] * 1e6
+                ,'args': {key: call[key] for key in ['Stage', 'Function', 'Rows', 'Columns']}
+            })
+        if stage_name is not None:
+            events.append({'name': stage_name or '(none)', 'cat': 'stage', 'ph': 'X', 'pid': 1, 'tid': 1, 'ts': stage_start * 1e6, 'dur': (stage_end - stage_start) * 1e6})
+        Path(fp).write_text(json.dumps({'traceEvents': events, 'displayTimeUnit': 'ms'}), encoding='utf-8')
+        return
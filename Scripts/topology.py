@@ -0,0 +1,147 @@
+import numpy as np
+import pandas as pd
+
+# Offline connectivity checks for branch status changes.
+# ConnectivityIndex holds the bus/branch graph of a case (from get_case_data()) as CSR adjacency arrays, and
+# predicts whether opening a branch would cut off buses with in-service generation or load from every slack bus.
+# Such changes leave an island PowerWorld can't solve, so they can be rejected without a solve.
+# Each check is a bidirectional search from the two ends of the branch, which stops as soon as the two searches
+# meet (a parallel path exists), or one runs out of buses (the branch is the only connection). In a meshed network
+# the searches meet within a few buses, and a radial spur is exhausted after its own buses, so most checks take
+# microseconds. Confirming that a cut-off side is islanded (the other side keeps a slack bus) walks the rest of the
+# island, which takes milliseconds. Either is far cheaper than a full AC solve & rollback.
+
+class ConnectivityIndex:
+    """
+    Connectivity of the case in case_dict (the output of wpp_lib.get_case_data()), using the Branch & Transformer
+    tables (all device types, including breakers & disconnects), with in-service Gen & Load marking energized buses.
+    Statuses can be changed with set_status(), to follow the changes applied to the case.
+    """
+    def __init__(self, case_dict: dict):
+        def table_df(name):
+            item = case_dict.get(name)
+            if isinstance(item, dict):
+                item = item['df']
+            return item
+
+        bus_df = table_df('Bus')
+        self.bus_index = pd.Index(bus_df['Number'].astype(np.int64))
+        num_buses = len(self.bus_index)
+        self.slack = (bus_df['Slack'].astype(str).str.strip().str.upper() == 'YES').to_numpy() if 'Slack' in bus_df.columns else np.zeros(num_buses, dtype=bool)
+
+        # In-service generators & loads per bus.
+        self.energized = np.zeros(num_buses, dtype=np.int64)
+        for name in ['Gen', 'Load']:
+            df = table_df(name)
+            if df is None or len(df) == 0:
+                continue
+            positions = self.bus_index.get_indexer(df.loc[df['Status'] == 'Closed', 'BusNum'].astype(np.int64))
+            np.add.at(self.energized, positions[positions >= 0], 1)
+
+        branch_df = pd.concat([table_df(name)[['ObjectID', 'BusNumFrom', 'BusNumTo', 'Status']] for name in ['Branch', 'Transformer'] if table_df(name) is not None], ignore_index=True)
+        self.edge_ids = pd.Index(branch_df['ObjectID'])
+        self.edge_from = self.bus_index.get_indexer(branch_df['BusNumFrom'].astype(np.int64))
+        self.edge_to = self.bus_index.get_indexer(branch_df['BusNumTo'].astype(np.int64))
+        self.closed = (branch_df['Status'] == 'Closed').to_numpy() & (self.edge_from >= 0) & (self.edge_to >= 0)
+
+        # CSR adjacency, over every branch (open or closed): neighbours[start[bus]:start[bus + 1]] and their edges.
+        ends = np.concatenate([self.edge_from, self.edge_to])
+        others = np.concatenate([self.edge_to, self.edge_from])
+        edges = np.concatenate([np.arange(len(branch_df)), np.arange(len(branch_df))])
+        valid = (ends >= 0) & (others >= 0)
+        order = np.argsort(ends[valid], kind='stable')
+        self.neighbour = others[valid][order]
+        self.neighbour_edge = edges[valid][order]
+        self.start = np.zeros(num_buses + 1, dtype=np.int64)
+        np.add.at(self.start, ends[valid] + 1, 1)
+        self.start = np.cumsum(self.start)
+        # Plain lists & dicts for the searches, which index one element at a time.
+        self._start = self.start.tolist()
+        self._neighbour = self.neighbour.tolist()
+        self._neighbour_edge = self.neighbour_edge.tolist()
+        self._edge_position = dict(zip(self.edge_ids, range(len(self.edge_ids))))
+
+    def set_status(self, object_ids, status: str):
+        """Records branch status changes (e.g. ones applied to the case)."""
+        positions = self.edge_ids.get_indexer(pd.Index(object_ids))
+        positions = positions[positions >= 0]
+        self.closed[positions] = (status == 'Closed') & (self.edge_from[positions] >= 0) & (self.edge_to[positions] >= 0)
+
+    def cut_off_by(self, object_id: str) -> np.ndarray:
+        """
+        Bus positions which opening this branch would disconnect from the rest of their island (the smaller side).
+        Empty if the branch is open, unknown, or has a parallel path.
+        """
+        position = self._edge_position.get(object_id, -1)
+        if position < 0 or not self.closed[position]:
+            return np.array([], dtype=np.int64)
+
+        closed = self.closed
+        start, neighbour, neighbour_edge = self._start, self._neighbour, self._neighbour_edge
+        ends = [int(self.edge_from[position]), int(self.edge_to[position])]
+        sides = [{ends[0]}, {ends[1]}]
+        frontiers = [[ends[0]], [ends[1]]]
+        while True:
+            # Grow the smaller search by one layer.
+            side = 0 if len(sides[0]) <= len(sides[1]) else 1
+            next_frontier = []
+            for bus in frontiers[side]:
+                for k in range(start[bus], start[bus + 1]):
+                    edge = neighbour_edge[k]
+                    if edge == position or not closed[edge]:
+                        continue
+                    other = neighbour[k]
+                    if other in sides[1 - side]:
+                        return np.array([], dtype=np.int64)
+                    if other not in sides[side]:
+                        sides[side].add(other)
+                        next_frontier.append(other)
+            if len(next_frontier) == 0:
+                return np.fromiter(sides[side], dtype=np.int64)
+            frontiers[side] = next_frontier
+
+    def islands_energized(self, object_id: str) -> bool:
+        """True if opening this branch would leave in-service generation or load in an island without a slack bus."""
+        cut = self.cut_off_by(object_id)
+        if len(cut) == 0 or not self.energized[cut].any() and not self.slack[cut].any():
+            return False
+        # Whichever side is left without a slack bus is islanded (unless it was already, with no slack on either side).
+        position = self._edge_position[object_id]
+        other_end = int(self.edge_to[position] if self.edge_from[position] in set(cut.tolist()) else self.edge_from[position])
+        other = self.island_of(other_end, position)
+        if self.slack[cut].any():
+            return bool(not self.slack[other].any() and self.energized[other].any())
+        return bool(self.slack[other].any())
+
+    def island_of(self, bus: int, excluded_edge: int = -1) -> np.ndarray:
+        """Bus positions connected to this bus position by closed branches, optionally without one branch."""
+        closed = self.closed
+        start, neighbour, neighbour_edge = self._start, self._neighbour, self._neighbour_edge
+        found = {bus}
+        frontier = [bus]
+        while len(frontier) > 0:
+            next_frontier = []
+            for b in frontier:
+                for k in range(start[b], start[b + 1]):
+                    edge = neighbour_edge[k]
+                    if edge == excluded_edge or not closed[edge] or neighbour[k] in found:
+                        continue
+                    found.add(neighbour[k])
+                    next_frontier.append(neighbour[k])
+            frontier = next_frontier
+        return np.fromiter(found, dtype=np.int64)
+
+    def screen_openings(self, changes_df: pd.DataFrame) -> pd.Series:
+        """
+        Follows the status changes in changes_df (ObjectID, Status) in order, and returns a boolean Series (same
+        index) which is True for each opening that would island energized elements, given the changes before it.
+        Those openings are not applied. Every other change is, so the index matches the case after the changes
+        which pass.
+        """
+        islands = pd.Series(False, index=changes_df.index)
+        for index, object_id, status in zip(changes_df.index, changes_df['ObjectID'], changes_df['Status']):
+            if status == 'Open' and self.islands_energized(object_id):
+                islands[index] = True
+                continue
+            self.set_status([object_id], status)
+        return islands
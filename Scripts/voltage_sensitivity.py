@@ -0,0 +1,139 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+import scipy.sparse.linalg as spla
+from Scripts import nr_backend
+
+# Bus voltage self-sensitivities (dV/dP & dV/dQ at the same bus) from a solved state, without SimAuto.
+# The power flow Jacobian is built at the solved voltages over every live, non-reference bus: an angle & a magnitude
+# variable each, with a P row, and a Q row (PQ buses) or a "voltage held" row (PV buses, so their sensitivities are 0).
+# It is factored once with sparse LU. Bus i's sensitivities are entries of row V_i of its inverse, so each block of
+# transposed solves gives chunk_size buses.
+# Status changes of a few branches or generators (PV <-> PQ) change only a few rows of the Jacobian. Those are applied
+# as a low-rank (Woodbury) update of the factored Jacobian, at the same voltages: 2 solves per changed row, instead of
+# a new factorization and a solve per bus. After max_update_rows changed rows, the Jacobian is factored again.
+# Like nr_backend, generators regulate their own terminal bus, and Mvar limits are not applied.
+
+# Unit right-hand sides per LU solve.
+chunk_size = 128
+# Changed Jacobian rows to apply as an update. Beyond this, refactor.
+max_update_rows = 200
+
+class SelfSensitivity:
+    """
+    Self-sensitivities of a solved nr_backend.NewtonRaphsonSimAuto, e.g. built from a solved PowerWorld case's tables.
+    Change statuses with set_status() (or on backend directly, then call update()), and read sensitivities().
+    """
+    def __init__(self, backend: nr_backend.NewtonRaphsonSimAuto):
+        self.backend = backend
+        # The solved voltages. Kept through status changes, so the updates are linear in the Jacobian.
+        self.V = backend.Vm * np.exp(1j * backend.Va)
+        self.refactors = 0
+        self.updates = 0
+        self._factor()
+
+    def _jacobian(self, model: dict) -> sp.csr_matrix:
+        a = self.positions
+        V = self.V
+        Vm = np.abs(V)
+        dS_dVm, dS_dVa = nr_backend.dsbus_dv(model['Ybus'], V, model['Ybus'] @ V)
+        # Voltage dependent loads.
+        dS_dVm = dS_dVm + sp.diags(model['Si'] + 2.0 * model['Sz'] * Vm)
+        dVa = dS_dVa[a][:, a]
+        dVm = dS_dVm[a][:, a]
+        pq = sp.diags(model['pq'][a].astype(float))
+        held = sp.diags(model['pv'][a].astype(float))
+        return sp.bmat([
+            [dVa.real, dVm.real]
+            ,[pq @ dVa.imag, pq @ dVm.imag + held]
+        ], format='csr')
+
+    def _factor(self):
+        model = self.backend.bus_model()
+        self.live = model['live'].copy()
+        self.ref = model['ref'].copy()
+        self.positions = np.flatnonzero(model['live'] & ~model['ref'])
+        self.J = self._jacobian(model)
+        self.lu = spla.splu(self.J.tocsc()) if self.J.shape[0] > 0 else None
+        self.pq = model['pq'][self.positions]
+        self.base_pq = self.pq.copy()
+        self.delta_rows = np.array([], dtype=np.int64)
+        self.refactors += 1
+
+        # Row V_i of the inverse, at columns P_i & Q_i, for each PQ bus.
+        m = len(self.positions)
+        self.base = np.zeros((m, 2))
+        rows = np.flatnonzero(self.pq)
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            rhs = np.zeros((2 * m, len(chunk)))
+            rhs[m + chunk, np.arange(len(chunk))] = 1.0
+            solution = self.lu.solve(rhs, trans='T')
+            self.base[chunk, 0] = solution[chunk, np.arange(len(chunk))]
+            self.base[chunk, 1] = solution[m + chunk, np.arange(len(chunk))]
+        self.values = self.base.copy()
+
+    def update(self):
+        """
+        Follows status changes made on the backend since the last factorization. Changes which add or remove a live
+        island or reference bus are refactored.
+        """
+        model = self.backend.bus_model()
+        if not (np.array_equal(model['live'], self.live) and np.array_equal(model['ref'], self.ref)):
+            self._factor()
+            return
+        delta = (self._jacobian(model) - self.J).tocsr()
+        delta.eliminate_zeros()
+        rows = np.unique(delta.nonzero()[0])
+        if len(rows) > max_update_rows:
+            self._factor()
+            return
+        self.pq = model['pq'][self.positions]
+        self.delta_rows = rows
+        self.updates += 1
+        m = len(self.positions)
+        self.values = self.base.copy()
+        if len(rows) == 0:
+            self.values[~self.pq] = 0.0
+            return
+
+        # (J + E D)^-1 = J^-1 - J^-1 E (I + D J^-1 E)^-1 D J^-1, with E selecting the changed rows & D their change.
+        D = delta[rows]
+        E = np.zeros((2 * m, len(rows)))
+        E[rows, np.arange(len(rows))] = 1.0
+        A = self.lu.solve(E)
+        B = self.lu.solve(D.T.toarray(), trans='T').T
+        C = np.linalg.solve(np.eye(len(rows)) + D @ A, B)
+        buses = np.arange(m)
+        self.values[:, 0] -= np.einsum('ij,ji->i', A[m + buses], C[:, buses])
+        self.values[:, 1] -= np.einsum('ij,ji->i', A[m + buses], C[:, m + buses])
+        # Buses which became PQ (e.g. their generator opened) weren't in the base.
+        new_pq = self.pq & ~self.base_pq
+        if new_pq.any():
+            self._solve_rows(np.flatnonzero(new_pq), A, C)
+        self.values[~self.pq] = 0.0
+
+    def _solve_rows(self, rows: np.ndarray, A: np.ndarray, C: np.ndarray):
+        # Row V_i of the updated inverse for these buses, from the base factorization and the update terms.
+        m = len(self.positions)
+        rhs = np.zeros((2 * m, len(rows)))
+        rhs[m + rows, np.arange(len(rows))] = 1.0
+        solution = self.lu.solve(rhs, trans='T')
+        self.values[rows, 0] = solution[rows, np.arange(len(rows))] - np.einsum('ij,ji->i', A[m + rows], C[:, rows])
+        self.values[rows, 1] = solution[m + rows, np.arange(len(rows))] - np.einsum('ij,ji->i', A[m + rows], C[:, m + rows])
+
+    def set_status(self, table: str, object_ids, status: str):
+        """Opens or closes Branch or Gen objects (ObjectIDs), and updates the sensitivities."""
+        object_ids = list(object_ids)
+        self.backend.ChangeParametersMultipleElementRect(table, ['ObjectID', 'Status'], [[object_id, status] for object_id in object_ids])
+        self.update()
+
+    def sensitivities(self) -> pd.DataFrame:
+        """
+        Number, SensdVdPself & SensdVdQself (pu per MW / Mvar injected at the bus), for every bus. 0 at reference,
+        PV, and dead buses.
+        """
+        df = pd.DataFrame({'Number': self.backend.bus_index.to_numpy(), 'SensdVdPself': 0.0, 'SensdVdQself': 0.0})
+        df.loc[self.positions, 'SensdVdPself'] = self.values[:, 0] / nr_backend.mva_base
+        df.loc[self.positions, 'SensdVdQself'] = self.values[:, 1] / nr_backend.mva_base
+        return df
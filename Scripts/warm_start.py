@@ -0,0 +1,70 @@
+from pathlib import Path
+import os
+import numpy as np
+import pandas as pd
+
+# Warm starts: scaling an hour from the most similar hour already solved, instead of from TopoSeed.
+# When an hour is finished, the MW of each gen, load & distributed gen in its saved case is stored next to it
+# (see mw_vector()). A new hour's targets are compared to every stored vector at once, as one matrix, and the
+# closest case is used as the starting point if it's closer to the targets than TopoSeed is. Only the residual
+# (the difference between that case and the targets) is then scaled.
+# Consecutive hours (and the same hour on consecutive days) are usually close, so in a chronological run most
+# hours start within a few percent of their targets.
+
+# Stored vectors, by file: (modified time, vector). Each file is only read once per process.
+_vector_memo: dict[str,tuple] = {}
+
+def mw_vector(gen_df: pd.DataFrame, load_df: pd.DataFrame, suffix: str = '') -> pd.Series:
+    """
+    MW of each gen, load & distributed gen in the tables from compute_pw_targets(), keyed by table & ObjectID.
+    suffix: '' for the case values, '_Target' for the targets. Open elements are already 0 MW in those tables.
+    """
+    parts = [
+        gen_df['MWSetPoint' + suffix].rename(lambda object_id: 'Gen ' + object_id)
+        ,load_df['SMW' + suffix].rename(lambda object_id: 'Load ' + object_id)
+        ,load_df['DistMWInput' + suffix].rename(lambda object_id: 'Dist ' + object_id)
+    ]
+    return pd.concat(parts).fillna(0.0).astype(float)
+
+def save_vector(fp: Path, vector: pd.Series):
+    # Replaced in one step, so another process (e.g. a parallel hour) never reads it half-written.
+    temp_fp = Path(fp).with_name(Path(fp).name + '.tmp')
+    vector.to_pickle(temp_fp)
+    os.replace(temp_fp, fp)
+
+def load_vector(fp: Path) -> pd.Series:
+    modified = Path(fp).stat().st_mtime_ns
+    memo = _vector_memo.get(str(fp))
+    if memo is None or memo[0] != modified:
+        memo = (modified, pd.read_pickle(fp))
+        _vector_memo[str(fp)] = memo
+    return memo[1]
+
+def distances(target: pd.Series, vector_fps: dict[str,Path], chunk_size: int = 256) -> pd.Series:
+    """
+    Total |MW| difference between target and each stored vector ({name: fp}), smallest first.
+    Each chunk of vectors is aligned to target's keys (missing elements are 0 MW) and compared as one matrix.
+    """
+    names = list(vector_fps.keys())
+    result = np.zeros(len(names))
+    target_values = target.to_numpy()
+    for start in range(0, len(names), chunk_size):
+        chunk = names[start:start + chunk_size]
+        matrix = pd.concat([load_vector(vector_fps[name]) for name in chunk], axis=1, keys=range(len(chunk)))
+        matrix = matrix.reindex(target.index).fillna(0.0).to_numpy()
+        result[start:start + len(chunk)] = np.abs(matrix - target_values[:, None]).sum(axis=0)
+    return pd.Series(result, index=names).sort_values(kind='stable')
+
+def select(gen_df: pd.DataFrame, load_df: pd.DataFrame, vector_fps: dict[str,Path]) -> tuple[str,pd.DataFrame]:
+    """
+    Picks the stored case ({name: vector fp}) closest to the targets in gen_df & load_df (from compute_pw_targets()
+    on the seed case), or None if none is closer than the seed case itself.
+    Returns (name or None, a table of the seed and the closest candidates' distances).
+    """
+    target = mw_vector(gen_df, load_df, '_Target')
+    seed_distance = float(np.abs(mw_vector(gen_df, load_df, '').to_numpy() - target.to_numpy()).sum())
+    candidate_distances = distances(target, vector_fps) if len(vector_fps) > 0 else pd.Series(dtype=float)
+    report_df = pd.concat([pd.Series({'(seed)': seed_distance}), candidate_distances.head(10)]).rename_axis('Case').reset_index(name='DistanceMW')
+    if len(candidate_distances) == 0 or candidate_distances.iloc[0] >= seed_distance:
+        return None, report_df
+    return candidate_distances.index[0], report_df
@@ -1,19 +1,104 @@
 from pathlib import Path
 import os
+import time
+import hashlib
+import json
+import math
+import pickle
+import shutil
+import tempfile
 import multiprocessing as mp
 import numpy as np
 import pandas as pd
 import openpyxl.utils
-import win32com.client
 import warnings
-
-# Filter warnings on applymap and fillna for now. 
+from Scripts import epc_reader
+from Scripts import case_cache
+from Scripts import simauto_trace
+from Scripts import simauto_replay
+from Scripts import ddmin
+from Scripts import topology
+from Scripts import network_snapshot
+from Scripts import short_circuit
+from Scripts import nr_backend
+from Scripts import voltage_sensitivity
+
+# SimAuto is only available on Windows. The data-path helpers (e.g. convert_param_rows) work without it. 
+try:
+    import win32com.client
+except ImportError:
+    win32com = None
+
+# Filter warnings on fillna for now. 
 # To Do: Identify a future-proof version of these calls. 
-warnings.filterwarnings("ignore", category=FutureWarning, message=".*DataFrame[.]applymap.*")
 warnings.filterwarnings("ignore", category=FutureWarning, message=".*fillna.*")
 
 mva_mismatch_threshold = 1.0 
 
+# Table cache for extracted case data. Set case_cache_dir to a folder to enable it. 
+case_cache_dir: Path = None
+case_cache_max_bytes = 5 * 1024**3
+
+# Record/replay of SimAuto calls (see simauto_replay.py). Set one of these environment variables to a folder: 
+#   WPP_SIMAUTO_RECORD: Run against PowerWorld, recording every call to <folder>/<session>.jsonl.gz 
+#   WPP_SIMAUTO_REPLAY: Run against those recordings instead of PowerWorld (e.g. on Linux). 
+#   WPP_SIMAUTO_REPLAY_DELAY: Optional. Fraction of the recorded call time to sleep on replay (default 0). 
+# Environment variables are inherited by the worker processes, which record/replay their own sessions. 
+simauto_record_env = 'WPP_SIMAUTO_RECORD'
+simauto_replay_env = 'WPP_SIMAUTO_REPLAY'
+
+# Alternative backend, called as simauto_factory(session) instead of starting PowerWorld. 
+# E.g. lambda session: backend.copy(), with a nr_backend.NewtonRaphsonSimAuto backend. 
+simauto_factory = None
+
+def dispatch_simauto(session: str = 'main'):
+    """
+    Creates a SimAuto object, or a recording/replaying stand-in when the environment variables above are set. 
+    session: Name of the recording. Must be unique per SimAuto object within a run. 
+    """
+    if simauto_factory is not None:
+        return simauto_factory(session)
+
+    replay_dir = os.environ.get(simauto_replay_env)
+    if replay_dir:
+        delay_scale = float(os.environ.get('WPP_SIMAUTO_REPLAY_DELAY', 0.0))
+        return simauto_replay.ReplaySimAuto(Path(replay_dir) / f'{session}.jsonl.gz', delay_scale)
+
+    SimAuto = win32com.client.Dispatch("pwrworld.SimulatorAuto")
+    record_dir = os.environ.get(simauto_record_env)
+    if record_dir:
+        return simauto_replay.RecordingSimAuto(SimAuto, Path(record_dir) / f'{session}.jsonl.gz')
+    return SimAuto
+
+def simauto_worker_count(num_workers: int) -> int:
+    """
+    Number of worker processes to split work across. 
+    Recordings are per worker, so a replay must split the work the same way as the recorded run. 
+    """
+    replay_dir = os.environ.get(simauto_replay_env)
+    record_dir = os.environ.get(simauto_record_env)
+    if replay_dir and (Path(replay_dir) / 'num_workers.txt').exists():
+        return int((Path(replay_dir) / 'num_workers.txt').read_text())
+    if record_dir and not replay_dir:
+        Path(record_dir).mkdir(parents=True, exist_ok=True)
+        (Path(record_dir) / 'num_workers.txt').write_text(str(num_workers))
+    return num_workers
+
+def set_simauto_session(SimAuto, session: str):
+    """
+    Starts a new recording (or replay) session on a long-lived SimAuto object, e.g. one per task in a worker pool. 
+    Has no effect on a plain SimAuto object. 
+    """
+    if isinstance(SimAuto, (simauto_replay.RecordingSimAuto, simauto_replay.ReplaySimAuto)):
+        SimAuto.set_fp(SimAuto.fp.parent / f'{session}.jsonl.gz')
+    return
+
+def active_case_cache_dir() -> Path:
+    # A cache hit skips SimAuto calls, so recorded & replayed runs would diverge. Disable the cache for both. 
+    if os.environ.get(simauto_record_env) or os.environ.get(simauto_replay_env):
+        return None
+    return case_cache_dir
+
 def chk(SimAuto, SimAutoOutput, Message):
     """
     Function used to catch and display errors passed back from SimAuto
@@ -41,24 +126,105 @@ def get_param(SimAuto, table: str, parameters: list[str], filter_group: str = ''
     return_value = chk(SimAuto, SimAuto.GetParametersMultipleElementRect(table, parameters, filter_group), msg)
     return return_value
 
+def convert_param_rows(rows, parameter_type: dict[str,type]) -> pd.DataFrame:
+    """
+    Converts the row-major tuple-of-tuples returned by SimAuto into a typed DataFrame. 
+    Transposes once, then trims and converts each column as a whole numpy array, based on parameter_type. 
+    float columns are float64, int columns are int64 (or float64 if any value is blank), other types use astype(). 
+    """
+    parameter_list: list[str] = list(parameter_type.keys())
+    if rows is None or len(rows) == 0:
+        return pd.DataFrame(columns=parameter_list)
+
+    data = {}
+    for parameter, column in zip(parameter_list, zip(*rows)):
+        ptype = parameter_type[parameter]
+        if ptype in [int, float]:
+            data[parameter] = column_to_numeric(np.array(column, dtype=object), ptype)
+        else:
+            data[parameter] = pd.Series(np.char.strip(np.array(column, dtype=np.str_))).astype(ptype)
+    return pd.DataFrame(data, columns=parameter_list)
+
+def column_to_numeric(column: np.ndarray, ptype: type) -> np.ndarray:
+    """
+    Converts a column of (possibly padded) strings to numbers, matching pd.to_numeric(errors='coerce'). 
+    The fast path parses the whole column at once. Blank values become NaN (forcing float64). 
+    """
+    try:
+        return column.astype(np.int64 if ptype == int else np.float64)
+    except (ValueError, TypeError):
+        pass
+    # Blank or non-numeric values present. 
+    text = np.char.strip(column.astype(np.str_))
+    try:
+        return np.where(text == '', 'nan', text).astype(np.float64)
+    except ValueError:
+        return pd.to_numeric(pd.Series(text), errors='coerce').astype(np.float64).to_numpy()
+
 def get_param_df(SimAuto, table: str, parameter_type: dict[str,type], filter_group: str = '') -> pd.DataFrame:
     # Get data from PowerWorld. 
     parameter_list: list[str] = list(parameter_type.keys())
     rows: list[list[str]] = get_param(SimAuto, table, parameter_list, filter_group)
-    # Pack into a dataframe. 
-    df = pd.DataFrame(data=rows, columns=parameter_list)
-    # Trim all strings. 
-    # TO DO: fix future warning. 
-    df = df.applymap(lambda x: x.strip() if isinstance(x, str) else x)
-    # Change all data types to the proper types. 
-    for parameter in parameter_list:
-        if(parameter_type[parameter] in [int, float]):
-            # Handle numeric types with coerce for empty strings. 
-            df[parameter] = pd.to_numeric(df[parameter], errors='coerce')
-        else: 
-            df[parameter] = df[parameter].astype(parameter_type[parameter])
+    # Pack into a typed dataframe. 
+    return convert_param_rows(rows, parameter_type)
+
+def get_param_dfs_cached(SimAuto, requests: dict[str,tuple], source_fps: list[Path] = None, prepare = None) -> dict[str,pd.DataFrame]:
+    """
+    Calls get_param_df() for each request, reusing cached tables when the source files are unchanged. 
+    requests: {name: (table, parameter_type, filter_group)}
+    source_fps: The files which fully define the case currently open (or opened by prepare()). None disables caching. 
+    prepare: Called once before the first SimAuto read, e.g. to open the case. Skipped if every table is cached. 
+    """
+    def extract(names: list[str]) -> dict[str,pd.DataFrame]:
+        if prepare is not None:
+            prepare()
+        return {name: get_param_df(SimAuto, *requests[name]) for name in names}
+
+    return case_cache.cached_tables(active_case_cache_dir(), source_fps, requests, extract, case_cache_max_bytes)
+
+# Hits & misses of get_result_cached(), per result name. 
+result_cache_log: list[dict[str,object]] = []
+
+def case_fingerprint(SimAuto) -> str:
+    """
+    Fingerprint of the open (solved) case: every table of get_case_data() (topology, impedances, dispatch, and bus 
+    voltages), plus the switched shunts. 
+    """
+    tables = {name: item['df'] for name, item in get_case_data(SimAuto).items()}
+    tables['Shunt'] = get_param_df(SimAuto, 'Shunt', nr_backend.shunt_params)
+    return case_cache.fingerprint_tables(tables)
+
+def get_result_cached(fingerprint: str, name: str, compute) -> pd.DataFrame:
+    """
+    compute() (e.g. get_fault_duty() on the open case), or its result from the table cache if it was already 
+    calculated for a case with the same fingerprint (see case_fingerprint()). The result's name should include 
+    any setting which changes it. 
+    """
+    start = time.time()
+    [df, hit] = case_cache.cached_result(active_case_cache_dir(), fingerprint, name, compute, case_cache_max_bytes)
+    result_cache_log.append({'Result': name, 'Hit': hit, 'Seconds': time.time() - start, 'Fingerprint': fingerprint})
+    print(f'Result cache: {name} {"hit" if hit else "miss"}')
     return df
 
+def get_epc_param_dfs(epc_fp: Path, requests: dict[str,tuple]) -> dict[str,pd.DataFrame]:
+    """
+    Reads tables straight from an EPC, reusing cached tables when the EPC is unchanged. 
+    requests: {name: (table, parameter_type, filter_group)}. A parameter_type of None returns every field the reader provides. 
+    """
+    def extract(names: list[str]) -> dict[str,pd.DataFrame]:
+        epc_dict = epc_reader.read_epc(epc_fp, list(set(requests[name][0] for name in names)))
+        df_dict = {}
+        for name in names:
+            table, parameter_type = requests[name][0], requests[name][1]
+            if parameter_type is None:
+                df_dict[name] = epc_dict[table]
+            else:
+                df_dict[name] = epc_reader.get_epc_param_df(epc_dict, table, parameter_type)
+        return df_dict
+
+    tag = f'epc_reader {epc_reader.reader_version}'
+    return case_cache.cached_tables(active_case_cache_dir(), [epc_fp], requests, extract, case_cache_max_bytes, tag)
+
 def set_param(SimAuto, table: str, parameters: list[str], rows: list[list[str]]):
     msg = 'ChangeParametersMultipleElementRect(' + table + ': [' + ', '.join(parameters) + '])'
     return_value = chk(SimAuto, SimAuto.ChangeParametersMultipleElementRect(table, parameters, rows), msg)
@@ -78,12 +244,51 @@ def set_param_df(SimAuto, table, df: pd.DataFrame):
     return_value = set_param(SimAuto, table, parameters, rows)
     return return_value
 
+def set_param_df_delta(SimAuto, table, df: pd.DataFrame, sent_df_dict: dict[str,pd.DataFrame]):
+    """
+    Same as set_param_df() for a df keyed by ObjectID (its index, or a column), but only sends the rows & columns 
+    which changed since the last call for this table, with their ObjectIDs. 
+    sent_df_dict: {table: last values sent}, owned by the caller. 
+        Call sent_df_dict.clear() after SimAuto.LoadState() (or any other change made to these objects 
+        outside this function), so the next call falls back to a full write. 
+    """
+    # A partial write is only applied to the right objects with their keys. 
+    if 'ObjectID' in df.columns:
+        current_df = df.set_index('ObjectID')
+    elif df.index.name == 'ObjectID':
+        current_df = df.copy()
+    else:
+        raise ValueError(f'set_param_df_delta(): the {table} df has no ObjectID column or index to key the changed rows by.')
+    last_df = sent_df_dict.get(table)
+    sent_df_dict[table] = current_df
+
+    # Nothing tracked yet (or the columns changed): full write. 
+    if last_df is None or list(last_df.columns) != list(current_df.columns):
+        return set_param_df(SimAuto, table, current_df)
+
+    # Objects which weren't sent last time get all of their columns. 
+    new_ids = current_df.index.difference(last_df.index)
+    return_value = set_param_df(SimAuto, table, current_df.loc[new_ids])
+
+    # Everything else: only the rows & columns with a changed value. 
+    common_ids = current_df.index.intersection(last_df.index)
+    new_values = current_df.loc[common_ids]
+    old_values = last_df.loc[common_ids]
+    changed = (new_values != old_values) & ~(new_values.isna() & old_values.isna())
+    changed_rows = changed.any(axis=1)
+    changed_columns = changed.any(axis=0)
+    if changed_rows.any():
+        return_value = set_param_df(SimAuto, table, new_values.loc[changed_rows, changed_columns])
+
+    return return_value
+
 def open_case(SimAuto, fp) -> bool:
     # Attempts to open a case.
     # Error case: message = ('OpenCase: Errors have occurred',)
     # Success case: message = ('',)
 
-    if not Path(fp).exists():
+    # Offline backends (replay, nr_backend) don't need the case file (e.g. TopoSeed.pwb) to exist. 
+    if not Path(fp).exists() and not getattr(SimAuto, 'offline', False):
         print(f'Path does not exist: {str(fp)}')
         return False
     
@@ -118,7 +323,67 @@ def save_case(SimAuto, fp, case_format = 'PWB22') -> bool:
     print(f'Saved: {str(fp)}')
     return True
 
-def solve(SimAuto, mva_mismatch_threshold = 1.0) -> bool:
+def check_mismatch_full(SimAuto, mva_mismatch_threshold: float) -> float:
+    # Reads the mismatch on every bus. 
+    df = get_param_df(SimAuto, 'Bus', {'Busnum':int, 'MismatchP':float, 'MismatchQ':float})
+    df['MismatchS'] = (df['MismatchP']**2.0 + df['MismatchQ']**2.0)**0.5
+    return df['MismatchS'].abs().max()
+
+def check_mismatch_filtered(SimAuto, mva_mismatch_threshold: float) -> float:
+    # Only reads buses which could be above the threshold. 
+    # Any bus with S >= threshold has |P| or |Q| >= threshold / sqrt(2), so those 4 filters cover every failing bus. 
+    # Returns 0.0 if no bus is returned by any filter, or None if a filtered read fails. 
+    limit = mva_mismatch_threshold / (2.0 ** 0.5)
+    for condition in [f'MismatchP > {limit}', f'MismatchP < {-limit}', f'MismatchQ > {limit}', f'MismatchQ < {-limit}']:
+        output = SimAuto.GetParametersMultipleElementRect('Bus', ['Busnum', 'MismatchP', 'MismatchQ'], condition)
+        if output[0] != '':
+            return None
+        rows = output[1] if len(output) > 1 else None
+        if rows is None or len(rows) == 0:
+            continue
+        df = convert_param_rows(rows, {'Busnum':int, 'MismatchP':float, 'MismatchQ':float})
+        max_mismatch = ((df['MismatchP']**2.0 + df['MismatchQ']**2.0)**0.5).max()
+        if max_mismatch >= mva_mismatch_threshold:
+            return max_mismatch
+    return 0.0
+
+def check_mismatch_summary(SimAuto, mva_mismatch_threshold: float) -> float:
+    # Reads the largest MW & Mvar mismatch from the case summary, in one small read. 
+    # Returns None if the fields can't be read, so solve() falls back to the full check. 
+    table, fields = convergence_summary_fields
+    rows = get_param(SimAuto, table, fields)
+    if rows is None or len(rows) == 0:
+        return None
+    df = convert_param_rows(rows, {field: float for field in fields})
+    return float(((df[fields[0]]**2.0 + df[fields[1]]**2.0)**0.5).max())
+
+def check_mismatch_skip(SimAuto, mva_mismatch_threshold: float) -> float:
+    # Trusts the SolvePowerFlow result. Only for advisory solves, where a later check confirms the solution. 
+    return 0.0
+
+# Convergence check strategies for solve(). Each returns the max mismatch (MVA), or None if it could not check. 
+convergence_checks: dict[str,object] = {
+    'full': check_mismatch_full
+    ,'filtered': check_mismatch_filtered
+    ,'summary': check_mismatch_summary
+    ,'skip': check_mismatch_skip
+}
+# Strategy used by solve() when the caller doesn't pick one. 
+convergence_check = 'full'
+# (table, [max MW mismatch field, max Mvar mismatch field]) for the 'summary' strategy. 
+convergence_summary_fields = ('PWCaseInformation', ['MaxMismatchMW', 'MaxMismatchMvar'])
+# One entry per solve(): strategy, check time, max mismatch, and result. 
+solve_log: list[dict[str,object]] = []
+
+def solve(SimAuto, mva_mismatch_threshold = 1.0, check: str = None) -> bool:
+    """
+    Solves the power flow, then checks the max bus mismatch (MVA) is below the threshold. 
+    check: A strategy name from convergence_checks. Defaults to the module-level convergence_check. 
+    Each call is recorded in solve_log. 
+    """
+    if check is None:
+        check = convergence_check
+
     # Solve.
     SimAuto.RunScriptCommand('EnterMode(RUN);')
     result = SimAuto.RunScriptCommand('SolvePowerFlow(RECTNEWT);')
@@ -126,55 +391,102 @@ def solve(SimAuto, mva_mismatch_threshold = 1.0) -> bool:
     # Error string. Return early with False if it didn't solve. 
     if result[0] != '': 
         print(result[0])
+        solve_log.append({'Check': 'none', 'CheckSeconds': 0.0, 'MaxMismatch': np.nan, 'Solved': False})
         return False
     SimAuto.RunScriptCommand('EnterMode(EDIT);')
 
     # Get mismatch. 
-    df = get_param_df(SimAuto, 'Bus', {'Busnum':int, 'MismatchP':float, 'MismatchQ':float})
-    df['MismatchS'] = (df['MismatchP']**2.0 + df['MismatchQ']**2.0)**0.5
-    max_mismatch = df['MismatchS'].abs().max()
+    start = time.perf_counter()
+    max_mismatch = convergence_checks[check](SimAuto, mva_mismatch_threshold)
+    if max_mismatch is None:
+        check = 'full'
+        max_mismatch = check_mismatch_full(SimAuto, mva_mismatch_threshold)
+    check_seconds = time.perf_counter() - start
 
     # print(f'Max Mismatch (S) = {max_mismatch}')
 
-    return max_mismatch < mva_mismatch_threshold
+    solved = bool(max_mismatch < mva_mismatch_threshold)
+    solve_log.append({'Check': check, 'CheckSeconds': check_seconds, 'MaxMismatch': max_mismatch, 'Solved': solved})
+    return solved
+
+def solve_log_df() -> pd.DataFrame:
+    """Returns solve_log as a DataFrame, e.g. to add to a scale log workbook."""
+    return pd.DataFrame(solve_log, columns=['Check', 'CheckSeconds', 'MaxMismatch', 'Solved'])
+
+# Changes which diverged in set_param_df_recursive(), remembered across calls (and hours). 
+# Set known_bad_fp to a CSV file to also keep them across runs, so later hours exclude them without a solve. 
+known_bad_fp: Path = None
+# The seed case the changes are made to (e.g. TopoSeed.pwb). If set, the file name includes its content hash, so a 
+# new or changed seed case starts a new file instead of excluding changes found on the old one. 
+known_bad_seed_fp: Path = None
+# Parts the failing set is split into by the ddmin search. 
+param_search_granularity = 4
+param_search: ddmin.FailureSearch = None
+
+def get_param_search() -> ddmin.FailureSearch:
+    """The ddmin.FailureSearch used by set_param_df_recursive(). Its counters show the solves performed & saved."""
+    global param_search
+    fp = None if known_bad_fp is None else Path(known_bad_fp)
+    if fp is not None and known_bad_seed_fp is not None:
+        if Path(known_bad_seed_fp).exists():
+            fp = fp.with_name(f'{fp.stem}_{case_cache.hash_file(known_bad_seed_fp)[:16]}{fp.suffix}')
+        else:
+            # Nothing to key the file by (e.g. on replay). Keep them for this run only. 
+            fp = None
+    if param_search is None or param_search.known_bad_fp != fp:
+        param_search = ddmin.FailureSearch(param_search_granularity, fp)
+    return param_search
 
-# Given:
-#   SimAuto: PowerWorld SimulatorAuto object
-#   df: A dataframe of object parameters to set. 
-# Attempt to apply all the changes in bulk edits using set_param_df().
-# If it fails, revert to the previous system state, and bifurcate the df into two halves to test recursively until reaching 1 item. 
-# If individual items fail, keep track of those failures on a row-by-row basis.
-def set_param_df_recursive(SimAuto, table: str, df: pd.DataFrame):
-    SimAuto.SaveState()
+def set_param_df_recursive(SimAuto, table: str, df: pd.DataFrame, key_columns: list[str] = None) -> pd.DataFrame:
+    """
+    Sets the parameters in df (indexed by ObjectID), keeping every change which solves. 
+    Changes which diverge are found with a ddmin search (see ddmin.py), and marked with 'Include' = False & 
+    'ExclusionReason' = 'Diverged' in the returned copy of df. Changes already known to diverge aren't attempted, 
+    and are marked 'Known Diverged'. 
+    key_columns: The target values which identify a change, with its ObjectID, e.g. ['Status']. Defaults to all columns. 
+    """
+    df = df.copy()
+    if len(df) == 0:
+        return df
+    if key_columns is None:
+        key_columns = [column for column in df.columns if column not in ['Include', 'ExclusionReason']]
+
+    values = df[key_columns].astype(str).agg('|'.join, axis=1)
+    keys = [(table, str(object_id), value) for object_id, value in zip(df.index, values)]
+    positions = {key: position for position, key in enumerate(keys)}
+
+    def test(test_keys, keep: bool) -> bool:
+        set_param_df(SimAuto, table, df.iloc[[positions[key] for key in test_keys]])
+        success = solve(SimAuto, mva_mismatch_threshold)
+        if success and keep:
+            SimAuto.SaveState()
+        else:
+            SimAuto.LoadState()
+        return success
 
-    # Attempt all the edits in a single bulk step. 
+    SimAuto.SaveState()
     print(f'Attempting to set {len(df)} {table} parameters at once.')
-    message = set_param_df(SimAuto, table, df)
-
-    if solve(SimAuto, mva_mismatch_threshold):
+    rejected, skipped = get_param_search().run(keys, test)
+
+    for reason, failed_keys in [('Diverged', rejected), ('Known Diverged', skipped)]:
+        if len(failed_keys) == 0:
+            continue
+        index = df.index[[positions[key] for key in failed_keys]]
+        df.loc[index, 'Include'] = False
+        df.loc[index, 'ExclusionReason'] = reason
+        print(f'Could not set these {table} ({reason}):')
+        print(df.loc[index])
+    if len(rejected) == 0 and len(skipped) == 0:
         print('Success!')
-    else:
-        SimAuto.LoadState()
-        # Failed to do all changes at once! Revert, and try individual branch changes. 
-        print(f'Failed to set parameters on all elements at the same time. Bifurcating into half the list size.')
-
-        # If dataframe is already only 1 item, record the failure on that row of the slice of the dataframe. 
-        # 'ExclusionReason' = 'Diverged'. 
-        # 'Include' = False.
-        if len(df) == 1:
-            df.at[df.index[0], 'Include'] = False
-            df.at[df.index[0], 'ExclusionReason'] = 'Diverged'
-            print(f'Could not set this {table}:')
-            print(df)
-            return
-        
-        # Split the list into two halves to process. 
-        set_param_df_recursive(SimAuto, table, df.iloc[:len(df)//2])
-        set_param_df_recursive(SimAuto, table, df.iloc[len(df)//2:])
 
     return df
 
-def get_case_data(SimAuto) -> dict[str,dict[str,object]]:
+def get_case_data(SimAuto, source_fps: list[Path] = None, prepare = None) -> dict[str,dict[str,object]]:
+    """
+    Returns the full topological details of the open case, as {element_type: {'table_name', 'df'}}. 
+    source_fps: If the open case is unmodified from these files, tables are reused from the cache (see get_param_dfs_cached()). 
+    prepare: Called before reading from SimAuto, e.g. to open the case. Skipped when every table is cached. 
+    """
     print('get_case_data()')
     
     # Define all the required network-parameters to fully define each object. 
@@ -509,36 +821,23 @@ def get_case_data(SimAuto) -> dict[str,dict[str,object]]:
         ,'DataMaintainerAssign': str
     }
 
-    case_dict = {
-        'Bus':{
-            'table_name': 'Bus'
-            ,'df': get_param_df(SimAuto, 'Bus', bus_params)
-        }
-        ,'Load':{
-            'table_name': 'Load'
-            ,'df': get_param_df(SimAuto, 'Load', load_params)
-        }
-        ,'Gen':{
-            'table_name': 'Gen'
-            ,'df': get_param_df(SimAuto, 'Gen', gen_params)
-        }
-        ,'Branch':{
-            'table_name': 'Branch'
-            ,'df': get_param_df(SimAuto, 'Branch', branch_params, "BranchDeviceType notcontains 'Transformer'")
-        }
-        ,'Transformer':{
-            'table_name': 'Branch'
-            ,'df': get_param_df(SimAuto, 'Branch', transformer_params, "BranchDeviceType = 'Transformer'")
-        }
-        ,'LineShunt':{
-            'table_name': 'LineShunt'
-            ,'df': get_param_df(SimAuto, 'LineShunt', lineshunt_params)
-        }
-        # ,'MultiSectionLine':{
-        #     'table_name': 'MultiSectionLine'
-        #     ,'df': get_param_df(SimAuto, 'MultiSectionLine', multisectionline_params)
-        # }
+    requests: dict[str,tuple] = {
+        'Bus': ('Bus', bus_params, '')
+        ,'Load': ('Load', load_params, '')
+        ,'Gen': ('Gen', gen_params, '')
+        ,'Branch': ('Branch', branch_params, "BranchDeviceType notcontains 'Transformer'")
+        ,'Transformer': ('Branch', transformer_params, "BranchDeviceType = 'Transformer'")
+        ,'LineShunt': ('LineShunt', lineshunt_params, '')
+        # ,'MultiSectionLine': ('MultiSectionLine', multisectionline_params, '')
     }
+    df_dict = get_param_dfs_cached(SimAuto, requests, source_fps, prepare)
+
+    case_dict = {}
+    for element_type in requests:
+        case_dict[element_type] = {
+            'table_name': requests[element_type][0]
+            ,'df': df_dict[element_type]
+        }
 
     return case_dict
 
@@ -651,21 +950,25 @@ def create_giant_swing(SimAuto, fault_df) -> pd.DataFrame:
 
     return swing_df
 
-def create_distgen_XN_loads(SimAuto, gv_fps: Path, toposeed_fp: Path) -> pd.DataFrame:
+def create_distgen_XN_loads(SimAuto, gv_fps: Path, toposeed_fp: Path, native_epc: bool = True) -> pd.DataFrame:
     """
     Gathers load data from all GridView EPCs
         (since they are dynamically generated by GridView for each hour)
     Opens the TopoSeed case. Creates all X1/X2/X3 etc distributed generation loads which don't exist already.
     New loads will be in a normal-open status, with MW=0 MVAR=0 for all related values. 
     Returns a dataframe of all distributed generation loads which were created. 
+    native_epc: Read the EPC load tables straight from disk rather than opening each EPC in PowerWorld.
     """
     # Open each case in gv_fps, and get the load data from get_case_data()
     gv_load_df_list = []
     for gv_fp in gv_fps:
-        open_case(SimAuto, gv_fp)
-        case_dict = get_case_data(SimAuto)
-        gv_load_df = case_dict['Load']['df']
-        SimAuto.CloseCase()
+        if native_epc and Path(gv_fp).suffix.lower() == '.epc':
+            # Bus fields (BusName, NomkV) cannot be written when creating loads. 
+            gv_load_df = get_epc_param_dfs(gv_fp, {'Load': ('Load', None, '')})['Load'].drop(columns=['BusName', 'NomkV'])
+        else:
+            case_dict = get_case_data(SimAuto, [gv_fp], lambda: open_case(SimAuto, gv_fp))
+            gv_load_df = case_dict['Load']['df']
+            SimAuto.CloseCase()
         gv_load_df_list.append(gv_load_df)
     
     # Merge all load dataframes into one. 
@@ -675,10 +978,12 @@ def create_distgen_XN_loads(SimAuto, gv_fps: Path, toposeed_fp: Path) -> pd.Data
     
     # Get the topology seed data. 
     open_case(SimAuto, toposeed_fp)
-    case_dict = get_case_data(SimAuto)
+    case_dict = get_case_data(SimAuto, [toposeed_fp])
     pw_load_df = case_dict['Load']['df']
 
     # Get all gv_load_df rows which do not yet exist in pw_load_df.
+    if native_epc:
+        gv_load_df = epc_reader.align_object_ids(gv_load_df, pw_load_df, ['BusNum', 'ID'])
     missing_df = gv_load_df[~gv_load_df['ObjectID'].isin(pw_load_df['ObjectID'])].copy(deep=True)
     missing_df['Status'] = 'Open'
     missing_df['SMW'] = 0
@@ -701,13 +1006,14 @@ def create_distgen_XN_loads(SimAuto, gv_fps: Path, toposeed_fp: Path) -> pd.Data
 
     return missing_df
 
-def compute_pw_targets(SimAuto, left_fp: Path, right_fp: Path) -> list[pd.DataFrame]:
+def compute_pw_targets(SimAuto, left_fp: Path, right_fp: Path, native_epc: bool = True) -> list[pd.DataFrame]:
     """
     Returns gen & load dataframes. 
     Left case: The load & generation you wish to have (Target). 
     Right case: The case you are using, which should take in the gen & load from the Left case. 
     "MWSetPoint": Right Case Value. 
     "MWSetPoint_Target": Left Case Value. 
+    native_epc: If the left case is an EPC, read it straight from disk rather than opening it in PowerWorld.
     """
 
     gen_params: dict[str,type] = {
@@ -716,6 +1022,7 @@ def compute_pw_targets(SimAuto, left_fp: Path, right_fp: Path) -> list[pd.DataFr
         ,'BusName': str
         ,'NomkV': float
         ,'ID': str
+        ,'AreaNumber': int
         ,'Status': str
         ,'MWSetPoint': float
     }
@@ -739,17 +1046,36 @@ def compute_pw_targets(SimAuto, left_fp: Path, right_fp: Path) -> list[pd.DataFr
         # ,'ZMvar': float
     }
 
+    def open_left():
+        if not open_case(SimAuto, left_fp):
+            raise
+
+    def open_right():
+        if not open_case(SimAuto, right_fp):
+            raise
+
+    requests: dict[str,tuple] = {
+        'Gen': ('Gen', gen_params, '')
+        ,'Load': ('Load', load_params, '')
+    }
+
     # Get data from left case.
-    if not open_case(SimAuto, left_fp):
-        raise
-    left_gen_df = get_param_df(SimAuto, 'Gen', gen_params)
-    left_load_df = get_param_df(SimAuto, 'Load', load_params)
+    if native_epc and Path(left_fp).suffix.lower() == '.epc':
+        left_dict = get_epc_param_dfs(left_fp, requests)
+    else:
+        left_dict = get_param_dfs_cached(SimAuto, requests, [left_fp], open_left)
+    left_gen_df = left_dict['Gen']
+    left_load_df = left_dict['Load']
 
     # Get data from right case.
-    if not open_case(SimAuto, right_fp):
-        raise
-    right_gen_df = get_param_df(SimAuto, 'Gen', gen_params)
-    right_load_df = get_param_df(SimAuto, 'Load', load_params)
+    right_dict = get_param_dfs_cached(SimAuto, requests, [right_fp], open_right)
+    right_gen_df = right_dict['Gen']
+    right_load_df = right_dict['Load']
+
+    # Match the ObjectID strings PowerWorld uses for the same BusNum & ID. 
+    if native_epc and Path(left_fp).suffix.lower() == '.epc':
+        left_gen_df = epc_reader.align_object_ids(left_gen_df, right_gen_df, ['BusNum', 'ID'])
+        left_load_df = epc_reader.align_object_ids(left_load_df, right_load_df, ['BusNum', 'ID'])
 
     # Put current case values, and the "Target", side by side. 
     gen_target_df = right_gen_df.merge(
@@ -758,7 +1084,7 @@ def compute_pw_targets(SimAuto, left_fp: Path, right_fp: Path) -> list[pd.DataFr
         ,how='left'
         ,suffixes=('', '_Target')
     )
-    gen_target_df.drop(columns=['BusNum_Target', 'BusName_Target', 'NomkV_Target', 'ID_Target'], inplace=True)
+    gen_target_df.drop(columns=['BusNum_Target', 'BusName_Target', 'NomkV_Target', 'ID_Target', 'AreaNumber_Target'], inplace=True)
 
     # Save original state. 
     gen_target_df['Status_Seed'] = gen_target_df['Status']
@@ -817,15 +1143,125 @@ def compute_pw_targets(SimAuto, left_fp: Path, right_fp: Path) -> list[pd.DataFr
 
     return [gen_target_df, load_target_df]
 
-def test_gen_targets(pw_fp: Path, gen_target_df):
+# Generator target tests (test_gen_targets_parallel()). 
+# 'individual': one solve per generator. 
+# 'grouped': applies the targets of nearby generators (same AreaNumber, then BusNum order) together, one solve per 
+#   group, and only bisects the groups which diverge. Far fewer solves when most targets solve. 
+# 'contingency': writes each generator's target as a contingency, and solves them all in one PowerWorld contingency run. 
+gen_test_mode = 'individual'
+# Generators per group, for the 'grouped' mode. 
+gen_test_group_size = 16
+# Folder for the contingency AUX files of the 'contingency' mode. Defaults to the temp folder. Each file is written to 
+# its own new subfolder, so parallel processes don't share it, and deleted once loaded. 
+gen_test_ctg_dir: Path = None
+# Contingency action which sets a generator's MW output. 
+ctg_gen_mw_action = 'SETTO {mw:.4f} MW'
+# Generators tested & solves performed by the last test_gen_targets_parallel(), vs. one solve per generator. 
+gen_test_summary: dict[str,object] = {}
+
+def test_gen_group_on_case(SimAuto, group_df) -> int:
     """
-    Tests each change individually, and reports which individual changes are not possible. 
+    Applies every change in group_df at once and solves. If it diverges, splits the group in half and tests each half, 
+    down to single generators. Sets 'Success' in group_df, and returns the number of solves. 
+    A group which solves marks all of its generators as successful. 
+    """
+    set_param_df(SimAuto, 'Gen', group_df)
+    success = solve(SimAuto)
+    SimAuto.LoadState()
+    solves = 1
+
+    if success or len(group_df) == 1:
+        group_df['Success'] = success
+        return solves
+
+    half = len(group_df) // 2
+    for part_df in [group_df.iloc[:half].copy(), group_df.iloc[half:].copy()]:
+        solves += test_gen_group_on_case(SimAuto, part_df)
+        group_df.loc[part_df.index, 'Success'] = part_df['Success']
+    return solves
+
+def gen_target_ctg_actions(gen_target_df) -> dict[str,list[str]]:
+    """
+    Contingency actions which apply each generator's Status & MW target: {ObjectID: [actions]}. 
+    Generators whose target doesn't change the case have no actions. 
+    """
+    status_target = gen_target_df['Status_Target'].fillna('Open')
+    mw_target = gen_target_df['MWSetPoint_Target'].fillna(0)
+    actions: dict[str,list[str]] = {}
+    for object_id in gen_target_df.index:
+        closed = (gen_target_df.loc[object_id, 'Status'] == 'Closed')
+        if status_target[object_id] == 'Open':
+            actions[object_id] = ['OPEN'] if closed else []
+            continue
+        actions[object_id] = [] if closed else ['CLOSE']
+        if not closed or mw_target[object_id] != gen_target_df.loc[object_id, 'MWSetPoint']:
+            actions[object_id].append(ctg_gen_mw_action.format(mw=mw_target[object_id]))
+    return actions
+
+def write_ctg_aux(aux_fp: Path, ctg_actions: dict[str,list[tuple[str,str]]]):
     """
+    Writes contingencies to an AUX file. 
+    ctg_actions: {contingency name: [(object, action), ...]}, e.g. {'GENTEST_1': [("GEN 10 '1'", 'OPEN')]}. 
+    """
+    lines = ['Contingency (Name,Skip)', '{']
+    lines += [f'"{name}" "NO"' for name in ctg_actions.keys()]
+    lines += ['}', '', 'ContingencyElement (Contingency,Object,Action,CriteriaStatus)', '{']
+    for name, elements in ctg_actions.items():
+        lines += [f'"{name}" "{object_id}" "{action}" "CHECK"' for object_id, action in elements]
+    lines += ['}', '']
+    Path(aux_fp).parent.mkdir(parents=True, exist_ok=True)
+    Path(aux_fp).write_text('\n'.join(lines), encoding='utf-8')
+    return
 
-    SimAuto = win32com.client.Dispatch("pwrworld.SimulatorAuto")
-    open_case(SimAuto, pw_fp)
-    solve(SimAuto)
-    SimAuto.SaveState()
+def test_gen_targets_ctg_on_case(SimAuto, gen_target_df):
+    """
+    Same as test_gen_targets_on_case(), but as one batch: each generator's target is written as a contingency 
+    (see gen_target_ctg_actions()), all of them are solved with CTGSolveAll, and 'Success' is read from each 
+    contingency's Solved field. Generators with no change to test are marked as successful. 
+    The number of contingencies solved is stored in gen_target_df.attrs['Solves']. 
+    Any contingencies already in the case are deleted. 
+    """
+    actions = gen_target_ctg_actions(gen_target_df)
+    changed = [object_id for object_id in gen_target_df.index if len(actions[object_id]) > 0]
+    ctg_names = {f'GENTEST_{i + 1}': object_id for i, object_id in enumerate(changed)}
+    gen_target_df['Success'] = True
+
+    if len(ctg_names) > 0:
+        if gen_test_ctg_dir is not None:
+            Path(gen_test_ctg_dir).mkdir(parents=True, exist_ok=True)
+        SimAuto.RunScriptCommand('EnterMode(RUN);')
+        chk(SimAuto, SimAuto.RunScriptCommand('Delete(Contingency);'), 'Delete(Contingency)')
+        # The subfolder's random name is recorded as <ctg>, so the run can still be replayed. 
+        with tempfile.TemporaryDirectory(prefix='wpp_ctg_', dir=gen_test_ctg_dir) as ctg_dir, simauto_replay.mapped_path('<ctg>', ctg_dir):
+            aux_fp = Path(ctg_dir) / (gen_targets_session(gen_target_df) + '.aux')
+            write_ctg_aux(aux_fp, {name: [(object_id, action) for action in actions[object_id]] for name, object_id in ctg_names.items()})
+            chk(SimAuto, SimAuto.RunScriptCommand('LoadAux("' + str(aux_fp) + '",YES);'), 'LoadAux')
+        chk(SimAuto, SimAuto.RunScriptCommand('CTGSolveAll(NO,YES);'), 'CTGSolveAll')
+        ctg_df = get_param_df(SimAuto, 'Contingency', {'Name': str, 'Solved': str})
+        chk(SimAuto, SimAuto.RunScriptCommand('Delete(Contingency);'), 'Delete(Contingency)')
+        SimAuto.RunScriptCommand('EnterMode(EDIT);')
+        SimAuto.LoadState()
+
+        # Contingencies which weren't solved (or are missing from the results) failed. 
+        solved = set(ctg_df.loc[ctg_df['Solved'].str.upper() == 'YES', 'Name'])
+        gen_target_df.loc[list(ctg_names.values()), 'Success'] = [name in solved for name in ctg_names.keys()]
+
+    gen_target_df.attrs['Solves'] = len(ctg_names)
+    return gen_target_df
+
+def test_gen_targets_on_case(SimAuto, gen_target_df, mode: str = 'individual', group_size: int = 16):
+    """
+    Tests each change on the open case, and reports which individual changes are not possible. 
+    mode: 'individual' solves each change on its own. 'grouped' tests groups of group_size changes from gen_test_groups(), 
+        and bisects the groups which diverge (see test_gen_group_on_case()). 
+        'contingency' solves every change as a contingency, in one batch (see test_gen_targets_ctg_on_case()). 
+    The number of solves is stored in gen_target_df.attrs['Solves']. 
+    The case must be solved, with SaveState() called. It is left in that state. 
+    """
+    if mode == 'contingency':
+        return test_gen_targets_ctg_on_case(SimAuto, gen_target_df)
+    if mode == 'grouped':
+        groups = gen_test_groups(gen_target_df, group_size)
 
     # Save previous status and setpoint. 
     gen_target_df['Status_Old'] = gen_target_df['Status']
@@ -834,42 +1270,175 @@ def test_gen_targets(pw_fp: Path, gen_target_df):
     # Test each generation change.
     gen_target_df['Status'] = gen_target_df['Status_Target']
     gen_target_df['MWSetPoint'] = gen_target_df['MWSetPoint_Target']
-    gen_target_df['MWSetPoint'].fillna(0, inplace=True)
-    gen_target_df['Status'].fillna('Open', inplace=True)
-
-    for i in range(len(gen_target_df)):
-        row_df = gen_target_df.iloc[[i]]
-        # Set case to target value for this specific element. 
-        set_param_df(SimAuto, 'Gen', row_df)
-        success = solve(SimAuto)
-        gen_target_df.loc[gen_target_df.index[i], 'Success'] = success
-        SimAuto.LoadState()
+    gen_target_df['MWSetPoint'] = gen_target_df['MWSetPoint'].fillna(0)
+    gen_target_df['Status'] = gen_target_df['Status'].fillna('Open')
+
+    solves = 0
+    if mode == 'grouped':
+        for group_index in groups:
+            group_df = gen_target_df.loc[group_index].copy()
+            solves += test_gen_group_on_case(SimAuto, group_df)
+            gen_target_df.loc[group_index, 'Success'] = group_df['Success']
+    else:
+        for i in range(len(gen_target_df)):
+            row_df = gen_target_df.iloc[[i]]
+            # Set case to target value for this specific element. 
+            set_param_df(SimAuto, 'Gen', row_df)
+            success = solve(SimAuto)
+            gen_target_df.loc[gen_target_df.index[i], 'Success'] = success
+            SimAuto.LoadState()
+            solves += 1
 
     # Restore previous status and setpoint. 
     gen_target_df['Status'] = gen_target_df['Status_Old']
     gen_target_df['MWSetPoint'] = gen_target_df['MWSetPoint_Old']
     gen_target_df.drop(columns=['Status_Old','MWSetPoint_Old'], inplace=True)
+    gen_target_df.attrs['Solves'] = solves
+
+    return gen_target_df
+
+def gen_targets_session(gen_target_df) -> str:
+    # One recording per chunk of generators, so each chunk's calls can be replayed. 
+    return 'test_gen_targets_' + hashlib.sha1(','.join(gen_target_df.index.astype(str)).encode('utf-8')).hexdigest()[:12]
+
+def test_gen_targets(pw_fp: Path, gen_target_df, mode: str = 'individual', group_size: int = 16):
+    """
+    Tests each change individually, and reports which individual changes are not possible. 
+    """
+    SimAuto = dispatch_simauto(gen_targets_session(gen_target_df))
+    open_case(SimAuto, pw_fp)
+    solve(SimAuto, check='skip')
+    SimAuto.SaveState()
+
+    gen_target_df = test_gen_targets_on_case(SimAuto, gen_target_df, mode, group_size)
 
     SimAuto.CloseCase()
     SimAuto = None
 
     return gen_target_df
 
-def test_gen_targets_parallel(pw_fp: Path, gen_target_df):
+def gen_test_cost(gen_target_df) -> pd.DataFrame:
+    # Status change & |delta MW| of each test. 
+    status_change = (gen_target_df['Status_Target'] != gen_target_df['Status'])
+    delta_mw = (gen_target_df['MWSetPoint_Target'].fillna(0) - gen_target_df['MWSetPoint'].fillna(0)).abs()
+    return pd.DataFrame({'StatusChange': status_change, 'DeltaMW': delta_mw}, index=gen_target_df.index)
+
+def gen_test_order(gen_target_df) -> pd.Index:
     """
-    Taking a set of target MW & Status values for generators, tests to see if each one will solve individually.
+    ObjectIDs, most expensive test first: status changes, then the largest |delta MW|. 
+    These are the tests most likely to diverge, which take the longest. 
     """
-    num_cores = mp.cpu_count()
-    df_splits = np.array_split(gen_target_df, num_cores)
+    cost_df = gen_test_cost(gen_target_df)
+    return cost_df.sort_values(by=['StatusChange', 'DeltaMW'], ascending=False, kind='stable').index
 
-    # Run in parallel:
-    with mp.Pool(processes=num_cores) as pool:
-        results = pool.starmap(test_gen_targets, [(pw_fp, part) for part in df_splits])
+def gen_test_groups(gen_target_df, group_size: int = 16) -> list[pd.Index]:
+    """
+    Splits the generators into groups of up to group_size electrically close units: the same AreaNumber, 
+    and neighbouring bus numbers (which are assigned by area/zone & substation in WECC cases). 
+    Generators with no change to test are left out, and marked as successful in gen_target_df. 
+    Groups are returned most expensive first (see gen_test_order()). 
+    """
+    cost_df = gen_test_cost(gen_target_df)
+    changed = cost_df['StatusChange'] | (cost_df['DeltaMW'] > 0)
+    area = gen_target_df['AreaNumber'] if 'AreaNumber' in gen_target_df.columns else 0
+    sort_df = pd.DataFrame({'AreaNumber': area, 'BusNum': gen_target_df['BusNum']}, index=gen_target_df.index)[changed]
+    sort_df = sort_df.sort_values(by=['AreaNumber', 'BusNum'], kind='stable')
+
+    groups: list[pd.Index] = []
+    for _, area_df in sort_df.groupby('AreaNumber', sort=False):
+        groups += [area_df.index[i:i + group_size] for i in range(0, len(area_df), group_size)]
+
+    # Unchanged generators always solve. 
+    unchanged = gen_target_df.index[~changed]
+    if len(unchanged) > 0:
+        gen_target_df.loc[unchanged, 'Success'] = True
+
+    groups.sort(key=lambda group: (cost_df.loc[group, 'StatusChange'].sum(), cost_df.loc[group, 'DeltaMW'].sum()), reverse=True)
+    return groups
+
+def test_gen_targets_parallel(pw_fp: Path, gen_target_df, pool = None, task_size: int = 4, mode: str = None, group_size: int = None, SimAuto = None):
+    """
+    Taking a set of target MW & Status values for generators, tests to see if each one will solve individually.
+    pool: Optional simauto_pool.SimAutoPool with pw_fp already open, reused across calls (e.g. every hour). 
+        The tests are queued as small tasks of task_size generators, most expensive first, and each worker 
+        takes the next task when it finishes one. See pool.utilization_df() for how busy each worker was. 
+        In 'grouped' mode, each group from gen_test_groups() is one task. In 'contingency' mode, tasks are larger. 
+        Without a pool, a new set of worker processes is started, each opening pw_fp and testing an equal share. 
+    SimAuto: Instead of worker processes, open pw_fp with this SimAuto and test in this process. For a case the 
+        pool doesn't have open (e.g. a warm start), when the changes are few enough not to need the workers. 
+        Only the generators whose status or MW changes are tested. The rest are marked as successful. 
+    mode, group_size: See gen_test_mode & gen_test_group_size, which are the defaults. 
+    Results are merged back into gen_target_df by ObjectID (its index). 
+    The solves performed (vs. one per generator) are printed, and stored in gen_test_summary. 
+    """
+    if mode is None:
+        mode = gen_test_mode
+    if group_size is None:
+        group_size = gen_test_group_size
+
+    gen_target_df = gen_target_df.copy()
+    gen_target_df['Success'] = None
+
+    if SimAuto is not None:
+        if not open_case(SimAuto, pw_fp):
+            raise
+        solve(SimAuto, check='skip')
+        SimAuto.SaveState()
+        cost_df = gen_test_cost(gen_target_df)
+        changed = cost_df['StatusChange'] | (cost_df['DeltaMW'] > 0)
+        gen_target_df.loc[~changed, 'Success'] = True
+        print(f'Testing the {int(changed.sum())} of {len(gen_target_df)} generators which change, in this process.')
+        results = [(0, test_gen_targets_on_case(SimAuto, gen_target_df[changed].copy(), mode, group_size))]
+    elif pool is not None:
+        pool.task_log.clear()
+        if mode == 'grouped':
+            tasks = [gen_target_df.loc[group_index] for group_index in gen_test_groups(gen_target_df, group_size)]
+        else:
+            if mode == 'contingency':
+                # Larger tasks, since each is one contingency run. A few per worker, so they finish close together. 
+                task_size = max(task_size, -(-len(gen_target_df) // (4 * pool.num_workers)))
+            ordered_df = gen_target_df.loc[gen_test_order(gen_target_df)]
+            tasks = [ordered_df.iloc[i:i + task_size] for i in range(0, len(ordered_df), task_size)]
+        results = pool.imap_unordered(test_gen_targets_on_case, [(task_df, mode, group_size) for task_df in tasks], [gen_targets_session(task_df) for task_df in tasks])
+    else:
+        num_cores = simauto_worker_count(mp.cpu_count())
+        if mode == 'grouped':
+            # Deal whole groups out to the workers, so each group is tested together. 
+            groups = gen_test_groups(gen_target_df, group_size)
+            df_splits = [gen_target_df.loc[[i for group in groups[core::num_cores] for i in group]] for core in range(num_cores)]
+        else:
+            # Split by position (np.array_split on a DataFrame returns arrays in newer numpy). 
+            df_splits = [gen_target_df.iloc[positions] for positions in np.array_split(np.arange(len(gen_target_df)), num_cores)]
+        # With fewer groups or rows than workers, some are empty. Don't start SimAuto & open the case for those. 
+        df_splits = [part for part in df_splits if len(part) > 0]
+
+        # Run in parallel:
+        with mp.Pool(processes=max(1, len(df_splits))) as mp_pool:
+            results = enumerate(mp_pool.starmap(test_gen_targets, [(pw_fp, part, mode, group_size) for part in df_splits]))
+
+        # Run in series (for debugging):
+        # results = enumerate([test_gen_targets(pw_fp, part, mode, group_size) for part in df_splits])
+
+    tested = int(gen_target_df['Success'].notna().sum())
+    solves = 0
+    for _, result_df in results:
+        gen_target_df.loc[result_df.index, 'Success'] = result_df['Success']
+        tested += len(result_df)
+        solves += result_df.attrs.get('Solves', len(result_df))
+        print(f'\rTested {tested} of {len(gen_target_df)} generators', end='')
+    print('')
 
-    # Run in series (for debugging):
-    # results = [test_gen_targets(pw_fp, part) for part in df_splits]
+    gen_test_summary.clear()
+    gen_test_summary.update({
+        'Mode': mode
+        ,'Generators': len(gen_target_df)
+        ,'Failed': int((gen_target_df['Success'] == False).sum())
+        ,'Solves': solves
+        ,'BaselineSolves': len(gen_target_df)
+    })
+    print(f'{mode} gen target test: {solves} solves (one at a time: {len(gen_target_df)})')
 
-    gen_target_df = pd.concat(results, ignore_index=True)
+    gen_target_df['Success'] = gen_target_df['Success'].astype(bool)
     gen_target_df.sort_values(by='Success', ascending=True, inplace=True)
     return gen_target_df
 
@@ -912,7 +1481,103 @@ def report_gen_load_balance(gen_target_df, load_target_df):
 
     return
 
-def iterate_to_gen_load_targets(SimAuto, gen_target_df, load_target_df, pvqv_df, iterations=100):
+# Scaling steps in iterate_to_gen_load_targets(). 
+# 'fixed': iterations equal steps, stopping at the first step which doesn't solve. 
+# 'adaptive': continuation with a variable step, as a fraction of the total change. The step doubles after 
+#   adaptive_grow_after steps in a row solve, and halves (retrying) when a step doesn't, down to adaptive_step_min. 
+scaling_mode = 'fixed'
+adaptive_step_initial = 0.05
+adaptive_step_min = 0.0025
+adaptive_step_max = 0.25
+adaptive_grow_after = 2
+
+# Serve the Bus, Shunt & Branch reads made after each scaling step from one read per table, until the case changes. 
+iteration_snapshot = True
+# Fields read after each step, by adjust_shunts(), compute_voltage_exclusions(), drop_collapsed_sections(), 
+# and create_statcom_on_lowestv_bus(). 
+iteration_snapshot_fields: dict[str,list[str]] = {
+    'Bus': ['Number', 'BusNomVolt', 'Vpu', 'IslandNumber', 'BusIsStarBus:1']
+    ,'Shunt': ['ObjectID', 'BusNum', 'MvarNom', 'Status', 'Vpu', 'IslandNumber']
+    ,'Branch': ['ObjectID', 'Status', 'BranchVpuHigh', 'BranchVpuLow']
+}
+
+# Checkpoints of iterate_to_gen_load_targets(), when given a checkpoint_dir: at most one per interval. 
+checkpoint_interval_seconds = 600
+checkpoint_version = 1
+
+def save_checkpoint(SimAuto, checkpoint_dir: Path, state: dict[str,object], case_format = 'PWB22') -> bool:
+    """
+    Saves the open case and state (DataFrames, sets, numbers) to checkpoint_dir. 
+    Two slots are used in turn, and checkpoint.json (replaced last) names the complete one, so a crash while saving 
+    leaves the previous checkpoint intact. 
+    """
+    checkpoint_dir = Path(checkpoint_dir)
+    checkpoint_dir.mkdir(parents=True, exist_ok=True)
+    manifest_fp = checkpoint_dir / 'checkpoint.json'
+    previous = json.loads(manifest_fp.read_text(encoding='utf-8')) if manifest_fp.exists() else {}
+    slot = 'b' if previous.get('slot') == 'a' else 'a'
+
+    case_fp = checkpoint_dir / f'checkpoint_{slot}.pwb'
+    if not save_case(SimAuto, case_fp, case_format):
+        print('WARNING: Could not save the checkpoint case. Keeping the previous checkpoint.')
+        return False
+
+    def write_durable(fp: Path, data: bytes):
+        # Write to a temporary file, flush to disk, then swap it in. 
+        temp_fp = fp.with_name(fp.name + '.tmp')
+        with open(temp_fp, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_fp, fp)
+
+    state_fp = checkpoint_dir / f'checkpoint_{slot}.pkl'
+    write_durable(state_fp, pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL))
+    manifest = {
+        'version': checkpoint_version
+        ,'slot': slot
+        ,'case': case_fp.name
+        ,'state': state_fp.name
+        ,'saved': time.strftime('%Y-%m-%d %H:%M:%S')
+    }
+    write_durable(manifest_fp, json.dumps(manifest, indent=1).encode('utf-8'))
+    print(f'Saved checkpoint: {str(checkpoint_dir)} ({slot})')
+    return True
+
+def load_checkpoint(checkpoint_dir: Path) -> dict[str,object]:
+    """The state saved by save_checkpoint(), with 'case_fp' added, or None if there is no complete checkpoint."""
+    manifest_fp = Path(checkpoint_dir) / 'checkpoint.json'
+    if not manifest_fp.exists():
+        return None
+    manifest = json.loads(manifest_fp.read_text(encoding='utf-8'))
+    if manifest.get('version') != checkpoint_version:
+        print(f'Ignoring checkpoint with unsupported version: {str(manifest_fp)}')
+        return None
+    state = pickle.loads((Path(checkpoint_dir) / manifest['state']).read_bytes())
+    state['case_fp'] = Path(checkpoint_dir) / manifest['case']
+    return state
+
+def clear_checkpoint(checkpoint_dir: Path):
+    """Deletes the checkpoints, once the hour is finished."""
+    if Path(checkpoint_dir).exists():
+        shutil.rmtree(checkpoint_dir)
+    return
+
+def iterate_to_gen_load_targets(SimAuto, gen_target_df, load_target_df, pvqv_df, iterations=100, checkpoint_dir: Path = None, resume_state: dict[str,object] = None, case_format = 'PWB22', step_scale: float = 1.0):
+    """
+    Scales gen & load from their current values to their targets, in steps (see scaling_mode). 
+    step_scale: Steps are this many times larger, as a fraction of the change: 1 / the fraction of the usual change 
+        left to make (e.g. after a warm start), so each step still moves about as many MW. 
+    checkpoint_dir: Save a checkpoint here (see save_checkpoint()) after a step, at most every checkpoint_interval_seconds. 
+    resume_state: A state from load_checkpoint(), to continue from. Its case must be open, and gen_target_df & 
+        load_target_df must be the ones it holds. 
+    """
+    if iteration_snapshot:
+        SimAuto = network_snapshot.NetworkSnapshot(SimAuto, iteration_snapshot_fields)
+    if resume_state is not None:
+        step_scale = resume_state.get('step_scale', step_scale)
+    iterations = max(1, math.ceil(iterations / step_scale))
+    [step_initial, step_min, step_max] = [min(1.0, step * step_scale) for step in [adaptive_step_initial, adaptive_step_min, adaptive_step_max]]
 
     def compute_pvqv_exclusions(delta_v_limit = 0.1):
         """
@@ -993,7 +1658,7 @@ def iterate_to_gen_load_targets(SimAuto, gen_target_df, load_target_df, pvqv_df,
         gens_to_close = (gen_target_df['Status']=='Open') & (gen_target_df['Status_Target']=='Closed')
         gen_target_df.loc[gens_to_close, 'MWSetPoint'] = 0
         gen_target_df.loc[gens_to_close, 'Status'] = 'Closed'
-        result_df = set_param_df_recursive(SimAuto, 'Gen', gen_target_df[gen_target_df['Include'] == True])
+        result_df = set_param_df_recursive(SimAuto, 'Gen', gen_target_df[gen_target_df['Include'] == True], ['Status', 'MWSetPoint'])
         gen_target_df.update(result_df)
         if solve(SimAuto):
             SimAuto.SaveState()
@@ -1034,7 +1699,7 @@ def iterate_to_gen_load_targets(SimAuto, gen_target_df, load_target_df, pvqv_df,
         # Opening these should have no impact on the model solution.
         load_target_df['Status'] = load_target_df['Status_Target']
         load_target_df['DistStatus'] = load_target_df['DistStatus_Target']
-        result_df = set_param_df_recursive(SimAuto, 'Load', load_target_df[load_target_df['Include'] == True])
+        result_df = set_param_df_recursive(SimAuto, 'Load', load_target_df[load_target_df['Include'] == True], ['Status', 'DistStatus'])
         load_target_df.update(result_df)
         
         # Iterate through each generator, and attempt to change the status to the final target status.
@@ -1042,7 +1707,7 @@ def iterate_to_gen_load_targets(SimAuto, gen_target_df, load_target_df, pvqv_df,
         # If it cannot be opened, make note of it and proceed. 
         print('Setting all gen statuses...')
         gen_target_df['Status'] = gen_target_df['Status_Target']
-        result_df = set_param_df_recursive(SimAuto, 'Gen', gen_target_df[gen_target_df['Include'] == True])
+        result_df = set_param_df_recursive(SimAuto, 'Gen', gen_target_df[gen_target_df['Include'] == True], ['Status'])
         gen_target_df.update(result_df)
         return gen_target_df
 
@@ -1169,41 +1834,133 @@ def iterate_to_gen_load_targets(SimAuto, gen_target_df, load_target_df, pvqv_df,
         scalelog_dict['iteration_df'] = pd.DataFrame({"Value": ['Failed to converge base case.']})
         return scalelog_dict
 
-    [gen_pvqv_df, load_pvqv_df] = compute_pvqv_exclusions()
-    compute_voltage_exclusions()
-    close_all_related_gen_load()
-    compute_deltas()
+    if resume_state is None:
+        [gen_pvqv_df, load_pvqv_df] = compute_pvqv_exclusions()
+        compute_voltage_exclusions()
+        with simauto_trace.stage('close_all_related_gen_load'):
+            close_all_related_gen_load()
+        compute_deltas()
 
-    adjust_shunts(SimAuto)
-    if not solve(SimAuto):
-        SimAuto.LoadState()
-        print('Could not solve after adjusting shunts in the original case!')
-        scalelog_dict['iteration_df'] = pd.DataFrame({"Value": ['Failed to converge base case with shunt adjustments.']})
-        return scalelog_dict
+        adjust_shunts(SimAuto, sensitivity_df=pvqv_df)
+        if not solve(SimAuto):
+            SimAuto.LoadState()
+            print('Could not solve after adjusting shunts in the original case!')
+            scalelog_dict['iteration_df'] = pd.DataFrame({"Value": ['Failed to converge base case with shunt adjustments.']})
+            return scalelog_dict
+        resume_state = {}
+    else:
+        # Exclusions, deltas, and the related gen/load closures are already in the checkpoint. 
+        print(f'Resuming scaling at {100 * resume_state["progress"]:.1f}% of the targets.')
+        gen_pvqv_df = resume_state['gen_pvqv']
+        load_pvqv_df = resume_state['load_pvqv']
+        statcom_bus_set.update(resume_state['statcom_bus_set'])
+        dropped_branch_set.update(resume_state['dropped_branch_set'])
+
+    last_checkpoint = time.time()
+    def checkpoint(progress: float, step: float, iteration: int, attempt: int):
+        # Saves the case & scaling state, if a checkpoint is due. 
+        nonlocal last_checkpoint
+        if checkpoint_dir is None or time.time() - last_checkpoint < checkpoint_interval_seconds:
+            return
+        save_checkpoint(SimAuto, checkpoint_dir, {
+            'gen': gen_target_df
+            ,'load': load_target_df
+            ,'gen_pvqv': gen_pvqv_df
+            ,'load_pvqv': load_pvqv_df
+            ,'statcom_bus_set': statcom_bus_set
+            ,'dropped_branch_set': dropped_branch_set
+            ,'progress': progress
+            ,'step': step
+            ,'iteration': iteration
+            ,'attempt': attempt
+            ,'step_log': step_log
+            ,'step_scale': step_scale
+        }, case_format)
+        last_checkpoint = time.time()
+
+    def after_step():
+        # Corrective actions once a step has solved. 
+        SimAuto.SaveState()
+        adjust_shunts(SimAuto, sensitivity_df=pvqv_df)
+        compute_voltage_exclusions()
+        dropped_branches = drop_collapsed_sections()
+        dropped_branch_set.update(dropped_branches)
+        if dropped_branches != set([0]):
+            # ClearSmallIslands may have changed gen/load statuses. Write everything next iteration. 
+            sent_df_dict.clear()
+        statcom_number = create_statcom_on_lowestv_bus()
+        statcom_bus_set.add(statcom_number)
+        return
 
     print('')
     iteration_success = True
-    for iteration in range(iterations):
-        SimAuto.SaveState()
-        print(f'\r----- Iteration: {iteration} of {iterations} -----           ') # , end='')
-        increment(1.0)
-        set_param_df(SimAuto, 'Gen', gen_target_df)
-        set_param_df(SimAuto, 'Load', load_target_df)
-        if solve(SimAuto) and solve(SimAuto):
-            SimAuto.SaveState()
-            adjust_shunts(SimAuto)
-            compute_voltage_exclusions()
-            dropped_branches = drop_collapsed_sections()
-            dropped_branch_set.update(dropped_branches)
-            statcom_number = create_statcom_on_lowestv_bus()
-            statcom_bus_set.add(statcom_number)
-        else:
-            print(f'Stopped at Iteration: {iteration} of {iterations}')
-            print('Iteration did not solve. Reverting iteration and stopping.')
-            increment(-1.0)
-            SimAuto.LoadState() # SimAuto.RunScriptCommand("RestoreState('LASTSUCCESSFUL','');")
-            iteration_success = False
-            break # Exit the for-loop.
+    # Last gen/load values written to the case, so each iteration only sends what changed. 
+    sent_df_dict: dict[str,pd.DataFrame] = {}
+    # One entry per adaptive step: step size, progress, and result. 
+    step_log: list[dict[str,object]] = []
+    step_log += resume_state.get('step_log', [])
+    iteration = resume_state.get('iteration', 0)
+    if scaling_mode == 'adaptive':
+        # Fraction of the total change applied so far, and the size of the next step. 
+        progress = resume_state.get('progress', 0.0)
+        step = resume_state.get('step', step_initial)
+        solved_in_a_row = 0
+        attempt = resume_state.get('attempt', 0)
+        while progress < 1.0 - 1e-9:
+            step = min(step, 1.0 - progress)
+            with simauto_trace.stage(f'scaling iteration {attempt}'):
+                SimAuto.SaveState()
+                print(f'\r----- Progress: {100 * progress:.1f}%, step: {100 * step:.2f}% -----           ')
+                multiplier = step * iterations
+                increment(multiplier)
+                set_param_df_delta(SimAuto, 'Gen', gen_target_df, sent_df_dict)
+                set_param_df_delta(SimAuto, 'Load', load_target_df, sent_df_dict)
+                solved = solve(SimAuto)
+                step_log.append({'Attempt': attempt, 'Step': step, 'Progress': progress + step if solved else progress, 'Solved': solved})
+                attempt += 1
+                if solved:
+                    progress += step
+                    iteration += 1
+                    after_step()
+                    solved_in_a_row += 1
+                    if solved_in_a_row >= adaptive_grow_after:
+                        step = min(2 * step, step_max)
+                        solved_in_a_row = 0
+                    checkpoint(progress, step, iteration, attempt)
+                    continue
+
+                # Revert the step, and retry with half of it. 
+                increment(-multiplier)
+                SimAuto.LoadState()
+                sent_df_dict.clear()
+                solved_in_a_row = 0
+                if step / 2 < step_min:
+                    print(f'Stopped at {100 * progress:.1f}% of the targets.')
+                    print(f'A step of {100 * step:.2f}% did not solve, and the minimum step is {100 * step_min:.2f}%. Stopping.')
+                    iteration_success = False
+                    break
+                step = step / 2
+    else:
+        # A checkpoint from the adaptive mode continues at the equivalent iteration. 
+        for iteration in range(round(resume_state.get('progress', 0.0) * iterations), iterations):
+            with simauto_trace.stage(f'scaling iteration {iteration}'):
+                SimAuto.SaveState()
+                print(f'\r----- Iteration: {iteration} of {iterations} -----           ') # , end='')
+                increment(1.0)
+                set_param_df_delta(SimAuto, 'Gen', gen_target_df, sent_df_dict)
+                set_param_df_delta(SimAuto, 'Load', load_target_df, sent_df_dict)
+                # The first solve is advisory: the second one confirms convergence. 
+                if solve(SimAuto, check='skip') and solve(SimAuto):
+                    after_step()
+                    checkpoint((iteration + 1) / iterations, 1.0 / iterations, iteration + 1, iteration + 1)
+                else:
+                    print(f'Stopped at Iteration: {iteration} of {iterations}')
+                    print('Iteration did not solve. Reverting iteration and stopping.')
+                    increment(-1.0)
+                    SimAuto.LoadState() # SimAuto.RunScriptCommand("RestoreState('LASTSUCCESSFUL','');")
+                    sent_df_dict.clear()
+                    iteration_success = False
+                    break # Exit the for-loop.
 
     # Package the logs for return. 
     scalelog_dict['gen'] = gen_target_df[gen_target_df['Include'] == False]
@@ -1213,13 +1970,18 @@ def iterate_to_gen_load_targets(SimAuto, gen_target_df, load_target_df, pvqv_df,
     scalelog_dict['gen_pvqv'] = gen_pvqv_df
     scalelog_dict['load_pvqv'] = load_pvqv_df
     scalelog_dict['dropped_branch_df'] = pd.DataFrame({"ObjectID": list(dropped_branch_set)})
+    if scaling_mode == 'adaptive':
+        scalelog_dict['steps'] = pd.DataFrame(step_log, columns=['Attempt', 'Step', 'Progress', 'Solved'])
+    if iteration_snapshot:
+        scalelog_dict['snapshot'] = SimAuto.counters_df()
     
     if not iteration_success:
         return scalelog_dict
     
     compute_voltage_exclusions()
     SimAuto.SaveState()
-    gen_final_status_change_df = set_gen_load_status()
+    with simauto_trace.stage('set_gen_load_status'):
+        gen_final_status_change_df = set_gen_load_status()
     if not solve(SimAuto):
         print('Setting final gen/load statuses did not succeed. Reverting change.')
         SimAuto.LoadState()
@@ -1228,9 +1990,63 @@ def iterate_to_gen_load_targets(SimAuto, gen_target_df, load_target_df, pvqv_df,
 
     return scalelog_dict
 
-def set_branch_statuses(SimAuto, left_case_dict, right_case_dict):
+def apply_in_order_bisect(SimAuto, table: str, df: pd.DataFrame, runs: list[list[int]] = None) -> list[int]:
+    """
+    Applies the rows of df in order, keeping the rows which solve with the rows kept before them. Runs of rows are 
+    tried together, and a run which diverges is split in half, so only about 2 * log2(n) solves are needed per 
+    failing row, instead of one per row. 
+    This approximates applying the rows one at a time: a run which solves as a whole is kept even if one of its rows 
+    would diverge on its own, and a solve from a different starting point may converge where a step would not. 
+    runs: Lists of positions to try together, in order. Defaults to all rows as one run. 
+    Returns the positions of the rows which couldn't be applied. The case is left with every other row applied. 
+    """
+    failed: list[int] = []
+    pending = [list(range(len(df)))] if runs is None else [list(run) for run in runs]
+    done = 0
+    while len(pending) > 0:
+        positions = pending.pop(0)
+        SimAuto.SaveState()
+        set_param_df(SimAuto, table, df.iloc[positions])
+        if solve(SimAuto, mva_mismatch_threshold):
+            done += len(positions)
+        else:
+            SimAuto.LoadState()
+            if len(positions) == 1:
+                failed.append(positions[0])
+                done += 1
+            else:
+                half = len(positions) // 2
+                pending = [positions[:half], positions[half:]] + pending
+        print(f'\rApplied {done} of {len(df)} {table} changes, {len(failed)} failed', end='')
+    print('')
+    return failed
+
+def branch_status_failures(case_fp: Path, changes_df: pd.DataFrame) -> list[str]:
+    """
+    Worker for set_branch_statuses(): opens case_fp, applies changes_df in order with apply_in_order_bisect(), and 
+    returns the ObjectIDs of the branches which couldn't be changed. 
+    """
+    SimAuto = dispatch_simauto('set_branch_statuses_' + hashlib.sha1(','.join(changes_df['ObjectID']).encode('utf-8')).hexdigest()[:12])
+    open_case(SimAuto, case_fp)
+    solve(SimAuto, check='skip')
+    failed = apply_in_order_bisect(SimAuto, 'Branch', changes_df[['ObjectID', 'Status']])
+    SimAuto.CloseCase()
+    SimAuto = None
+    return changes_df['ObjectID'].iloc[failed].tolist()
+
+# Reject branch openings which would island in-service gen/load (see topology.py) without solving them. 
+islanding_prescreen = True
+
+def set_branch_statuses(SimAuto, left_case_dict, right_case_dict, case_fp: Path = None, num_workers: int = 1):
     """
     With the "Right" case open, sets the "Right" model branch statuses to match those from the "Left" model. 
+    If they don't solve all at once, the changes are applied in order, keeping the ones which solve, with 
+    apply_in_order_bisect() (an approximation of applying them one at a time). 
+    case_fp: A saved copy of the open case. With num_workers > 1, each worker opens it and searches an equal share 
+        of the changes first (see branch_status_failures()), so the final search only needs to confirm their results. 
+    With islanding_prescreen, if the bulk change doesn't solve, the search applies every closing before any opening, 
+    and openings which would still leave in-service gen/load without a slack bus are failed up front, with 
+    'FailReason' = 'Islanding', and aren't solved. 
     """
     
     # Get Transformer and Non-Transformer branch statuses by ObjectID. 
@@ -1273,49 +2089,129 @@ def set_branch_statuses(SimAuto, left_case_dict, right_case_dict):
     # Save the current state. 
     filtered_df['StatusRight'] = filtered_df['Status']
 
-    # Empty df to keep track of any branches which couldn't solve. 
-    fail_df = pd.DataFrame(columns=filtered_df.columns)
+    # Changes to make, in order. 
+    changes_df = filtered_df.copy(deep=True)
+    changes_df['Status'] = changes_df['StatusLeft']
 
     # Attempt to solve all changes at once.
     print(f'Attempting to set statuses on all branches at the same time. ')
     SimAuto.SaveState()
-    allchanges_df = filtered_df.copy(deep=True)
-    allchanges_df['Status'] = allchanges_df['StatusLeft']
-    message = set_param_df(SimAuto, 'Branch', allchanges_df)
-    if not solve(SimAuto, mva_mismatch_threshold):
-        # Failed to do all changes at once! Revert, and try individual branch changes. 
-        print(f'Failed to set status on all elements at the same time! Testing individual branches one at a time.')
-        SimAuto.LoadState()
-
-        # For each object_id, attempt to change the status and solve. 
-        # If it fails, keep track of those failures. 
-        counter = 1
-        total_count = len(filtered_df['ObjectID'].unique())
-        for object_id in filtered_df['ObjectID'].unique():
-            print(f'Item {counter} of {total_count}: Setting status on {object_id}')
-            counter += 1
-            row_df = filtered_df[filtered_df['ObjectID']==object_id].copy(deep=True)
-
-            # Save state. Attempt modification. Solve. Revert and log if failed to solve. 
-            SimAuto.SaveState()
-            row_df['Status'] = row_df['StatusLeft']
-            message = set_param_df(SimAuto, 'Branch', row_df)
-            if not solve(SimAuto, mva_mismatch_threshold):
-                SimAuto.LoadState()
-                fail_df = pd.concat([fail_df, row_df], ignore_index = True)
-                print(f'Failed to set status on {object_id}')
+    message = set_param_df(SimAuto, 'Branch', changes_df[['ObjectID', 'Status']])
+    if solve(SimAuto, mva_mismatch_threshold):
+        return [status_targets_df, changes_df.iloc[0:0].assign(FailReason='')]
+
+    # Failed to do all changes at once! Revert, and search for the branches which can't be changed. 
+    SimAuto.LoadState()
+    print(f'Failed to set status on all elements at the same time! Searching for the branches which diverge.')
+
+    # Openings which would island energized buses can't solve. Set them aside before solving them. 
+    # Closings go first, so an opening whose feed moves to a branch being closed (e.g. open A, close B) isn't islanding. 
+    island_df = changes_df.iloc[0:0].copy()
+    if islanding_prescreen:
+        changes_df = changes_df.sort_values(by='Status', key=lambda status: status != 'Closed', kind='stable').reset_index(drop=True)
+        islands = topology.ConnectivityIndex(right_case_dict).screen_openings(changes_df[['ObjectID', 'Status']])
+        island_df = changes_df[islands].copy()
+        changes_df = changes_df[~islands].reset_index(drop=True)
+        print(f'{len(island_df)} branch openings would island in-service gen/load. Skipping them.')
+    island_df['FailReason'] = 'Islanding'
+    half = len(changes_df) // 2
+    runs = [list(range(half)), list(range(half, len(changes_df)))]
+    if case_fp is not None and num_workers > 1 and len(changes_df) > num_workers:
+        # Each worker searches its own share, starting from the saved case. 
+        shares = [changes_df.iloc[positions] for positions in np.array_split(np.arange(len(changes_df)), num_workers)]
+        with mp.Pool(processes=num_workers) as mp_pool:
+            worker_failed = mp_pool.starmap(branch_status_failures, [(case_fp, share) for share in shares])
+        suspects = set(object_id for failed in worker_failed for object_id in failed)
+        print(f'Workers found {len(suspects)} branches which may diverge. Confirming on the open case.')
+        # Runs of changes which solved for the workers are tried together. Suspects are tried on their own. 
+        runs = []
+        previous_suspect = True
+        for position, object_id in enumerate(changes_df['ObjectID']):
+            suspect = object_id in suspects
+            if suspect or previous_suspect:
+                runs.append([position])
+            else:
+                runs[-1].append(position)
+            previous_suspect = suspect
+
+    failed = apply_in_order_bisect(SimAuto, 'Branch', changes_df[['ObjectID', 'Status']], runs)
+    fail_df = changes_df.iloc[failed].copy()
+    for object_id in fail_df['ObjectID']:
+        print(f'Failed to set status on {object_id}')
+    fail_df['FailReason'] = 'Diverged'
+    fail_df = pd.concat([island_df, fail_df], ignore_index=True)
 
     return [status_targets_df, fail_df]
 
-def adjust_shunts(SimAuto, vlow: float = 0.92, vhigh: float = 1.08, max_iterations: int = 10):
+# How adjust_shunts() picks shunts to switch. 
+# 'iterative': switches every out-of-band shunt at once, then one shunt (smallest first) per solve, up to max_iterations. 
+# 'sensitivity': predicts each bus's voltage change from its dV/dQ self-sensitivity (SensdVdQself, see get_pvqv()), 
+#   and switches the set of shunts which brings each out-of-band bus inside the band, for every bus at once. 
+#   If that doesn't solve, the shunts are applied per island & area, bisecting any group which diverges. 
+#   Repeated up to shunt_dispatch_passes times, for buses the prediction missed. Needs sensitivity_df. 
+shunt_dispatch_mode = 'iterative'
+shunt_dispatch_passes = 2
+# One entry per adjust_shunts() call: mode, solves, shunts switched & rejected, and out-of-band shunt buses. 
+shunt_dispatch_log: list[dict[str,object]] = []
+
+def plan_shunt_dispatch(shunt_df: pd.DataFrame, sensitivity_df: pd.DataFrame, vlow: float, vhigh: float) -> pd.DataFrame:
+    """
+    Shunts to switch (ObjectID, Status: the new status, Group), so each bus outside vlow/vhigh is predicted to end 
+    up inside, without overshooting the other limit. Per bus, the smallest switches are taken first. 
+    shunt_df: ObjectID, BusNum, MvarNom, Status, Vpu, IslandNumber. 
+    sensitivity_df: Number, AreaNumber, SensdVdQself (pu per Mvar). Buses without one use the median. 
+    Group numbers the (IslandNumber, AreaNumber) of each shunt, as regions which barely interact. 
+    """
+    columns = ['ObjectID', 'Status', 'Group']
+    sensitivity = sensitivity_df.drop_duplicates('Number').set_index('Number')
+    df = shunt_df[(shunt_df['Vpu'] < vlow) | (shunt_df['Vpu'] > vhigh)].copy()
+    if len(df) == 0:
+        return pd.DataFrame(columns=columns)
+    dvdq = sensitivity['SensdVdQself'].abs()
+    df['dVdQ'] = df['BusNum'].map(dvdq).fillna(dvdq.median() if len(dvdq) > 0 else 0.0)
+    df['AreaNumber'] = df['BusNum'].map(sensitivity['AreaNumber']) if 'AreaNumber' in sensitivity.columns else 0
+    # Mvar injected by switching: closing a capacitor or opening a reactor raises the voltage. 
+    closing = df['Status'] == 'Open'
+    df['dQ'] = np.where(closing, 1.0, -1.0) * df['MvarNom'] * df['Vpu'] ** 2
+    df['dV'] = df['dVdQ'] * df['dQ']
+    low = df['Vpu'] < vlow
+    # Only the switches which move the voltage back toward the band. 
+    df = df[(low & (df['dV'] > 0)) | (~low & (df['dV'] < 0))].sort_values(by='dV', key=abs, kind='stable')
+
+    chosen = []
+    for _, bus_df in df.groupby('BusNum', sort=False):
+        v = bus_df['Vpu'].iloc[0]
+        for object_id, dv in zip(bus_df.index, bus_df['dV']):
+            if vlow <= v <= vhigh:
+                break
+            if (dv > 0 and v + dv > vhigh) or (dv < 0 and v + dv < vlow):
+                continue # Overshoots the band. 
+            v += dv
+            chosen.append(object_id)
+    plan_df = df.loc[chosen].copy()
+    plan_df['Status'] = np.where(plan_df['Status'] == 'Open', 'Closed', 'Open')
+    plan_df['Group'] = plan_df.groupby(['IslandNumber', 'AreaNumber'], sort=False).ngroup()
+    return plan_df[columns].sort_values(by='Group', kind='stable')
+
+def adjust_shunts(SimAuto, vlow: float = 0.92, vhigh: float = 1.08, max_iterations: int = 10, sensitivity_df: pd.DataFrame = None, mode: str = None):
+    """
+    Adjusts shunts to attempt to get buses back within a set voltage band. 
+    mode: See shunt_dispatch_mode (the default). 'sensitivity' falls back to 'iterative' without sensitivity_df. 
+    Each call is recorded in shunt_dispatch_log. 
+    """
+    if mode is None:
+        mode = shunt_dispatch_mode
+    if mode == 'sensitivity' and sensitivity_df is None:
+        mode = 'iterative'
+    solves_before = len(solve_log)
+
     # Save state.
     SimAuto.SaveState()
 
-    # Adjusts shunts to attempt to get buses back within a set voltage band. 
-
     table = 'Shunt'
     parameter_type: dict[str,type] = {
         'ObjectID': str
+        ,'BusNum': int
         ,'MvarNom': float
         ,'Status': str
         ,'Vpu': float
@@ -1337,6 +2233,8 @@ def adjust_shunts(SimAuto, vlow: float = 0.92, vhigh: float = 1.08, max_iteratio
     
     def get_suggested_statuses():
         df = get_param_df(SimAuto, table, parameter_type)
+        if len(df) == 0:
+            return df.assign(NewStatus=df['Status'])
         df['NewStatus'] = df.apply(suggested_shunt_status, axis=1)
         change_df = df[df['Status']!=df['NewStatus']].copy(deep=True)
         return change_df
@@ -1346,6 +2244,8 @@ def adjust_shunts(SimAuto, vlow: float = 0.92, vhigh: float = 1.08, max_iteratio
         SimAuto.SaveState()
 
         df = get_suggested_statuses()
+        if len(df) == 0:
+            return # No change, so no need to solve. 
         df['Status'] = df['NewStatus']
         message = set_param_df(SimAuto, table, df)
 
@@ -1372,11 +2272,44 @@ def adjust_shunts(SimAuto, vlow: float = 0.92, vhigh: float = 1.08, max_iteratio
                 SimAuto.LoadState()
 
         return
-    adjust_all_shunts()
-    iterate_on_individual_shunts()
-    if not solve(SimAuto, mva_mismatch_threshold):
-        print('adjust_shunts() did not solve. Restoring state.')
-        SimAuto.LoadState()
+    def dispatch_by_sensitivity() -> list[int]:
+        # Switches planned sets of shunts. Returns [switched, rejected, out-of-band buses at the start]. 
+        switched = 0
+        rejected = 0
+        out_of_band = None
+        for _ in range(shunt_dispatch_passes):
+            shunt_df = get_param_df(SimAuto, table, parameter_type)
+            if out_of_band is None:
+                out_of_band = int(shunt_df.loc[(shunt_df['Vpu'] < vlow) | (shunt_df['Vpu'] > vhigh), 'BusNum'].nunique())
+            plan_df = plan_shunt_dispatch(shunt_df, sensitivity_df, vlow, vhigh).reset_index(drop=True)
+            if len(plan_df) == 0:
+                break
+            SimAuto.SaveState()
+            set_param_df(SimAuto, table, plan_df[['ObjectID', 'Status']])
+            if solve(SimAuto, mva_mismatch_threshold):
+                switched += len(plan_df)
+                continue
+            # Apply one region at a time, keeping the ones which solve. 
+            SimAuto.LoadState()
+            runs = [list(positions) for positions in plan_df.groupby('Group', sort=False).indices.values()]
+            failed = apply_in_order_bisect(SimAuto, table, plan_df[['ObjectID', 'Status']], runs)
+            switched += len(plan_df) - len(failed)
+            rejected += len(failed)
+            if len(failed) == len(plan_df):
+                break
+        return [switched, rejected, out_of_band or 0]
+
+    if mode == 'sensitivity':
+        [switched, rejected, out_of_band] = dispatch_by_sensitivity()
+    else:
+        out_of_band = None
+        adjust_all_shunts()
+        iterate_on_individual_shunts()
+        if not solve(SimAuto, mva_mismatch_threshold):
+            print('adjust_shunts() did not solve. Restoring state.')
+            SimAuto.LoadState()
+        switched = rejected = None
+    shunt_dispatch_log.append({'Mode': mode, 'Solves': len(solve_log) - solves_before, 'Switched': switched, 'Rejected': rejected, 'OutOfBandBuses': out_of_band})
     return
 
 def fix_transformer_taps(SimAuto, threshold = 0.15):
@@ -1422,10 +2355,32 @@ def fix_transformer_taps(SimAuto, threshold = 0.15):
     
     return bad_df
 
-def get_fault_duty(SimAuto) -> pd.DataFrame:
+# How get_fault_duty() calculates fault duty. 
+# 'simauto': One 3-phase Fault object per bus, solved with PowerWorld's FaultMultiple. 
+# 'offline': short_circuit.fault_duty(), from one sparse LU factorization of the bus admittance matrix. 
+# 'validate': Both. Returns PowerWorld's results, and keeps the comparison in fault_duty_check_df. 
+fault_duty_mode = 'simauto'
+# Per bus: offline vs. PowerWorld fault MVA, from the last get_fault_duty() in 'validate' mode. 
+fault_duty_check_df: pd.DataFrame = None
+
+def get_fault_duty(SimAuto, mode: str = None) -> pd.DataFrame:
     """
     Returns a dataframe of fault duty at every bus. 
+    mode: See fault_duty_mode (the default). 
     """
+    global fault_duty_check_df
+    if mode is None:
+        mode = fault_duty_mode
+    if mode in ['offline', 'validate']:
+        offline_df = get_fault_duty_offline(SimAuto)
+        if mode == 'offline':
+            return offline_df
+        simauto_df = get_fault_duty(SimAuto, 'simauto')
+        fault_duty_check_df = short_circuit.compare(offline_df, simauto_df)
+        max_bus = [df.loc[df['MVA'].idxmax(), 'BusNumber'] for df in [offline_df, simauto_df]]
+        print(f'Offline fault duty: largest difference {fault_duty_check_df["DiffPct"].abs().max():.2f}%, max MVA bus {max_bus[0]} (PowerWorld: {max_bus[1]})')
+        return simauto_df
+
     # Get a list of all buses. 
     bus_params: dict[str,type] = {
         'ObjectID': str
@@ -1470,11 +2425,30 @@ def get_fault_duty(SimAuto) -> pd.DataFrame:
 
     return result_df
 
-def get_pvqv(SimAuto) -> pd.DataFrame:
+def get_fault_duty_offline(SimAuto) -> pd.DataFrame:
+    """
+    get_fault_duty() without Fault objects: reads the case's tables & switched shunts, and calculates every bus at 
+    once with short_circuit.fault_duty(), from the solved voltages. 
+    """
+    case_dict = get_case_data(SimAuto)
+    shunt_df = get_param_df(SimAuto, 'Shunt', nr_backend.shunt_params)
+    return short_circuit.fault_duty(case_dict, shunt_df)
+
+# How get_pvqv() calculates the self-sensitivities. 
+# 'simauto': PowerWorld's CalculateVoltSelfSense. 
+# 'local': voltage_sensitivity.SelfSensitivity, from the solved case's tables, in-process. 
+pvqv_mode = 'simauto'
+
+def get_pvqv(SimAuto, mode: str = None) -> pd.DataFrame:
     """
     Calculates bus voltage MW & MVAR self-sensitivity. 
     Tools -> Sensitivities -> Flow and Voltage Sensitivities -> Self Sensitivity (Tab)
+    mode: See pvqv_mode (the default). 
     """
+    if mode is None:
+        mode = pvqv_mode
+    if mode == 'local':
+        return get_pvqv_local(SimAuto)
     bus_params = {
         'Number': int
         ,'Name': str
@@ -1491,6 +2465,27 @@ def get_pvqv(SimAuto) -> pd.DataFrame:
     result_df = get_param_df(SimAuto, 'Bus', bus_params)
     return result_df
 
+def get_pvqv_local(SimAuto) -> pd.DataFrame:
+    """
+    get_pvqv() without CalculateVoltSelfSense: self-sensitivities of the solved case (its tables, switched shunts & 
+    voltages), from one sparse factorization of its power flow Jacobian. Per MW/Mvar injected at the bus. 
+    """
+    bus_params = {
+        'Number': int
+        ,'Name': str
+        ,'NomkV': float
+        ,'AreaNumber': int
+        ,'AreaName': str
+        ,'Vpu': float
+    }
+    case_dict = get_case_data(SimAuto)
+    shunt_df = get_param_df(SimAuto, 'Shunt', nr_backend.shunt_params)
+    engine = voltage_sensitivity.SelfSensitivity(nr_backend.NewtonRaphsonSimAuto(case_dict, shunt_df))
+    bus_df = get_param_df(SimAuto, 'Bus', bus_params)
+    result_df = bus_df.merge(engine.sensitivities(), on='Number', how='left')
+    result_df[['SensdVdPself', 'SensdVdQself']] = result_df[['SensdVdPself', 'SensdVdQself']].fillna(0.0)
+    return result_df[['Number', 'Name', 'NomkV', 'AreaNumber', 'AreaName', 'SensdVdPself', 'SensdVdQself', 'Vpu']]
+
 def auto_fit_columns(writer: pd.ExcelWriter):
     workbook = writer.book
     for sheet_name in writer.sheets: